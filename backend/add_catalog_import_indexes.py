@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+"""
+Add the indexes the catalog import uses to find existing parts by part
+number and services by name
+"""
+
+import sqlite3
+import os
+
+# Index name -> (table, column) (must match models.Part / models.Service)
+INDEXES = {
+    "ix_parts_part_number": ("parts", "part_number"),
+    "ix_services_name": ("services", "name"),
+}
+
+def add_catalog_import_indexes(db_path: str = "database/car_service_center.db", verbose: bool = True) -> bool:
+    """Create the catalog import key indexes; safe to run repeatedly"""
+    if not os.path.exists(db_path):
+        print("Database doesn't exist")
+        return False
+
+    try:
+        conn = sqlite3.connect(db_path)
+        cursor = conn.cursor()
+
+        for index_name, (table, column) in INDEXES.items():
+            cursor.execute(f"CREATE INDEX IF NOT EXISTS {index_name} ON {table} ({column})")
+            if verbose:
+                print(f"Index ready: {index_name}")
+
+        conn.commit()
+        conn.close()
+        return True
+
+    except Exception as e:
+        print(f"Error: {e}")
+        return False
+
+if __name__ == "__main__":
+    print("Adding catalog import indexes...")
+    if add_catalog_import_indexes():
+        print("\nSuccessfully ensured catalog import indexes!")
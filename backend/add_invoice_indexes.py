@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+"""
+Add composite indexes used by keyset pagination of the invoice list
+"""
+
+import sqlite3
+import os
+
+def add_invoice_indexes():
+    """Create (invoice_date, id) composite indexes on the invoices table"""
+    db_path = "database/car_service_center.db"
+
+    if not os.path.exists(db_path):
+        print("Database doesn't exist")
+        return False
+
+    try:
+        conn = sqlite3.connect(db_path)
+        cursor = conn.cursor()
+
+        # Index name -> indexed columns (must match Invoice.__table_args__)
+        indexes = [
+            ("ix_invoices_date_id", "invoice_date, id"),
+            ("ix_invoices_status_date_id", "payment_status, invoice_date, id"),
+            ("ix_invoices_client_date_id", "client_id, invoice_date, id"),
+            ("ix_invoices_vehicle_date_id", "vehicle_id, invoice_date, id"),
+        ]
+
+        for index_name, columns in indexes:
+            try:
+                cursor.execute(f"CREATE INDEX IF NOT EXISTS {index_name} ON invoices ({columns})")
+                print(f"Index ready: {index_name}")
+            except sqlite3.Error as e:
+                print(f"Error creating index {index_name}: {e}")
+
+        cursor.execute("ANALYZE invoices")
+
+        conn.commit()
+        conn.close()
+        print(f"\nSuccessfully ensured {len(indexes)} invoice indexes!")
+        return True
+
+    except Exception as e:
+        print(f"Error: {e}")
+        return False
+
+if __name__ == "__main__":
+    print("Adding keyset pagination indexes to Invoice table...")
+    add_invoice_indexes()
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Add the normalized phone and registration number columns used for duplicate
+checks and exact lookups, backfill them and index them
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import sqlite3
+
+from utils.normalization import normalize_phone, normalize_registration
+
+# table -> [(column, type, source column, normalizer)] (must match models.Client / models.Vehicle)
+LOOKUP_COLUMNS = {
+    "clients": [
+        ("phone_normalized", "VARCHAR(15)", "phone", normalize_phone),
+        ("mobile_normalized", "VARCHAR(15)", "mobile", normalize_phone),
+    ],
+    "vehicles": [
+        ("registration_normalized", "VARCHAR(20)", "registration_number", normalize_registration),
+    ],
+}
+
+def add_lookup_columns(db_path: str = "database/car_service_center.db", verbose: bool = True) -> bool:
+    """Add, backfill and index the lookup columns; safe to run repeatedly"""
+    if not os.path.exists(db_path):
+        print("Database doesn't exist")
+        return False
+
+    try:
+        conn = sqlite3.connect(db_path)
+        cursor = conn.cursor()
+
+        for table, columns in LOOKUP_COLUMNS.items():
+            cursor.execute(f"PRAGMA table_info({table})")
+            existing = {row[1] for row in cursor.fetchall()}
+
+            for column, column_type, source, normalize in columns:
+                if column not in existing:
+                    cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column} {column_type}")
+                    print(f"Added {table}.{column}")
+
+                rows = cursor.execute(
+                    f"SELECT id, {source} FROM {table} WHERE {column} IS NULL AND {source} IS NOT NULL"
+                ).fetchall()
+                cursor.executemany(
+                    f"UPDATE {table} SET {column} = ? WHERE id = ?",
+                    [(normalize(value), row_id) for row_id, value in rows]
+                )
+                cursor.execute(f"CREATE INDEX IF NOT EXISTS ix_{table}_{column} ON {table} ({column})")
+                if verbose:
+                    print(f"Index ready: ix_{table}_{column} ({len(rows)} rows backfilled)")
+
+        conn.commit()
+        conn.close()
+        return True
+
+    except Exception as e:
+        print(f"Error: {e}")
+        return False
+
+if __name__ == "__main__":
+    print("Adding normalized phone and registration lookup columns...")
+    if add_lookup_columns():
+        print("\nSuccessfully ensured lookup columns!")
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Prepare databases created before the payment ledger: record an opening
+balance entry for paid amounts that have no payments behind them, backfill
+invoices.balance_due, and add the ledger and outstanding balance indexes
+"""
+
+import sqlite3
+import os
+
+# Must match models.Payment / models.Invoice
+INDEXES = [
+    "CREATE INDEX IF NOT EXISTS ix_payments_invoice_id ON payments (invoice_id)",
+    "CREATE INDEX IF NOT EXISTS ix_invoices_status_balance ON invoices (payment_status, balance_due)",
+]
+
+# Must match services.payment_ledger.MONEY_TOLERANCE
+MONEY_TOLERANCE = 0.005
+
+def backfill_ledger(cursor) -> int:
+    """Make each invoice's ledger sum equal its paid_amount, and balance_due follow it"""
+    cursor.execute(f"""
+        INSERT INTO payments (invoice_id, payment_method, amount, payment_date, notes)
+        SELECT i.id, 'Adjustment', COALESCE(i.paid_amount, 0) - COALESCE(p.paid, 0),
+               COALESCE(i.payment_date, i.invoice_date, CURRENT_TIMESTAMP), 'Opening balance'
+        FROM invoices i
+        LEFT JOIN (SELECT invoice_id, SUM(amount) AS paid FROM payments GROUP BY invoice_id) p
+            ON p.invoice_id = i.id
+        WHERE ABS(COALESCE(i.paid_amount, 0) - COALESCE(p.paid, 0)) > {MONEY_TOLERANCE}
+    """)
+    opening = cursor.rowcount
+    cursor.execute("""
+        UPDATE invoices SET balance_due = COALESCE(total_amount, 0) - COALESCE(paid_amount, 0)
+        WHERE balance_due IS NOT COALESCE(total_amount, 0) - COALESCE(paid_amount, 0)
+    """)
+    print(f"Payment ledger backfilled: {opening} opening balances, {cursor.rowcount} balances")
+    return opening
+
+def add_payment_ledger(db_path: str = "database/car_service_center.db", verbose: bool = True) -> bool:
+    """Backfill the ledger once and add its indexes; safe to run repeatedly"""
+    if not os.path.exists(db_path):
+        print("Database doesn't exist")
+        return False
+
+    try:
+        conn = sqlite3.connect(db_path)
+        cursor = conn.cursor()
+
+        # Only before the ledger index exists; afterwards drift is reconcile_payments.py's to report
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = 'ix_payments_invoice_id'")
+        if cursor.fetchone() is None:
+            backfill_ledger(cursor)
+
+        for statement in INDEXES:
+            cursor.execute(statement)
+            if verbose:
+                print(f"Index ready: {statement.split()[5]}")
+
+        conn.commit()
+        conn.close()
+        return True
+
+    except Exception as e:
+        print(f"Error: {e}")
+        return False
+
+if __name__ == "__main__":
+    print("Preparing payment ledger...")
+    if add_payment_ledger():
+        print("\nSuccessfully ensured payment ledger!")
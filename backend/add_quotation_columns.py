@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Add the quotation version lineage columns and the column linking an invoice
+to the quotation it was converted from, to databases created before them.
+Existing versions (numbered like QT-0001-v2) are attached to their original.
+"""
+
+import sqlite3
+import os
+
+# Table -> [(column, definition)] (must match models.Quotation / models.Invoice)
+COLUMNS = {
+    "invoices": [
+        ("quotation_id", "INTEGER REFERENCES quotations (id)"),
+    ],
+    "quotations": [
+        ("root_id", "INTEGER REFERENCES quotations (id)"),
+        ("parent_id", "INTEGER REFERENCES quotations (id)"),
+        ("version", "INTEGER NOT NULL DEFAULT 1"),
+        ("latest_version", "INTEGER NOT NULL DEFAULT 1"),
+    ],
+}
+
+INDEXES = [
+    "CREATE UNIQUE INDEX IF NOT EXISTS ix_invoices_quotation_id ON invoices (quotation_id)",
+    "CREATE UNIQUE INDEX IF NOT EXISTS ix_quotations_root_version ON quotations (root_id, version)",
+    "CREATE INDEX IF NOT EXISTS ix_quotations_parent_id ON quotations (parent_id)",
+    "CREATE INDEX IF NOT EXISTS ix_quotation_items_quotation_id ON quotation_items (quotation_id)",
+]
+
+def backfill_lineage(cursor) -> int:
+    """Give quotations without a lineage one, from their -vN number; returns the rows updated"""
+    pending = cursor.execute("SELECT id, quotation_number FROM quotations WHERE root_id IS NULL ORDER BY id").fetchall()
+    if not pending:
+        return 0
+    numbers = {number: quotation_id for quotation_id, number in cursor.execute("SELECT id, quotation_number FROM quotations")}
+    for quotation_id, number in pending:
+        base, _, suffix = (number or "").rpartition("-v")
+        if base in numbers and suffix.isdigit() and int(suffix) > 1:
+            # The original's own lineage is filled in by the same pass when missing
+            root_id = numbers[base]
+            cursor.execute(
+                "UPDATE quotations SET root_id = ?, parent_id = ?, version = ? WHERE id = ?",
+                (root_id, root_id, int(suffix), quotation_id)
+            )
+        else:
+            cursor.execute("UPDATE quotations SET root_id = id, version = 1 WHERE id = ?", (quotation_id,))
+    cursor.execute("""
+        UPDATE quotations SET latest_version = (
+            SELECT MAX(version) FROM quotations AS v WHERE v.root_id = quotations.id
+        )
+        WHERE root_id = id
+    """)
+    return len(pending)
+
+def add_quotation_columns(db_path: str = "database/car_service_center.db", verbose: bool = True) -> bool:
+    """Add the quotation columns and their indexes; safe to run repeatedly"""
+    if not os.path.exists(db_path):
+        print("Database doesn't exist")
+        return False
+
+    try:
+        conn = sqlite3.connect(db_path)
+        cursor = conn.cursor()
+
+        for table, columns in COLUMNS.items():
+            cursor.execute(f"PRAGMA table_info({table})")
+            existing = {row[1] for row in cursor.fetchall()}
+            for column, definition in columns:
+                if column not in existing:
+                    cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+                    print(f"Added {table}.{column}")
+
+        backfilled = backfill_lineage(cursor)
+        if backfilled:
+            print(f"Quotation lineage filled in for {backfilled} quotations")
+
+        for statement in INDEXES:
+            cursor.execute(statement)
+            if verbose:
+                words = statement.split()
+                print(f"Index ready: {words[words.index('ON') - 1]}")
+
+        conn.commit()
+        conn.close()
+        return True
+
+    except Exception as e:
+        print(f"Error: {e}")
+        return False
+
+if __name__ == "__main__":
+    print("Adding quotation columns...")
+    if add_quotation_columns():
+        print("\nSuccessfully ensured quotation columns!")
@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+Add the reserved stock column and the stock ledger indexes to databases
+created before the stock ledger
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import sqlite3
+
+# Must match models.Part and models.StockMovement
+INDEXES = [
+    "CREATE INDEX IF NOT EXISTS ix_parts_stock_shortfall ON parts (stock_quantity - reserved_quantity - minimum_stock)",
+    "CREATE INDEX IF NOT EXISTS ix_stock_movements_part_id ON stock_movements (part_id)",
+    "CREATE INDEX IF NOT EXISTS ix_stock_movements_reference ON stock_movements (reference_type, reference_id)",
+]
+
+def add_stock_columns(db_path: str = "database/car_service_center.db", verbose: bool = True) -> bool:
+    """Add parts.reserved_quantity and the ledger indexes; safe to run repeatedly"""
+    if not os.path.exists(db_path):
+        print("Database doesn't exist")
+        return False
+
+    try:
+        conn = sqlite3.connect(db_path)
+        cursor = conn.cursor()
+
+        cursor.execute("PRAGMA table_info(parts)")
+        if "reserved_quantity" not in {row[1] for row in cursor.fetchall()}:
+            cursor.execute("ALTER TABLE parts ADD COLUMN reserved_quantity INTEGER NOT NULL DEFAULT 0")
+            print("Added parts.reserved_quantity")
+        cursor.execute("UPDATE parts SET stock_quantity = 0 WHERE stock_quantity IS NULL")
+
+        cursor.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name = 'stock_movements'")
+        has_movements = cursor.fetchone() is not None
+        for statement in INDEXES:
+            if "stock_movements" in statement and not has_movements:
+                continue  # Created with its indexes by create_all
+            cursor.execute(statement)
+            if verbose:
+                print(f"Index ready: {statement.split()[5]}")
+
+        conn.commit()
+        conn.close()
+        return True
+
+    except Exception as e:
+        print(f"Error: {e}")
+        return False
+
+if __name__ == "__main__":
+    print("Adding stock ledger columns...")
+    if add_stock_columns():
+        print("\nSuccessfully ensured stock ledger columns!")
@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+Add the late fee marker column and the indexes the scheduled quotation
+expiry and invoice overdue sweeps use, to databases created before them
+"""
+
+import sqlite3
+import os
+
+# Table -> [(column, definition)] (must match models.Invoice)
+COLUMNS = {
+    "invoices": [
+        ("late_fee_charged_at", "DATETIME"),
+    ],
+}
+
+# Must match models.Invoice / models.Quotation
+INDEXES = [
+    "CREATE INDEX IF NOT EXISTS ix_invoices_status_due_date ON invoices (payment_status, due_date)",
+    "CREATE INDEX IF NOT EXISTS ix_quotations_status_valid_until ON quotations (status, valid_until)",
+]
+
+def add_sweep_columns(db_path: str = "database/car_service_center.db", verbose: bool = True) -> bool:
+    """Add the sweep columns and indexes; safe to run repeatedly"""
+    if not os.path.exists(db_path):
+        print("Database doesn't exist")
+        return False
+
+    try:
+        conn = sqlite3.connect(db_path)
+        cursor = conn.cursor()
+
+        for table, columns in COLUMNS.items():
+            cursor.execute(f"PRAGMA table_info({table})")
+            existing = {row[1] for row in cursor.fetchall()}
+            for column, definition in columns:
+                if column not in existing:
+                    cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+                    print(f"Added {table}.{column}")
+
+        for statement in INDEXES:
+            cursor.execute(statement)
+            if verbose:
+                print(f"Index ready: {statement.split()[5]}")
+
+        conn.commit()
+        conn.close()
+        return True
+
+    except Exception as e:
+        print(f"Error: {e}")
+        return False
+
+if __name__ == "__main__":
+    print("Adding sweep columns...")
+    if add_sweep_columns():
+        print("\nSuccessfully ensured sweep columns!")
@@ -1,14 +1,16 @@
 from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from sqlalchemy.orm import Session
 from datetime import datetime, timedelta
 from typing import Optional
-from passlib.context import CryptContext
 from jose import JWTError, jwt
 import os
 
-from database.database import SessionLocal
+from database.database import get_db
 from models.models import User
+from auth.passwords import PasswordPoolBusy, check_password, hash_password, password_pool, pwd_context, verify_and_update
+from auth.user_cache import UserPrincipal, user_cache
 
 router = APIRouter()
 
@@ -17,32 +19,50 @@ SECRET_KEY = "car-service-center-secret-key-2024"  # In production, use environm
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 1440  # 24 hours
 
-pwd_context = CryptContext(schemes=["sha256_crypt"], deprecated="auto")
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/token")
 
-# Dependency
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+
+def password_pool_busy() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Too many password checks in progress, please retry",
+        headers={"Retry-After": "1"},
+    )
 
 def verify_password(plain_password, hashed_password):
-    return pwd_context.verify(plain_password, hashed_password)
+    """Check a password from a sync route; the hashing runs on the password pool"""
+    try:
+        return check_password(plain_password, hashed_password)
+    except PasswordPoolBusy:
+        raise password_pool_busy()
 
 def get_password_hash(password):
-    return pwd_context.hash(password)
+    return hash_password(password)
 
 def get_user(db: Session, username: str):
     return db.query(User).filter(User.username == username).first()
 
-def authenticate_user(db: Session, username: str, password: str):
-    user = get_user(db, username)
+def _upgrade_password_hash(db: Session, user: User, new_hash: str):
+    user.hashed_password = new_hash
+    db.commit()
+    password_pool.note_upgrade()
+
+async def authenticate_user(db: Session, username: str, password: str):
+    """
+    The user if the password matches, else False. A hash in an outdated
+    scheme is replaced with one in the current scheme.
+    """
+    user = await run_in_threadpool(get_user, db, username)
     if not user:
         return False
-    if not verify_password(password, user.hashed_password):
+    try:
+        valid, new_hash = await verify_and_update(password, user.hashed_password)
+    except PasswordPoolBusy:
+        raise password_pool_busy()
+    if not valid:
         return False
+    if new_hash:
+        await run_in_threadpool(_upgrade_password_hash, db, user, new_hash)
     return user
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
@@ -55,7 +75,16 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
+def load_principal(db: Session, username: str) -> Optional[UserPrincipal]:
+    user = get_user(db, username)
+    return UserPrincipal(user) if user else None
+
 async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+    """
+    The user a bearer token belongs to, from the user cache when possible.
+    db is the request's own session (FastAPI shares it with the route), and
+    it only opens a connection on a cache miss.
+    """
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -68,8 +97,14 @@ async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = De
             raise credentials_exception
     except JWTError:
         raise credentials_exception
-    user = get_user(db, username=username)
+    user = user_cache.get(username)
     if user is None:
+        generation = user_cache.generation
+        user = await run_in_threadpool(load_principal, db, username)
+        if user is None:
+            raise credentials_exception
+        user_cache.put(username, user, generation)
+    if user.is_active is False:
         raise credentials_exception
     return user
 
@@ -95,13 +130,16 @@ async def login_for_access_token(
     form_data: OAuth2PasswordRequestForm = Depends(),
     db: Session = Depends(get_db)
 ):
-    user = authenticate_user(db, form_data.username, form_data.password)
+    generation = user_cache.generation
+    user = await authenticate_user(db, form_data.username, form_data.password)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
+    # The first request with the new token is then served from the cache
+    user_cache.put(user.username, UserPrincipal(user), generation)
     access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
         data={"sub": user.username}, expires_delta=access_token_expires
@@ -126,4 +164,9 @@ async def read_users_me(current_user: User = Depends(get_current_user)):
         "email": current_user.email,
         "full_name": current_user.full_name,
         "is_admin": current_user.is_admin
-    }
\ No newline at end of file
+    }
+
+@router.get("/metrics")
+async def get_auth_metrics(current_user: User = Depends(get_current_user)):
+    """Hit rate of the authenticated user cache and load on the password pool"""
+    return {"user_cache": user_cache.metrics(), "password_pool": password_pool.metrics()}
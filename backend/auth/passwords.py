@@ -0,0 +1,170 @@
+"""
+Password Hashing
+Runs password hashing and verification on a small dedicated pool, so a burst
+of logins or password-confirmed deletes cannot stall the event loop or use
+up the request threadpool.
+
+At most PASSWORD_POOL_MAX_PENDING operations may be queued or running; past
+that, callers get PasswordPoolBusy at once instead of waiting in line.
+New hashes use PASSWORD_HASH_SCHEME. Hashes in any older scheme still verify,
+and verify_and_update() returns a replacement hash so the caller can upgrade
+them on a successful login.
+
+Thread workers suit schemes whose work releases the GIL (pbkdf2_sha256,
+bcrypt, argon2). Set PASSWORD_POOL_EXECUTOR=process for schemes computed in
+Python, such as the legacy sha256_crypt.
+"""
+
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Optional, Tuple
+
+from passlib.context import CryptContext
+
+PASSWORD_HASH_SCHEME = os.getenv("PASSWORD_HASH_SCHEME", "pbkdf2_sha256")
+PASSWORD_POOL_EXECUTOR = os.getenv("PASSWORD_POOL_EXECUTOR", "thread")
+PASSWORD_POOL_WORKERS = int(os.getenv("PASSWORD_POOL_WORKERS", str(min(4, os.cpu_count() or 1))))
+PASSWORD_POOL_MAX_PENDING = int(os.getenv("PASSWORD_POOL_MAX_PENDING", "64"))
+
+# Schemes existing hashes may use; every one but the first is upgraded on login
+LEGACY_SCHEMES = ["sha256_crypt"]
+
+pwd_context = CryptContext(
+    schemes=[PASSWORD_HASH_SCHEME] + [scheme for scheme in LEGACY_SCHEMES if scheme != PASSWORD_HASH_SCHEME],
+    deprecated="auto"
+)
+
+class PasswordPoolBusy(Exception):
+    """Too many password operations are already queued"""
+
+def _hash(secret: str) -> str:
+    return pwd_context.hash(secret)
+
+def _verify_and_update(secret: str, hashed: str) -> Tuple[bool, Optional[str]]:
+    if not secret or not hashed:
+        return False, None
+    return pwd_context.verify_and_update(secret, hashed)
+
+class PasswordPool:
+    def __init__(self, workers: int = PASSWORD_POOL_WORKERS, max_pending: int = PASSWORD_POOL_MAX_PENDING,
+                 kind: str = PASSWORD_POOL_EXECUTOR):
+        self.workers = max(1, workers)
+        self.max_pending = max(1, max_pending)
+        self.kind = kind
+        self._executor: Optional[Executor] = None
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._running = 0
+        self._completed = 0
+        self._rejected = 0
+        self._upgraded = 0
+        self._wait_seconds = 0.0
+        self._max_wait_seconds = 0.0
+        self._run_seconds = 0.0
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    if self.kind == "process":
+                        self._executor = ProcessPoolExecutor(max_workers=self.workers)
+                    else:
+                        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="password")
+        return self._executor
+
+    def _admit(self):
+        with self._lock:
+            if self._pending >= self.max_pending:
+                self._rejected += 1
+                raise PasswordPoolBusy(f"{self._pending} password operations already pending")
+            self._pending += 1
+
+    def _timed(self, func, queued_at: float, *args):
+        """Run func on a worker, recording how long it queued and ran (thread workers)"""
+        started = time.perf_counter()
+        with self._lock:
+            self._running += 1
+            wait = started - queued_at
+            self._wait_seconds += wait
+            self._max_wait_seconds = max(self._max_wait_seconds, wait)
+        try:
+            return func(*args)
+        finally:
+            with self._lock:
+                self._running -= 1
+                self._run_seconds += time.perf_counter() - started
+
+    def _done(self, future):
+        with self._lock:
+            self._pending -= 1
+            self._completed += 1
+
+    def submit(self, func, *args):
+        self._admit()
+        try:
+            if self.kind == "process":
+                future = self._get_executor().submit(func, *args)
+            else:
+                future = self._get_executor().submit(self._timed, func, time.perf_counter(), *args)
+        except Exception:
+            with self._lock:
+                self._pending -= 1
+            raise
+        future.add_done_callback(self._done)
+        return future
+
+    def note_upgrade(self):
+        with self._lock:
+            self._upgraded += 1
+
+    def metrics(self) -> dict:
+        with self._lock:
+            timed = self._completed if self.kind != "process" else 0
+            return {
+                "executor": self.kind,
+                "scheme": PASSWORD_HASH_SCHEME,
+                "workers": self.workers,
+                "max_pending": self.max_pending,
+                "pending": self._pending,
+                "running": self._running,
+                "queue_depth": max(0, self._pending - (self._running if self.kind != "process" else self.workers)),
+                "completed": self._completed,
+                "rejected": self._rejected,
+                "hashes_upgraded": self._upgraded,
+                "avg_wait_ms": round(1000 * self._wait_seconds / (timed or 1), 2),
+                "max_wait_ms": round(1000 * self._max_wait_seconds, 2),
+                "avg_run_ms": round(1000 * self._run_seconds / (timed or 1), 2),
+            }
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+password_pool = PasswordPool()
+
+async def hash_password_async(secret: str) -> str:
+    return await asyncio.wrap_future(password_pool.submit(_hash, secret))
+
+async def verify_and_update(secret: str, hashed: str) -> Tuple[bool, Optional[str]]:
+    """
+    Check a password on the pool without blocking the event loop. Returns
+    (valid, new_hash), where new_hash is set when the stored hash should be
+    replaced with one in the current scheme.
+    """
+    return await asyncio.wrap_future(password_pool.submit(_verify_and_update, secret, hashed))
+
+def hash_password(secret: str) -> str:
+    """Blocking form for sync code (route threads, scripts)"""
+    return password_pool.submit(_hash, secret).result()
+
+def check_password(secret: str, hashed: str) -> bool:
+    """Blocking form for sync routes; the hashing itself still runs on the pool"""
+    return password_pool.submit(_verify_and_update, secret, hashed).result()[0]
+
+def shutdown_password_pool():
+    password_pool.shutdown()
@@ -0,0 +1,134 @@
+"""
+User Cache
+Bounded LRU of authenticated users keyed by token subject (username), so a
+request with a known token resolves its user without touching the database.
+
+Entries are detached UserPrincipal snapshots that live for at most
+USER_CACHE_TTL_SECONDS. A committed change to a User (password, is_active,
+rename, delete), through the unit of work or a bulk query, evicts it from
+this process straight away; other worker processes see it once the entry
+expires.
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Set
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+from models.models import User
+
+USER_CACHE_TTL_SECONDS = float(os.getenv("USER_CACHE_TTL_SECONDS", "30"))
+USER_CACHE_SIZE = int(os.getenv("USER_CACHE_SIZE", "1024"))
+
+_ALL = "*"
+
+class UserPrincipal:
+    """Read-only copy of the User fields request handlers use"""
+
+    __slots__ = ("id", "username", "email", "full_name", "hashed_password", "is_admin", "is_active")
+
+    def __init__(self, user: User):
+        self.id = user.id
+        self.username = user.username
+        self.email = user.email
+        self.full_name = user.full_name
+        self.hashed_password = user.hashed_password
+        self.is_admin = user.is_admin
+        self.is_active = user.is_active
+
+class UserCache:
+    def __init__(self, max_entries: int = USER_CACHE_SIZE, ttl: float = USER_CACHE_TTL_SECONDS):
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._max_entries = max_entries
+        self._ttl = ttl
+        self.generation = 0  # Bumped by every invalidation
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, username: str) -> Optional[UserPrincipal]:
+        with self._lock:
+            entry = self._entries.get(username)
+            if entry is None or entry[0] <= time.monotonic():
+                if entry is not None:
+                    del self._entries[username]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(username)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, username: str, principal: UserPrincipal, generation: int):
+        """Store a principal loaded while the cache was at generation"""
+        if self._ttl <= 0:
+            return
+        with self._lock:
+            # An invalidation committed while loading may make it stale
+            if generation != self.generation:
+                return
+            self._entries[username] = (time.monotonic() + self._ttl, principal)
+            self._entries.move_to_end(username)
+            while len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, username: Optional[str] = None):
+        """Evict one user, or everyone when username is None"""
+        with self._lock:
+            self.generation += 1
+            if username is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(username, None)
+
+    def metrics(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self._max_entries,
+                "ttl_seconds": self._ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / (lookups or 1), 4),
+            }
+
+user_cache = UserCache()
+
+def invalidate_user(username: Optional[str] = None):
+    user_cache.invalidate(username)
+
+# Evict users whose rows a committed transaction changed
+def _changed_users(session) -> Set[str]:
+    return session.info.setdefault("changed_users", set())
+
+@event.listens_for(Session, "after_flush")
+def _note_user_flush(session, flush_context):
+    for obj in (*session.dirty, *session.deleted):
+        if isinstance(obj, User):
+            history = inspect(obj).attrs.username.history
+            _changed_users(session).update(name for name in (obj.username, *history.deleted) if name)
+
+@event.listens_for(Session, "do_orm_execute")
+def _note_user_bulk_write(orm_execute_state):
+    if (orm_execute_state.is_update or orm_execute_state.is_delete) and orm_execute_state.bind_mapper is not None \
+            and orm_execute_state.bind_mapper.class_ is User:
+        _changed_users(orm_execute_state.session).add(_ALL)
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_on_commit(session):
+    changed = session.info.pop("changed_users", None)
+    if not changed:
+        return
+    if _ALL in changed:
+        invalidate_user()
+    else:
+        for username in changed:
+            invalidate_user(username)
+
+@event.listens_for(Session, "after_rollback")
+def _forget_on_rollback(session):
+    session.info.pop("changed_users", None)
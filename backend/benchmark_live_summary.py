@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Regression benchmark for /api/reports/live-summary.
+
+Builds a scratch database with a synthetic invoice history, then times the
+aggregate-query summary and records its peak Python memory at several
+dataset sizes. Peak memory should stay flat as the table grows. The old
+load-every-invoice implementation is run too for comparison; skip it with
+--no-legacy on large datasets.
+
+Usage: python benchmark_live_summary.py [--invoices 500000] [--clients 5000] [--no-legacy]
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import argparse
+import random
+import shutil
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+from sqlalchemy import and_, func
+from sqlalchemy.orm import sessionmaker
+
+from database.database import Base, create_sqlite_engine
+from models.models import Client, Invoice
+from routers.reports import get_live_summary
+
+STATUSES = ["paid", "paid", "paid", "pending", "overdue", "partially_paid"]
+
+def seed(engine, invoices: int, clients: int, start_id: int = 0):
+    """Bulk insert synthetic clients and invoices spread over the last two years"""
+    rng = random.Random(start_id)
+    now = datetime.now()
+    with engine.begin() as conn:
+        if start_id == 0:
+            conn.execute(Client.__table__.insert(), [
+                {"name": f"Client {i}", "phone": f"9{i:09d}", "created_at": now - timedelta(days=rng.randint(0, 730))}
+                for i in range(clients)
+            ])
+
+        batch = []
+        for i in range(start_id, start_id + invoices):
+            total = round(rng.uniform(500, 50000), 2)
+            status = rng.choice(STATUSES)
+            batch.append({
+                "invoice_number": f"BENCH{i:09d}",
+                "client_id": rng.randint(1, clients),
+                "invoice_date": now - timedelta(minutes=rng.randint(0, 730 * 24 * 60)),
+                "total_amount": total,
+                "paid_amount": total if status == "paid" else round(total * rng.random(), 2),
+                "payment_status": status,
+            })
+            if len(batch) == 10000:
+                conn.execute(Invoice.__table__.insert(), batch)
+                batch = []
+        if batch:
+            conn.execute(Invoice.__table__.insert(), batch)
+
+def legacy_live_summary(db):
+    """The old implementation's data access: load the invoices and sum in Python"""
+    now = datetime.now()
+    current_month_start = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    last_month_start = (current_month_start - timedelta(days=1)).replace(day=1)
+
+    db.query(Client).count()
+    current_month_invoices = db.query(Invoice).filter(Invoice.invoice_date >= current_month_start).all()
+    last_month_invoices = db.query(Invoice).filter(
+        and_(Invoice.invoice_date >= last_month_start, Invoice.invoice_date < current_month_start)
+    ).all()
+    current_month_revenue = sum(inv.total_amount or 0 for inv in current_month_invoices)
+    sum(inv.total_amount or 0 for inv in last_month_invoices)
+    db.query(func.sum(Invoice.total_amount)).scalar()
+    pending_invoices = db.query(Invoice).filter(Invoice.payment_status == "pending").all()
+    overdue_invoices = db.query(Invoice).filter(Invoice.payment_status == "overdue").all()
+    sum(inv.total_amount - (inv.paid_amount or 0) for inv in pending_invoices + overdue_invoices)
+    return current_month_revenue
+
+def measure(Session, summary) -> tuple:
+    """(seconds, peak traced MB) for one summary call on a fresh session"""
+    db = Session()
+    try:
+        tracemalloc.start()
+        start = time.perf_counter()
+        summary(db)
+        elapsed = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        return elapsed, peak / (1024 * 1024)
+    finally:
+        db.close()
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark /api/reports/live-summary")
+    parser.add_argument("--invoices", type=int, default=500000)
+    parser.add_argument("--clients", type=int, default=5000)
+    parser.add_argument("--no-legacy", action="store_true", help="skip the old implementation")
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp(prefix="live_summary_bench_")
+    try:
+        engine = create_sqlite_engine(f"sqlite:///{os.path.join(work_dir, 'bench.db')}")
+        Base.metadata.create_all(bind=engine)
+        Session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+        def aggregated(db):
+            # Bypass the response cache
+            return get_live_summary.__wrapped__(db=db, current_user=None)
+
+        # Grow the table in steps and measure at each size
+        sizes = sorted({max(1, args.invoices // 10), args.invoices})
+        seeded = 0
+        print(f"{'invoices':>10} {'aggregate s':>12} {'aggregate MB':>13} {'legacy s':>10} {'legacy MB':>10}")
+        for size in sizes:
+            start = time.perf_counter()
+            seed(engine, size - seeded, args.clients, start_id=seeded)
+            seeded = size
+            with engine.begin() as conn:
+                conn.exec_driver_sql("ANALYZE")
+            print(f"  (seeded {size} invoices in {time.perf_counter() - start:.1f}s)")
+
+            agg_time, agg_mem = measure(Session, aggregated)
+            if args.no_legacy:
+                legacy = "-", "-"
+            else:
+                legacy_time, legacy_mem = measure(Session, legacy_live_summary)
+                legacy = f"{legacy_time:.2f}", f"{legacy_mem:.1f}"
+            print(f"{size:>10} {agg_time:>12.3f} {agg_mem:>13.2f} {legacy[0]:>10} {legacy[1]:>10}")
+
+        engine.dispose()
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
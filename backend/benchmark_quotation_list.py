@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Benchmark for GET /api/quotations/.
+
+Builds a scratch database of synthetic quotations with several items each,
+then times one page of the list in summary mode, with include=items, and
+the old row-by-row implementation (a lazy load per client, vehicle and item
+list, and Pydantic validation of every item), counting the SQL statements
+each one runs.
+
+Usage: python benchmark_quotation_list.py [--quotations 10000] [--items 10] [--page 100] [--repeat 5]
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import argparse
+import random
+import shutil
+import statistics
+import tempfile
+import time
+import warnings
+from datetime import datetime, timedelta
+
+from sqlalchemy import event
+from sqlalchemy.orm import sessionmaker
+
+from database.database import Base, create_sqlite_engine
+from models.models import Client, Quotation, QuotationItem, Vehicle
+from routers.quotations import QuotationItemResponse, QuotationResponse, get_quotations
+
+STATUSES = ["pending", "pending", "accepted", "rejected", "converted", "expired"]
+
+def seed(engine, quotations: int, items: int, clients: int):
+    rng = random.Random(0)
+    now = datetime.now()
+    with engine.begin() as conn:
+        conn.execute(Client.__table__.insert(), [
+            {"name": f"Client {i}", "phone": f"9{i:09d}"} for i in range(clients)
+        ])
+        conn.execute(Vehicle.__table__.insert(), [
+            {"client_id": i + 1, "registration_number": f"TN{i:02d}BX{i:05d}"} for i in range(clients)
+        ])
+
+        for start in range(0, quotations, 1000):
+            batch = []
+            for i in range(start, min(start + 1000, quotations)):
+                owner = rng.randint(1, clients)
+                batch.append({
+                    "id": i + 1,
+                    "quotation_number": f"QT-{i + 1:06d}",
+                    "client_id": owner,
+                    "vehicle_id": owner,
+                    "quotation_date": now - timedelta(days=rng.randint(0, 365)),
+                    "valid_until": now + timedelta(days=30),
+                    "subtotal": 0.0,
+                    "total_amount": 0.0,
+                    "status": rng.choice(STATUSES),
+                    "root_id": i + 1,
+                    "version": 1,
+                    "latest_version": 1,
+                })
+            conn.execute(Quotation.__table__.insert(), batch)
+            conn.execute(QuotationItem.__table__.insert(), [
+                {
+                    "quotation_id": row["id"],
+                    "item_type": "part" if n % 3 == 0 else "service",
+                    "name": f"Item {n}",
+                    "quantity": 1.0,
+                    "rate": 100.0 * (n + 1),
+                    "discount": 0.0,
+                    "tax_rate": 18.0,
+                    "total": 100.0 * (n + 1),
+                }
+                for row in batch for n in range(items)
+            ])
+
+def legacy_list(db, skip: int, limit: int):
+    """The old implementation: lazy loads and Pydantic validation per row"""
+    warnings.filterwarnings("ignore", message=".*from_orm.*")
+    result = []
+    for quotation in db.query(Quotation).offset(skip).limit(limit).all():
+        quotation_dict = QuotationResponse.from_orm(quotation).__dict__
+        if quotation.client:
+            quotation_dict["client_name"] = quotation.client.name
+        if quotation.vehicle:
+            quotation_dict["vehicle_registration"] = quotation.vehicle.registration_number
+        quotation_dict["items"] = [QuotationItemResponse.from_orm(item).__dict__ for item in quotation.items]
+        result.append(quotation_dict)
+    return result
+
+def measure(Session, statements: list, run, repeat: int) -> tuple:
+    """(median ms, statements per call, rows) over repeat calls, each on a fresh session"""
+    timings = []
+    for _ in range(repeat):
+        db = Session()
+        try:
+            statements.clear()
+            start = time.perf_counter()
+            rows = run(db)
+            timings.append((time.perf_counter() - start) * 1000)
+        finally:
+            db.close()
+    return statistics.median(timings), len(statements), len(rows)
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the quotation list")
+    parser.add_argument("--quotations", type=int, default=10000)
+    parser.add_argument("--items", type=int, default=10)
+    parser.add_argument("--clients", type=int, default=2000)
+    parser.add_argument("--page", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp(prefix="quotation_list_bench_")
+    try:
+        engine = create_sqlite_engine(f"sqlite:///{os.path.join(work_dir, 'bench.db')}")
+        Base.metadata.create_all(bind=engine)
+        Session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+        start = time.perf_counter()
+        seed(engine, args.quotations, args.items, args.clients)
+        with engine.begin() as conn:
+            conn.exec_driver_sql("ANALYZE")
+        print(f"Seeded {args.quotations} quotations x {args.items} items in {time.perf_counter() - start:.1f}s")
+
+        statements = []
+        event.listen(engine, "before_cursor_execute", lambda *a: statements.append(1))
+
+        # A page from the middle of the table
+        skip = args.quotations // 2
+        list_page = lambda include: lambda db: get_quotations(
+            skip=skip, limit=args.page, search=None, status=None, include=include, db=db, current_user=None
+        )
+        runs = [
+            ("summary", list_page(None)),
+            ("include=items", list_page("items")),
+            ("legacy", lambda db: legacy_list(db, skip, args.page)),
+        ]
+
+        print(f"{'mode':>14} {'median ms':>10} {'queries':>8} {'rows':>6}")
+        for label, run in runs:
+            elapsed, queries, rows = measure(Session, statements, run, args.repeat)
+            print(f"{label:>14} {elapsed:>10.1f} {queries:>8} {rows:>6}")
+
+        engine.dispose()
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Benchmark application startup on a fresh database (cold) and on the
+database the previous run left behind (warm).
+
+Each run is a new interpreter in a scratch directory, so module import,
+schema creation, seeding and the startup event are all counted.
+
+Usage: python benchmark_startup.py [--runs 5] [--dir PATH]
+"""
+
+import sys
+import os
+
+import argparse
+import json
+import shutil
+import statistics
+import subprocess
+import tempfile
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Runs inside the scratch directory; prints the phase timings as JSON
+CHILD = """
+import asyncio, contextlib, io, json, sys, time
+sys.path.insert(0, {backend!r})
+started = time.perf_counter()
+with contextlib.redirect_stdout(io.StringIO()):
+    import main
+    imported = time.perf_counter()
+    asyncio.run(main.startup_event())
+finished = time.perf_counter()
+print(json.dumps({{"import": imported - started, "startup": finished - imported, "total": finished - started}}))
+"""
+
+def run_once(directory: str) -> dict:
+    env = dict(os.environ)
+    env.pop("DATABASE_URL", None)  # Use the default ./database/car_service_center.db in the scratch dir
+    env["SCHEDULER_ENABLED"] = "0"  # Sweeps run after startup, not as part of it
+    result = subprocess.run(
+        [sys.executable, "-c", CHILD.format(backend=BACKEND_DIR)],
+        cwd=directory, env=env, capture_output=True, text=True, check=True
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+def summarize(label: str, runs: list):
+    print(f"{label}:")
+    for phase in ("import", "startup", "total"):
+        values = [run[phase] * 1000 for run in runs]
+        print(f"  {phase:8s} median {statistics.median(values):8.1f} ms   min {min(values):8.1f} ms")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark cold and warm application startup")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--dir", help="Directory for the scratch databases (default: system temp)")
+    args = parser.parse_args()
+
+    cold, warm = [], []
+    for _ in range(args.runs):
+        directory = tempfile.mkdtemp(prefix="startup-bench-", dir=args.dir)
+        try:
+            cold.append(run_once(directory))
+            warm.append(run_once(directory))
+        finally:
+            shutil.rmtree(directory, ignore_errors=True)
+
+    summarize("Cold start (fresh database)", cold)
+    summarize("Warm start (existing database)", warm)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+Shared pytest fixtures: the API runs against a scratch SQLite database with
+the job scheduler off and the PDF cache alongside it, so tests never touch
+database/car_service_center.db
+"""
+
+import sys
+import os
+import itertools
+import shutil
+import tempfile
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+# Before database.database is imported anywhere
+_work_dir = tempfile.mkdtemp(prefix="car_service_tests_")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_work_dir, 'test.db')}"
+os.environ["SCHEDULER_ENABLED"] = "0"
+os.environ["PDF_CACHE_DIR"] = os.path.join(_work_dir, "pdf_cache")
+
+import pytest
+
+_sequence = itertools.count(1)
+
+@pytest.fixture(scope="session")
+def client():
+    from fastapi.testclient import TestClient
+    import main
+
+    with TestClient(main.app) as test_client:
+        yield test_client
+    shutil.rmtree(_work_dir, ignore_errors=True)
+
+@pytest.fixture(scope="session")
+def headers(client):
+    response = client.post("/api/auth/token", data={"username": "admin", "password": "Avan@123"})
+    assert response.status_code == 200, response.text
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+@pytest.fixture
+def db(client):
+    from database.database import SessionLocal
+
+    session = SessionLocal()
+    yield session
+    session.close()
+
+@pytest.fixture
+def customer(client, headers):
+    """(client_id, vehicle_id) of a new client with one vehicle"""
+    n = next(_sequence)
+    response = client.post("/api/clients/", json={"name": f"Test Client {n}", "phone": f"90000{n:05d}"}, headers=headers)
+    assert response.status_code == 200, response.text
+    client_id = response.json()["id"]
+    response = client.post("/api/vehicles/", json={
+        "client_id": client_id, "model_id": 1, "registration_number": f"TN99ZZ{n:04d}"
+    }, headers=headers)
+    assert response.status_code == 200, response.text
+    return client_id, response.json()["id"]
+
+@pytest.fixture
+def invoice_body(customer):
+    """Body for POST/PUT /api/invoices/ of a 1000 + 18% GST service invoice"""
+    client_id, vehicle_id = customer
+    return {
+        "client_id": client_id,
+        "vehicle_id": vehicle_id,
+        "taxable_amount": 1000,
+        "cgst_amount": 90,
+        "sgst_amount": 90,
+        "total_amount": 1180,
+        "items": [{"item_type": "service", "name": "General Service", "rate": 1000, "quantity": 1, "total": 1000}],
+    }
+
+@pytest.fixture
+def rollup_matches_rebuild(db):
+    """Check the incrementally maintained revenue rollup against a rebuild from the invoices"""
+    from models.models import DailyRevenueRollup
+    from services.revenue_rollup import rebuild_daily_revenue_rollup
+
+    def rows():
+        return sorted(
+            (row.day, row.payment_status, row.gst_type, row.invoice_count,
+             round(row.total_amount, 2), round(row.tax_amount, 2), round(row.paid_amount, 2))
+            for row in db.query(DailyRevenueRollup).all() if row.invoice_count
+        )
+
+    def check() -> bool:
+        db.expire_all()
+        maintained = rows()
+        rebuild_daily_revenue_rollup(db)
+        db.flush()
+        rebuilt = rows()
+        db.rollback()
+        return maintained == rebuilt
+
+    return check
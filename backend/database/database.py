@@ -1,30 +1,146 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event, inspect
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+from typing import Optional
 import os
 
-# SQLite database configuration
-DATABASE_URL = "sqlite:///./database/car_service_center.db"
+# Database configuration: SQLite file by default, PostgreSQL via DATABASE_URL
+DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./database/car_service_center.db")
+if DATABASE_URL.startswith("postgres://"):
+    # Hosting providers still hand out the old scheme name
+    DATABASE_URL = "postgresql://" + DATABASE_URL[len("postgres://"):]
+
+# SQLite tuning, overridable from the environment
+SQLITE_JOURNAL_MODE = os.getenv("SQLITE_JOURNAL_MODE", "WAL")
+SQLITE_SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))  # bytes
+SQLITE_CACHE_SIZE = int(os.getenv("SQLITE_CACHE_SIZE", "-65536"))  # negative = KiB, i.e. 64 MB
+SQLITE_BUSY_TIMEOUT = int(os.getenv("SQLITE_BUSY_TIMEOUT", "10000"))  # milliseconds
+
+# Connection pool, per worker process: one connection per concurrent request thread
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = int(os.getenv("DB_POOL_TIMEOUT", "30"))  # seconds
 
 # Create database directory if it doesn't exist
 os.makedirs("database", exist_ok=True)
 
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    """Apply the tuning pragmas to every new SQLite connection"""
+    cursor = dbapi_connection.cursor()
+    cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT}")
+    cursor.execute(f"PRAGMA journal_mode={SQLITE_JOURNAL_MODE}")
+    cursor.execute(f"PRAGMA synchronous={SQLITE_SYNCHRONOUS}")
+    cursor.execute(f"PRAGMA mmap_size={SQLITE_MMAP_SIZE}")
+    cursor.execute(f"PRAGMA cache_size={SQLITE_CACHE_SIZE}")
+    cursor.close()
+
+def create_sqlite_engine(url: str = DATABASE_URL, pool_size: int = DB_POOL_SIZE,
+                         max_overflow: int = DB_MAX_OVERFLOW):
+    """
+    Create a SQLite engine with WAL and the pragmas above applied on connect.
+
+    WAL lets readers run alongside the single writer and busy_timeout makes a
+    second writer wait instead of failing with "database is locked".
+    """
+    engine = create_engine(
+        url,
+        connect_args={"check_same_thread": False},  # SQLite specific
+        poolclass=QueuePool,
+        pool_size=pool_size,
+        max_overflow=max_overflow,
+        pool_timeout=DB_POOL_TIMEOUT
+    )
+    event.listen(engine, "connect", _set_sqlite_pragmas)
+    return engine
+
+def create_database_engine(url: str = DATABASE_URL):
+    """Synchronous engine for DATABASE_URL (SQLite or PostgreSQL)"""
+    if url.startswith("sqlite"):
+        return create_sqlite_engine(url)
+    return create_engine(
+        url,
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_timeout=DB_POOL_TIMEOUT,
+        pool_pre_ping=True
+    )
+
+def async_database_url(url: str = DATABASE_URL) -> str:
+    """Map a sync DATABASE_URL onto its async driver (aiosqlite / asyncpg)"""
+    scheme, rest = url.split("://", 1)
+    dialect = scheme.split("+", 1)[0]
+    driver = {"sqlite": "sqlite+aiosqlite", "postgresql": "postgresql+asyncpg"}.get(dialect)
+    if driver is None:
+        raise ValueError(f"No async driver configured for {dialect} databases")
+    return f"{driver}://{rest}"
+
+def create_async_database_engine(url: str = DATABASE_URL):
+    """Async engine for DATABASE_URL, tuned the same way as the sync one"""
+    is_sqlite = url.startswith("sqlite")
+    new_engine = create_async_engine(
+        async_database_url(url),
+        poolclass=AsyncAdaptedQueuePool,
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_timeout=DB_POOL_TIMEOUT,
+        pool_pre_ping=not is_sqlite
+    )
+    if is_sqlite:
+        event.listen(new_engine.sync_engine, "connect", _set_sqlite_pragmas)
+    return new_engine
+
 # Create engine
-engine = create_engine(
-    DATABASE_URL,
-    connect_args={"check_same_thread": False}  # SQLite specific
-)
+engine = create_database_engine()
 
 # Create session factory
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# The async engine is created on first use so scripts that only need the
+# sync engine do not require the async drivers
+async_engine = None
+_AsyncSessionLocal: Optional[async_sessionmaker] = None
+
+def get_async_sessionmaker() -> async_sessionmaker:
+    global async_engine, _AsyncSessionLocal
+    if _AsyncSessionLocal is None:
+        async_engine = create_async_database_engine()
+        _AsyncSessionLocal = async_sessionmaker(async_engine, class_=AsyncSession, expire_on_commit=False)
+    return _AsyncSessionLocal
+
+async def dispose_async_engine():
+    global async_engine, _AsyncSessionLocal
+    if async_engine is not None:
+        await async_engine.dispose()
+    async_engine = None
+    _AsyncSessionLocal = None
+
 # Base class for models
 Base = declarative_base()
 
-# Dependency to get database session
-def get_database_session():
+def ensure_schema(bind=None):
+    """
+    Create the model tables that do not exist yet. When they all exist this
+    costs a single table-list query instead of a check per table.
+    """
+    bind = bind or engine
+    if not set(Base.metadata.tables) <= set(inspect(bind).get_table_names()):
+        Base.metadata.create_all(bind=bind)
+
+# Dependency to get database session (sync handlers, run in the threadpool)
+def get_db():
     db = SessionLocal()
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+get_database_session = get_db
+
+# Dependency to get an async database session (async handlers)
+async def get_async_db():
+    async with get_async_sessionmaker()() as db:
+        yield db
+
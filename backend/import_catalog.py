@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""
+Import parts or services from a CSV or JSON Lines file, updating rows that
+already exist (parts by part_number, services by name).
+
+Usage: python import_catalog.py parts|services FILE [--format csv|jsonl] [--batch-size N]
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import argparse
+import time
+
+from database.database import SessionLocal
+from services.catalog_import import (
+    CATALOG_IMPORT_BATCH_SIZE, FORMATS, IMPORT_ENTITIES, CatalogImport, format_for_filename, read_records
+)
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk import parts or services")
+    parser.add_argument("entity", choices=list(IMPORT_ENTITIES))
+    parser.add_argument("file")
+    parser.add_argument("--format", choices=FORMATS)
+    parser.add_argument("--batch-size", type=int, default=CATALOG_IMPORT_BATCH_SIZE)
+    args = parser.parse_args()
+
+    fmt = args.format or format_for_filename(args.file)
+    if fmt is None:
+        parser.error("cannot tell the format from the file name; pass --format")
+
+    db = SessionLocal()
+    try:
+        started = time.perf_counter()
+        with open(args.file, "rb") as stream:
+            report = CatalogImport(db, args.entity, args.batch_size).run(read_records(stream, fmt))
+        elapsed = time.perf_counter() - started
+    except Exception as e:
+        db.rollback()
+        print(f"Error: {e}")
+        sys.exit(1)
+    finally:
+        db.close()
+
+    print(f"Processed {report['processed']} rows in {elapsed:.2f}s: "
+          f"{report['inserted']} inserted, {report['updated']} updated, {report['merged']} merged, {report['failed']} failed")
+    for error in report["errors"][:20]:
+        print(f"  line {error['line']}: {error['error']}")
+    if report["failed"] > 20:
+        print(f"  ... and {report['failed'] - 20} more")
+
+if __name__ == "__main__":
+    main()
@@ -6,13 +6,21 @@ from datetime import datetime, timedelta
 from typing import Optional
 import uvicorn
 
-from database.database import SessionLocal, engine, Base
+from database.database import SessionLocal, engine, dispose_async_engine, ensure_schema
 from models import models
 from auth import auth
-from routers import clients, vehicles, services, invoices, quotations, dashboard, reports
-
-# Create database tables
-Base.metadata.create_all(bind=engine)
+from auth.passwords import shutdown_password_pool
+from routers import clients, vehicles, services, invoices, quotations, dashboard, reports, pdf, search
+from services.cache import AGGREGATES, invalidate as invalidate_cache
+from services.pdf_service import shutdown_render_pool
+from services.revenue_rollup import rebuild_daily_revenue_rollup, rollup_is_empty
+from services.scheduler import start_scheduler, stop_scheduler
+from services.search_index import ensure_search_index
+from services.service_catalog import ensure_catalog_version
+from services.vehicle_catalog import load_vehicle_catalog
+
+# Create any missing database tables
+ensure_schema(engine)
 
 app = FastAPI(
     title="Car Service Center Billing Software",
@@ -40,6 +48,18 @@ async def add_cors_headers(request: Request, call_next):
     response.headers["Access-Control-Allow-Credentials"] = "true"
     return response
 
+# Writes under these prefixes change the cached dashboard/report aggregates
+AGGREGATE_SOURCE_PREFIXES = ("/api/invoices", "/api/clients", "/api/vehicles", "/api/quotations")
+
+@app.middleware("http")
+async def invalidate_aggregate_cache(request: Request, call_next):
+    response = await call_next(request)
+    if (request.method in ("POST", "PUT", "PATCH", "DELETE")
+            and response.status_code < 400
+            and request.url.path.startswith(AGGREGATE_SOURCE_PREFIXES)):
+        invalidate_cache(AGGREGATES)
+    return response
+
 # Include routers
 app.include_router(auth.router, prefix="/api/auth", tags=["Authentication"])
 app.include_router(clients.router, prefix="/api/clients", tags=["Clients"])
@@ -49,6 +69,8 @@ app.include_router(invoices.router, prefix="/api/invoices", tags=["Invoices"])
 app.include_router(quotations.router, prefix="/api/quotations", tags=["Quotations"])
 app.include_router(dashboard.router, prefix="/api/dashboard", tags=["Dashboard"])
 app.include_router(reports.router, prefix="/api/reports", tags=["Reports"])
+app.include_router(pdf.router, prefix="/api/pdf", tags=["PDF"])
+app.include_router(search.router, prefix="/api/search", tags=["Search"])
 
 
 # Dependency
@@ -81,193 +103,15 @@ async def initialize_data_manually():
     """Manually initialize sample data"""
     db = SessionLocal()
     try:
-        from models.models import VehicleBrand, VehicleModel
+        from models.models import VehicleBrand
+        from utils.data_initializer import seed_reference_data
 
         # Check if brands already exist
         existing_brands = db.query(VehicleBrand).count()
         if existing_brands > 0:
             return {"message": f"Data already exists ({existing_brands} brands). Use /admin/init-data-force to reinitialize."}
 
-        # Comprehensive brands and models data
-        brands_data = [
-            {
-                "name": "Maruti Suzuki",
-                "country": "India",
-                "models": ["Omni", "Gypsy", "Esteem", "Zen", "Baleno", "Alto", "WagonR", "Versa", "Swift", "Swift Dzire", "A-Star", "SX4", "Ritz", "Ertiga", "Celerio", "Ciaz", "Ignis", "XL6", "Fronx", "Grand Vitara", "Jimny", "S-Presso", "Vitara Brezza", "Brezza"]
-            },
-            {
-                "name": "Hyundai",
-                "country": "South Korea",
-                "models": ["Santros", "Accent", "Elantra", "Sonata", "Getz", "i10", "i20", "Eon", "Verna", "Creta", "Venue", "Tucson", "Alcazar", "Aura", "Grand i10", "Grand i10 Nios", "Kona Electric", "Ioniq 5"]
-            },
-            {
-                "name": "Tata Motors",
-                "country": "India",
-                "models": ["Sierra", "Estate", "Sumo", "Indica", "Indigo", "Safari", "Manza", "Zest", "Bolt", "Tiago", "Tigor", "Altroz", "Punch", "Harrier", "Nexon", "Nexon EV", "Tiago EV", "Tigor EV"]
-            },
-            {
-                "name": "Mahindra",
-                "country": "India",
-                "models": ["Armada", "Marshal", "Bolero", "Scorpio", "Scorpio-N", "Scorpio Classic", "Xylo", "TUV300", "KUV100", "XUV300", "XUV500", "XUV700", "Thar", "Quanto", "Verito", "Logan"]
-            },
-            {
-                "name": "Honda",
-                "country": "Japan",
-                "models": ["City", "Civic", "Accord", "Jazz", "CR-V", "BR-V", "Amaze", "WR-V", "Brio"]
-            },
-            {
-                "name": "Toyota",
-                "country": "Japan",
-                "models": ["Qualis", "Corolla", "Camry", "Innova", "Innova Crysta", "Fortuner", "Etios", "Etios Liva", "Urban Cruiser", "Rumion", "Glanza", "Hyryder", "Vellfire", "Land Cruiser"]
-            },
-            {
-                "name": "Ford",
-                "country": "USA",
-                "models": ["Escort", "Ikon", "Fusion", "Endeavour", "Figo", "Figo Aspire", "EcoSport", "Fiesta"]
-            },
-            {
-                "name": "Chevrolet",
-                "country": "USA",
-                "models": ["Optra", "Aveo", "Aveo UVA", "Spark", "Beat", "Cruze", "Tavera", "Enjoy", "Sail", "Sail UVA"]
-            },
-            {
-                "name": "Renault",
-                "country": "France",
-                "models": ["Fluence", "Koleos", "Duster", "Kwid", "Triber", "Kiger", "Lodgy"]
-            },
-            {
-                "name": "Nissan",
-                "country": "Japan",
-                "models": ["Micra", "Micra Active", "Sunny", "Terrano", "Kicks", "Magnite"]
-            },
-            {
-                "name": "Skoda",
-                "country": "Czech Republic",
-                "models": ["Octavia", "Superb", "Laura", "Fabia", "Rapid", "Kodiaq", "Kushaq", "Slavia"]
-            },
-            {
-                "name": "Volkswagen",
-                "country": "Germany",
-                "models": ["Polo", "Vento", "Jetta", "Passat", "Tiguan", "Taigun", "Virtus"]
-            },
-            {
-                "name": "MG Motor",
-                "country": "UK/China",
-                "models": ["Hector", "Hector Plus", "Astor", "ZS EV", "Gloster", "Comet EV"]
-            },
-            {
-                "name": "Kia",
-                "country": "South Korea",
-                "models": ["Seltos", "Sonet", "Carens", "EV6"]
-            },
-            {
-                "name": "Fiat",
-                "country": "Italy",
-                "models": ["Palio", "Siena", "Linea", "Punto", "Punto EVO", "Abarth Punto", "Avventura"]
-            },
-            {
-                "name": "Jeep",
-                "country": "USA",
-                "models": ["Compass", "Meridian"]
-            },
-            {
-                "name": "Mercedes-Benz",
-                "country": "Germany",
-                "models": ["A-Class", "B-Class", "C-Class", "E-Class", "S-Class", "CLA", "CLS", "GLA", "GLC", "GLE", "GLS", "AMG GT"]
-            },
-            {
-                "name": "BMW",
-                "country": "Germany",
-                "models": ["1 Series", "3 Series", "5 Series", "7 Series", "X1", "X3", "X5", "X7", "Z4"]
-            },
-            {
-                "name": "Audi",
-                "country": "Germany",
-                "models": ["A3", "A4", "A6", "A8", "Q3", "Q5", "Q7", "Q8", "RS models"]
-            },
-            {
-                "name": "Volvo",
-                "country": "Sweden",
-                "models": ["S60", "S90", "XC40", "XC60", "XC90"]
-            },
-            {
-                "name": "Porsche",
-                "country": "Germany",
-                "models": ["911", "Cayenne", "Cayman", "Panamera", "Macan"]
-            },
-            {
-                "name": "Jaguar",
-                "country": "UK",
-                "models": ["XE", "XF", "XJ", "F-Pace", "F-Type", "I-Pace"]
-            },
-            {
-                "name": "Land Rover",
-                "country": "UK",
-                "models": ["Defender", "Discovery", "Range Rover", "Range Rover Sport", "Range Rover Evoque", "Range Rover Velar"]
-            },
-            {
-                "name": "BYD",
-                "country": "China",
-                "models": ["e6", "Atto 3", "Seal"]
-            },
-            {
-                "name": "Citroën",
-                "country": "France",
-                "models": ["C3", "C3 Aircross", "ëC3"]
-            },
-            {
-                "name": "Lexus",
-                "country": "Japan",
-                "models": ["ES", "NX", "RX", "LX"]
-            },
-            {
-                "name": "Isuzu",
-                "country": "Japan",
-                "models": ["D-Max V-Cross", "MU-X"]
-            },
-            {
-                "name": "Mitsubishi",
-                "country": "Japan",
-                "models": ["Lancer", "Cedia", "Outlander", "Pajero", "Pajero Sport", "Montero"]
-            },
-            {
-                "name": "Hindustan Motors",
-                "country": "India",
-                "models": ["Ambassador", "Contessa"]
-            },
-            {
-                "name": "Premier",
-                "country": "India",
-                "models": ["Padmini", "Rio"]
-            },
-            {
-                "name": "Opel",
-                "country": "Germany",
-                "models": ["Astra", "Corsa"]
-            }
-        ]
-
-        for brand_info in brands_data:
-            # Create brand
-            brand = VehicleBrand(
-                name=brand_info["name"],
-                country=brand_info["country"]
-            )
-            db.add(brand)
-            db.flush()
-
-            # Create models
-            for model_name in brand_info["models"]:
-                model = VehicleModel(
-                    brand_id=brand.id,
-                    name=model_name,
-                    year_start=2010,
-                    fuel_type="Petrol",
-                    transmission="Manual"
-                )
-                db.add(model)
-
-        db.commit()
+        seed_reference_data(db, force=True)
         return {"message": "Vehicle brands and models initialized successfully!"}
 
     except Exception as e:
@@ -281,193 +125,9 @@ async def initialize_data_force():
     """Force reinitialize all vehicle brands and models data"""
     db = SessionLocal()
     try:
-        from models.models import VehicleBrand, VehicleModel
-
-        # Clear existing data
-        db.query(VehicleModel).delete()
-        db.query(VehicleBrand).delete()
-        db.commit()
-
-        # Comprehensive brands and models data
-        brands_data = [
-            {
-                "name": "Maruti Suzuki",
-                "country": "India",
-                "models": ["Omni", "Gypsy", "Esteem", "Zen", "Baleno", "Alto", "WagonR", "Versa", "Swift", "Swift Dzire", "A-Star", "SX4", "Ritz", "Ertiga", "Celerio", "Ciaz", "Ignis", "XL6", "Fronx", "Grand Vitara", "Jimny", "S-Presso", "Vitara Brezza", "Brezza"]
-            },
-            {
-                "name": "Hyundai",
-                "country": "South Korea",
-                "models": ["Santros", "Accent", "Elantra", "Sonata", "Getz", "i10", "i20", "Eon", "Verna", "Creta", "Venue", "Tucson", "Alcazar", "Aura", "Grand i10", "Grand i10 Nios", "Kona Electric", "Ioniq 5"]
-            },
-            {
-                "name": "Tata Motors",
-                "country": "India",
-                "models": ["Sierra", "Estate", "Sumo", "Indica", "Indigo", "Safari", "Manza", "Zest", "Bolt", "Tiago", "Tigor", "Altroz", "Punch", "Harrier", "Nexon", "Nexon EV", "Tiago EV", "Tigor EV"]
-            },
-            {
-                "name": "Mahindra",
-                "country": "India",
-                "models": ["Armada", "Marshal", "Bolero", "Scorpio", "Scorpio-N", "Scorpio Classic", "Xylo", "TUV300", "KUV100", "XUV300", "XUV500", "XUV700", "Thar", "Quanto", "Verito", "Logan"]
-            },
-            {
-                "name": "Honda",
-                "country": "Japan",
-                "models": ["City", "Civic", "Accord", "Jazz", "CR-V", "BR-V", "Amaze", "WR-V", "Brio"]
-            },
-            {
-                "name": "Toyota",
-                "country": "Japan",
-                "models": ["Qualis", "Corolla", "Camry", "Innova", "Innova Crysta", "Fortuner", "Etios", "Etios Liva", "Urban Cruiser", "Rumion", "Glanza", "Hyryder", "Vellfire", "Land Cruiser"]
-            },
-            {
-                "name": "Ford",
-                "country": "USA",
-                "models": ["Escort", "Ikon", "Fusion", "Endeavour", "Figo", "Figo Aspire", "EcoSport", "Fiesta"]
-            },
-            {
-                "name": "Chevrolet",
-                "country": "USA",
-                "models": ["Optra", "Aveo", "Aveo UVA", "Spark", "Beat", "Cruze", "Tavera", "Enjoy", "Sail", "Sail UVA"]
-            },
-            {
-                "name": "Renault",
-                "country": "France",
-                "models": ["Fluence", "Koleos", "Duster", "Kwid", "Triber", "Kiger", "Lodgy"]
-            },
-            {
-                "name": "Nissan",
-                "country": "Japan",
-                "models": ["Micra", "Micra Active", "Sunny", "Terrano", "Kicks", "Magnite"]
-            },
-            {
-                "name": "Skoda",
-                "country": "Czech Republic",
-                "models": ["Octavia", "Superb", "Laura", "Fabia", "Rapid", "Kodiaq", "Kushaq", "Slavia"]
-            },
-            {
-                "name": "Volkswagen",
-                "country": "Germany",
-                "models": ["Polo", "Vento", "Jetta", "Passat", "Tiguan", "Taigun", "Virtus"]
-            },
-            {
-                "name": "MG Motor",
-                "country": "UK/China",
-                "models": ["Hector", "Hector Plus", "Astor", "ZS EV", "Gloster", "Comet EV"]
-            },
-            {
-                "name": "Kia",
-                "country": "South Korea",
-                "models": ["Seltos", "Sonet", "Carens", "EV6"]
-            },
-            {
-                "name": "Fiat",
-                "country": "Italy",
-                "models": ["Palio", "Siena", "Linea", "Punto", "Punto EVO", "Abarth Punto", "Avventura"]
-            },
-            {
-                "name": "Jeep",
-                "country": "USA",
-                "models": ["Compass", "Meridian"]
-            },
-            {
-                "name": "Mercedes-Benz",
-                "country": "Germany",
-                "models": ["A-Class", "B-Class", "C-Class", "E-Class", "S-Class", "CLA", "CLS", "GLA", "GLC", "GLE", "GLS", "AMG GT"]
-            },
-            {
-                "name": "BMW",
-                "country": "Germany",
-                "models": ["1 Series", "3 Series", "5 Series", "7 Series", "X1", "X3", "X5", "X7", "Z4"]
-            },
-            {
-                "name": "Audi",
-                "country": "Germany",
-                "models": ["A3", "A4", "A6", "A8", "Q3", "Q5", "Q7", "Q8", "RS models"]
-            },
-            {
-                "name": "Volvo",
-                "country": "Sweden",
-                "models": ["S60", "S90", "XC40", "XC60", "XC90"]
-            },
-            {
-                "name": "Porsche",
-                "country": "Germany",
-                "models": ["911", "Cayenne", "Cayman", "Panamera", "Macan"]
-            },
-            {
-                "name": "Jaguar",
-                "country": "UK",
-                "models": ["XE", "XF", "XJ", "F-Pace", "F-Type", "I-Pace"]
-            },
-            {
-                "name": "Land Rover",
-                "country": "UK",
-                "models": ["Defender", "Discovery", "Range Rover", "Range Rover Sport", "Range Rover Evoque", "Range Rover Velar"]
-            },
-            {
-                "name": "BYD",
-                "country": "China",
-                "models": ["e6", "Atto 3", "Seal"]
-            },
-            {
-                "name": "Citroën",
-                "country": "France",
-                "models": ["C3", "C3 Aircross", "ëC3"]
-            },
-            {
-                "name": "Lexus",
-                "country": "Japan",
-                "models": ["ES", "NX", "RX", "LX"]
-            },
-            {
-                "name": "Isuzu",
-                "country": "Japan",
-                "models": ["D-Max V-Cross", "MU-X"]
-            },
-            {
-                "name": "Mitsubishi",
-                "country": "Japan",
-                "models": ["Lancer", "Cedia", "Outlander", "Pajero", "Pajero Sport", "Montero"]
-            },
-            {
-                "name": "Hindustan Motors",
-                "country": "India",
-                "models": ["Ambassador", "Contessa"]
-            },
-            {
-                "name": "Premier",
-                "country": "India",
-                "models": ["Padmini", "Rio"]
-            },
-            {
-                "name": "Opel",
-                "country": "Germany",
-                "models": ["Astra", "Corsa"]
-            }
-        ]
-
-        for brand_info in brands_data:
-            # Create brand
-            brand = VehicleBrand(
-                name=brand_info["name"],
-                country=brand_info["country"]
-            )
-            db.add(brand)
-            db.flush()
-
-            # Create models
-            for model_name in brand_info["models"]:
-                model = VehicleModel(
-                    brand_id=brand.id,
-                    name=model_name,
-                    year_start=2010,
-                    fuel_type="Petrol",
-                    transmission="Manual"
-                )
-                db.add(model)
-
-        db.commit()
+        from utils.data_initializer import reseed_vehicle_data
+
+        reseed_vehicle_data(db)
         return {"message": "Vehicle brands and models force reinitialized successfully!"}
 
     except Exception as e:
@@ -480,6 +140,22 @@ async def initialize_data_force():
 async def startup_event():
     """Initialize default admin user and sample data"""
     print("STARTUP EVENT CALLED")
+    if engine.dialect.name == "sqlite":
+        # Normalized lookup columns added after the first release
+        from add_lookup_columns import add_lookup_columns
+        add_lookup_columns(engine.url.database, verbose=False)
+        # Reserved stock column and stock ledger indexes
+        from add_stock_columns import add_stock_columns
+        add_stock_columns(engine.url.database, verbose=False)
+        from add_catalog_import_indexes import add_catalog_import_indexes
+        add_catalog_import_indexes(engine.url.database, verbose=False)
+        from add_quotation_columns import add_quotation_columns
+        add_quotation_columns(engine.url.database, verbose=False)
+        from add_sweep_columns import add_sweep_columns
+        add_sweep_columns(engine.url.database, verbose=False)
+        from add_payment_ledger import add_payment_ledger
+        add_payment_ledger(engine.url.database, verbose=False)
+
     db = SessionLocal()
     try:
         print("Creating default admin user...")
@@ -491,6 +167,24 @@ async def startup_event():
         from utils.data_initializer import initialize_sample_data
         initialize_sample_data(db)
 
+        # Version counter for the services/parts catalog ETags
+        ensure_catalog_version(db)
+
+        # Warm the in-memory vehicle brand/model catalog
+        catalog = load_vehicle_catalog(db)
+        print(f"Vehicle catalog loaded: {len(catalog.brands)} brands, {len(catalog.models)} models")
+
+        # Backfill the revenue rollup the first time it is deployed
+        if rollup_is_empty(db):
+            rows = rebuild_daily_revenue_rollup(db)
+            db.commit()
+            print(f"Revenue rollup rebuilt: {rows} rows")
+
+        # Create the full-text search index and its sync triggers
+        indexed = ensure_search_index(engine)
+        if indexed is not None:
+            print(f"Search index built: {indexed} rows")
+
         print("Startup initialization completed!")
 
     except Exception as e:
@@ -498,6 +192,17 @@ async def startup_event():
     finally:
         db.close()
 
+    # Quotation expiry, overdue invoices and late fees (one worker runs them)
+    start_scheduler()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Stop the job scheduler, the PDF render and password workers, and close async database connections"""
+    await stop_scheduler()
+    shutdown_render_pool()
+    shutdown_password_pool()
+    await dispose_async_engine()
+
 if __name__ == "__main__":
     uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True)
 
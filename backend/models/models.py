@@ -1,9 +1,10 @@
-from sqlalchemy import Column, Integer, String, DateTime, Float, Text, ForeignKey, Boolean
+from sqlalchemy import Column, Integer, String, Date, DateTime, Float, Text, ForeignKey, Boolean, CheckConstraint, Index, UniqueConstraint
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import relationship, validates
 from datetime import datetime
 
 from database.database import Base
+from utils.normalization import normalize_phone, normalize_registration
 
 class User(Base):
     __tablename__ = "users"
@@ -57,10 +58,17 @@ class Client(Base):
     billing_address = Column(Text)  # Separate billing address
     pickup_drop_required = Column(Boolean, default=False)  # Vehicle pickup/drop
     created_at = Column(DateTime, default=datetime.utcnow)
+    phone_normalized = Column(String(15), index=True)   # Digits only, set from phone
+    mobile_normalized = Column(String(15), index=True)  # Digits only, set from mobile
 
     vehicles = relationship("Vehicle", back_populates="client")
     invoices = relationship("Invoice", back_populates="client")
 
+    @validates("phone", "mobile")
+    def _set_normalized_phone(self, key, value):
+        setattr(self, f"{key}_normalized", normalize_phone(value))
+        return value
+
 class Vehicle(Base):
     __tablename__ = "vehicles"
 
@@ -83,12 +91,18 @@ class Vehicle(Base):
     puc_expiry = Column(DateTime)        # PUC certificate expiry
     notes = Column(Text)                 # Additional vehicle notes
     created_at = Column(DateTime, default=datetime.utcnow)
+    registration_normalized = Column(String(20), index=True)  # Upper-case alphanumerics, set from registration_number
 
     client = relationship("Client", back_populates="vehicles")
     model = relationship("VehicleModel", back_populates="vehicles")
     service_items = relationship("ServiceItem", back_populates="vehicle")
     invoices = relationship("Invoice", back_populates="vehicle")
 
+    @validates("registration_number")
+    def _set_normalized_registration(self, key, value):
+        self.registration_normalized = normalize_registration(value)
+        return value
+
 class ServiceCategory(Base):
     __tablename__ = "service_categories"
 
@@ -103,7 +117,7 @@ class Service(Base):
 
     id = Column(Integer, primary_key=True, index=True)
     category_id = Column(Integer, ForeignKey("service_categories.id"))
-    name = Column(String(200), nullable=False)
+    name = Column(String(200), nullable=False, index=True)
     description = Column(Text)
     service_type = Column(String(50))  # General Service, Periodic Maintenance, etc.
     service_category = Column(String(50))  # Engine, Body, Electrical
@@ -130,11 +144,12 @@ class Part(Base):
     id = Column(Integer, primary_key=True, index=True)
     category_id = Column(Integer, ForeignKey("part_categories.id"))
     name = Column(String(200), nullable=False)
-    part_number = Column(String(100))  # SKU/Part Code
+    part_number = Column(String(100), index=True)  # SKU/Part Code
     hsn_code = Column(String(20))  # HSN Code for GST
     description = Column(Text)
     unit_price = Column(Float, default=0.0)
     stock_quantity = Column(Integer, default=0)
+    reserved_quantity = Column(Integer, nullable=False, default=0)  # Held by accepted quotations
     minimum_stock = Column(Integer, default=5)
     supplier = Column(String(100))
     is_oem = Column(Boolean, default=True)  # OEM vs Aftermarket
@@ -144,11 +159,14 @@ class Part(Base):
     category = relationship("PartCategory", back_populates="parts")
     invoice_parts = relationship("InvoicePart", back_populates="part")
 
+# Shortfall below the reorder point; the low-stock listing filters and sorts on it
+Index("ix_parts_stock_shortfall", Part.stock_quantity - Part.reserved_quantity - Part.minimum_stock)
+
 class Invoice(Base):
     __tablename__ = "invoices"
 
     id = Column(Integer, primary_key=True, index=True)
-    invoice_number = Column(String(20), unique=True, nullable=False)
+    invoice_number = Column(String(30), unique=True, nullable=False)
     client_id = Column(Integer, ForeignKey("clients.id"))
     vehicle_id = Column(Integer, ForeignKey("vehicles.id"))
     invoice_date = Column(DateTime, default=datetime.utcnow)
@@ -204,6 +222,7 @@ class Invoice(Base):
     payment_due_days = Column(Integer, default=30)
     late_fee_applicable = Column(Boolean, default=False)
     late_fee_amount = Column(Float, default=0.0)
+    late_fee_charged_at = Column(DateTime)  # Set when the late fee is added to the total
     early_payment_discount = Column(Float, default=0.0)
     preferred_payment_method = Column(String(50))
     credit_limit = Column(Float, default=0.0)
@@ -217,6 +236,9 @@ class Invoice(Base):
     customer_mobile_alt = Column(String(15))
     customer_email_alt = Column(String(100))
 
+    # Quotation this invoice was converted from
+    quotation_id = Column(Integer, ForeignKey("quotations.id"))
+
     notes = Column(Text)
     created_by = Column(Integer, ForeignKey("users.id"))
     created_at = Column(DateTime, default=datetime.utcnow)
@@ -225,6 +247,21 @@ class Invoice(Base):
     vehicle = relationship("Vehicle", back_populates="invoices")
     services = relationship("InvoiceService", back_populates="invoice")
     parts = relationship("InvoicePart", back_populates="invoice")
+    quotation = relationship("Quotation", back_populates="invoice")
+
+    # Composite indexes backing keyset pagination on (invoice_date, id)
+    __table_args__ = (
+        Index("ix_invoices_date_id", "invoice_date", "id"),
+        Index("ix_invoices_status_date_id", "payment_status", "invoice_date", "id"),
+        Index("ix_invoices_client_date_id", "client_id", "invoice_date", "id"),
+        Index("ix_invoices_vehicle_date_id", "vehicle_id", "invoice_date", "id"),
+        # A quotation converts to at most one invoice
+        Index("ix_invoices_quotation_id", "quotation_id", unique=True),
+        # Overdue sweep
+        Index("ix_invoices_status_due_date", "payment_status", "due_date"),
+        # Outstanding totals, summed from the index alone
+        Index("ix_invoices_status_balance", "payment_status", "balance_due"),
+    )
 
 class InvoiceService(Base):
     __tablename__ = "invoice_services"
@@ -287,15 +324,28 @@ class Quotation(Base):
     created_by = Column(Integer, ForeignKey("users.id"))
     created_at = Column(DateTime, default=datetime.utcnow)
 
+    # Version lineage: the original quotation, the version this one revises, and its number
+    root_id = Column(Integer, ForeignKey("quotations.id"))
+    parent_id = Column(Integer, ForeignKey("quotations.id"), index=True)
+    version = Column(Integer, nullable=False, default=1)
+    latest_version = Column(Integer, nullable=False, default=1)  # Highest version allocated (kept on the root)
+
     client = relationship("Client")
     vehicle = relationship("Vehicle")
     items = relationship("QuotationItem", back_populates="quotation")
+    invoice = relationship("Invoice", back_populates="quotation", uselist=False)
+
+    __table_args__ = (
+        Index("ix_quotations_root_version", "root_id", "version", unique=True),
+        # Expiry sweep
+        Index("ix_quotations_status_valid_until", "status", "valid_until"),
+    )
 
 class QuotationItem(Base):
     __tablename__ = "quotation_items"
 
     id = Column(Integer, primary_key=True, index=True)
-    quotation_id = Column(Integer, ForeignKey("quotations.id"))
+    quotation_id = Column(Integer, ForeignKey("quotations.id"), index=True)
     item_type = Column(String(20), nullable=False)  # service or part
     name = Column(String(200), nullable=False)
     hsn_sac = Column(String(20))
@@ -307,11 +357,13 @@ class QuotationItem(Base):
 
     quotation = relationship("Quotation", back_populates="items")
 
+# Append-only payment ledger: rows are never updated or deleted, corrections
+# are new (negative) entries, and invoices.paid_amount is the sum per invoice
 class Payment(Base):
     __tablename__ = "payments"
 
     id = Column(Integer, primary_key=True, index=True)
-    invoice_id = Column(Integer, ForeignKey("invoices.id"))
+    invoice_id = Column(Integer, ForeignKey("invoices.id"), index=True)
     payment_method = Column(String(20), nullable=False)  # UPI, Cash, Card, Bank Transfer
     amount = Column(Float, nullable=False)
     transaction_id = Column(String(100))  # For digital payments
@@ -344,4 +396,92 @@ class DigitalSignature(Base):
     signer_name = Column(String(100))
     signed_at = Column(DateTime, default=datetime.utcnow)
 
-    invoice = relationship("Invoice")
\ No newline at end of file
+    invoice = relationship("Invoice")
+
+class InvoiceSequence(Base):
+    __tablename__ = "invoice_sequences"
+
+    id = Column(Integer, primary_key=True)
+    year = Column(Integer, nullable=False)  # Financial year start, 2026 = FY 2026-27
+    last_number = Column(Integer, default=0)
+    prefix = Column(String(10), default="INV")
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        UniqueConstraint("year", "prefix"),
+    )
+
+class DailyRevenueRollup(Base):
+    __tablename__ = "daily_revenue_rollup"
+
+    # One row per invoice day, payment status and GST type (cgst_sgst, igst, none)
+    day = Column(Date, primary_key=True)
+    payment_status = Column(String(20), primary_key=True)
+    gst_type = Column(String(10), primary_key=True)
+    invoice_count = Column(Integer, nullable=False, default=0)
+    total_amount = Column(Float, nullable=False, default=0.0)
+    tax_amount = Column(Float, nullable=False, default=0.0)
+    paid_amount = Column(Float, nullable=False, default=0.0)
+
+class CatalogVersion(Base):
+    __tablename__ = "catalog_versions"
+
+    name = Column(String(50), primary_key=True)  # e.g. "services_parts"
+    version = Column(Integer, nullable=False, default=0)  # Bumped by every committed catalog change
+    updated_at = Column(DateTime, default=datetime.utcnow)
+
+class SchedulerLease(Base):
+    __tablename__ = "scheduler_leases"
+
+    # Held by the one worker process that runs the scheduled jobs
+    name = Column(String(50), primary_key=True)
+    owner = Column(String(100), nullable=False)
+    expires_at = Column(DateTime, nullable=False)
+
+class PdfExportJob(Base):
+    __tablename__ = "pdf_export_jobs"
+
+    # Progress of a streamed ZIP export, readable from any worker process
+    export_id = Column(String(32), primary_key=True)
+    status = Column(String(20), nullable=False, default="pending")  # pending, running, completed, interrupted
+    filters = Column(Text)  # JSON
+    total = Column(Integer, nullable=False, default=0)
+    completed = Column(Integer, nullable=False, default=0)
+    failed = Column(Text)  # JSON list of {invoice_id, error}
+    last_invoice_id = Column(Integer)
+    started_at = Column(Float, index=True)  # Unix time
+    finished_at = Column(Float)
+
+class StockMovement(Base):
+    __tablename__ = "stock_movements"
+
+    # Append-only ledger of stock changes; quantity is always positive
+    id = Column(Integer, primary_key=True, index=True)
+    part_id = Column(Integer, ForeignKey("parts.id"), nullable=False, index=True)
+    movement_type = Column(String(20), nullable=False)  # IN, OUT, ADJUSTMENT
+    quantity = Column(Integer, nullable=False)
+    reference_type = Column(String(20))  # invoice, quotation, manual
+    reference_id = Column(Integer)
+    notes = Column(Text)
+    created_by = Column(Integer, ForeignKey("users.id"))
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    part = relationship("Part")
+
+    __table_args__ = (
+        CheckConstraint("movement_type IN ('IN', 'OUT', 'ADJUSTMENT')"),
+        Index("ix_stock_movements_reference", "reference_type", "reference_id"),
+    )
+
+class StockReservation(Base):
+    __tablename__ = "stock_reservations"
+
+    id = Column(Integer, primary_key=True, index=True)
+    part_id = Column(Integer, ForeignKey("parts.id"), nullable=False, index=True)
+    quotation_id = Column(Integer, ForeignKey("quotations.id"), nullable=False, index=True)
+    quantity = Column(Integer, nullable=False)
+    status = Column(String(20), nullable=False, default="active")  # active, released, consumed
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    part = relationship("Part")
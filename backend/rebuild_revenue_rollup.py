@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+"""
+Rebuild the daily_revenue_rollup table from the invoices table.
+
+Usage: python rebuild_revenue_rollup.py [--from YYYY-MM-DD] [--to YYYY-MM-DD]
+Without a range every day is recomputed.
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import argparse
+from datetime import date
+
+from database.database import SessionLocal, engine, Base
+from models import models
+from services.revenue_rollup import rebuild_daily_revenue_rollup
+
+def main():
+    parser = argparse.ArgumentParser(description="Rebuild the daily revenue rollup")
+    parser.add_argument("--from", dest="date_from", type=date.fromisoformat, default=None)
+    parser.add_argument("--to", dest="date_to", type=date.fromisoformat, default=None)
+    args = parser.parse_args()
+
+    # Make sure the rollup table exists on databases created before it
+    Base.metadata.create_all(bind=engine)
+
+    db = SessionLocal()
+    try:
+        print("Rebuilding daily revenue rollup...")
+        rows = rebuild_daily_revenue_rollup(db, args.date_from, args.date_to)
+        db.commit()
+        print(f"Successfully wrote {rows} rollup rows!")
+    except Exception as e:
+        db.rollback()
+        print(f"Error: {e}")
+        sys.exit(1)
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,30 @@
+#!/usr/bin/env python3
+"""
+Rebuild the full-text search index from the clients, vehicles, invoices and
+quotations tables and recreate its sync triggers.
+
+Usage: python rebuild_search_index.py
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from database.database import engine
+from services.search_index import ensure_search_index, is_supported
+
+def main():
+    if not is_supported(engine):
+        print("The search index needs SQLite FTS5; other databases use substring search.")
+        return
+
+    try:
+        print("Rebuilding search index...")
+        rows = ensure_search_index(engine, rebuild=True)
+        print(f"Successfully indexed {rows} rows!")
+    except Exception as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+"""
+Check every invoice's paid_amount and balance_due against the payment
+ledger and report the ones that have drifted.
+
+Usage: python reconcile_payments.py [--apply]
+With --apply the drifted invoices are rewritten from the ledger.
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import argparse
+
+from database.database import SessionLocal
+from services.payment_ledger import reconcile_balances
+
+def main():
+    parser = argparse.ArgumentParser(description="Reconcile invoice balances with the payment ledger")
+    parser.add_argument("--apply", action="store_true", help="rewrite drifted invoices from the ledger")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        drift = reconcile_balances(db, apply=args.apply)
+        for row in drift:
+            print(
+                f"{row['invoice_number']}: paid {row['paid_amount'] or 0:.2f} vs ledger {row['ledger_paid']:.2f}, "
+                f"balance {row['balance_due'] or 0:.2f} vs {row['expected_balance']:.2f}, "
+                f"status {row['payment_status']} -> {row['expected_status']}"
+            )
+        if not drift:
+            print("All invoice balances match the payment ledger")
+        elif args.apply:
+            print(f"Successfully reconciled {len(drift)} invoices!")
+        else:
+            print(f"{len(drift)} invoices drifted; run with --apply to fix them")
+            sys.exit(1)
+    except Exception as e:
+        db.rollback()
+        print(f"Error: {e}")
+        sys.exit(1)
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    main()
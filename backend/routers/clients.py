@@ -1,20 +1,17 @@
 from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
-from typing import List, Optional
+from sqlalchemy import case, func, or_
+from typing import Dict, List, Optional, Tuple
 from pydantic import BaseModel
 
-from database.database import SessionLocal
-from models.models import Client, Vehicle, User
+from database.database import get_db
+from models.models import Client, Vehicle, Invoice, User
 from auth.auth import get_current_user, verify_password
+from services.search_index import ranked_ids, search_filter
+from utils.normalization import normalize_phone
 
 router = APIRouter()
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
 
 class ClientCreate(BaseModel):
     name: str
@@ -49,21 +46,64 @@ class ClientSearchResponse(BaseModel):
     phone: str
     mobile: Optional[str]
 
+def client_totals(db: Session, client_ids: List[int]) -> Dict[int, Tuple[int, int, float]]:
+    """
+    (total_vehicles, total_invoices, outstanding_amount) per client, from one
+    grouped query per table however many clients are asked for
+    """
+    totals = {client_id: [0, 0, 0.0] for client_id in client_ids}
+    if not client_ids:
+        return {}
+
+    vehicle_counts = db.query(Vehicle.client_id, func.count(Vehicle.id)).filter(
+        Vehicle.client_id.in_(client_ids)
+    ).group_by(Vehicle.client_id).all()
+
+    unpaid = or_(Invoice.payment_status.is_(None), Invoice.payment_status != "paid")
+    invoice_totals = db.query(
+        Invoice.client_id,
+        func.count(Invoice.id),
+        func.sum(case(
+            (unpaid, func.coalesce(Invoice.balance_due, 0)),
+            else_=0
+        ))
+    ).filter(Invoice.client_id.in_(client_ids)).group_by(Invoice.client_id).all()
+
+    for client_id, vehicle_count in vehicle_counts:
+        totals[client_id][0] = vehicle_count
+    for client_id, invoice_count, outstanding in invoice_totals:
+        totals[client_id][1] = invoice_count
+        totals[client_id][2] = float(outstanding or 0)
+    return {client_id: tuple(values) for client_id, values in totals.items()}
+
+def client_response(client: Client, totals: Tuple[int, int, float] = (0, 0, 0.0)) -> ClientResponse:
+    total_vehicles, total_invoices, outstanding_amount = totals
+    return ClientResponse(
+        id=client.id,
+        name=client.name,
+        phone=client.phone,
+        mobile=client.mobile,
+        email=client.email,
+        address=client.address,
+        city=client.city,
+        state=client.state,
+        pincode=client.pincode,
+        total_vehicles=total_vehicles,
+        total_invoices=total_invoices,
+        outstanding_amount=outstanding_amount
+    )
+
 @router.get("/search/", response_model=List[ClientSearchResponse])
-async def search_clients(
+def search_clients(
     q: str,  # Search query - required
     limit: int = 10,  # Limit for search results
     db: Session = Depends(get_db),
     current_user = Depends(get_current_user)
 ):
     """Search clients by name or mobile number for vehicle owner selection"""
-    query = db.query(Client).filter(
-        (Client.name.contains(q)) |
-        (Client.mobile.contains(q)) |
-        (Client.phone.contains(q))
-    ).limit(limit)
-
-    clients = query.all()
+    client_ids = ranked_ids(db, "client", q, limit)
+    clients_by_id = {client.id: client for client in db.query(Client).filter(Client.id.in_(client_ids))}
+    clients = [clients_by_id[client_id] for client_id in client_ids if client_id in clients_by_id]
 
     # Create simple search response objects
     result = []
@@ -78,7 +118,7 @@ async def search_clients(
     return result
 
 @router.get("/", response_model=List[ClientResponse])
-async def get_clients(
+def get_clients(
     skip: int = 0,
     limit: int = 100,
     search: Optional[str] = None,
@@ -88,41 +128,36 @@ async def get_clients(
     query = db.query(Client)
 
     if search:
-        query = query.filter(
-            (Client.name.contains(search)) |
-            (Client.phone.contains(search)) |
-            (Client.email.contains(search))
-        )
+        query = query.filter(search_filter(
+            db, "client", search,
+            fallback=(Client.name.contains(search)) | (Client.phone.contains(search)) | (Client.email.contains(search))
+        ))
 
-    clients = query.offset(skip).limit(limit).all()
+    clients = query.order_by(Client.id).offset(skip).limit(limit).all()
+    totals = client_totals(db, [client.id for client in clients])
 
-    # Add calculated fields
-    result = []
-    for client in clients:
-        client_data = {
-            "id": client.id,
-            "name": client.name,
-            "phone": client.phone,
-            "mobile": client.mobile,
-            "email": client.email,
-            "address": client.address,
-            "city": client.city,
-            "state": client.state,
-            "pincode": client.pincode,
-            "total_vehicles": len(client.vehicles),
-            "total_invoices": len(client.invoices),
-            "outstanding_amount": sum(
-                inv.total_amount - inv.paid_amount
-                for inv in client.invoices
-                if inv.payment_status != "paid"
-            )
-        }
-        result.append(client_data)
+    return [client_response(client, totals[client.id]) for client in clients]
 
-    return result
+@router.get("/by-phone/{phone}", response_model=List[ClientResponse])
+def get_clients_by_phone(
+    phone: str,
+    db: Session = Depends(get_db),
+    current_user = Depends(get_current_user)
+):
+    """Clients whose mobile or phone is this number, however it is formatted"""
+    normalized = normalize_phone(phone)
+    if not normalized:
+        raise HTTPException(status_code=400, detail="Phone number must contain digits")
+
+    clients = db.query(Client).filter(
+        (Client.mobile_normalized == normalized) | (Client.phone_normalized == normalized)
+    ).order_by(Client.id).all()
+    totals = client_totals(db, [client.id for client in clients])
+
+    return [client_response(client, totals[client.id]) for client in clients]
 
 @router.get("/{client_id}", response_model=ClientResponse)
-async def get_client(
+def get_client(
     client_id: int,
     db: Session = Depends(get_db),
     current_user = Depends(get_current_user)
@@ -131,27 +166,10 @@ async def get_client(
     if not client:
         raise HTTPException(status_code=404, detail="Client not found")
 
-    return ClientResponse(
-        id=client.id,
-        name=client.name,
-        phone=client.phone,
-        mobile=client.mobile,
-        email=client.email,
-        address=client.address,
-        city=client.city,
-        state=client.state,
-        pincode=client.pincode,
-        total_vehicles=len(client.vehicles),
-        total_invoices=len(client.invoices),
-        outstanding_amount=sum(
-            inv.total_amount - inv.paid_amount
-            for inv in client.invoices
-            if inv.payment_status != "paid"
-        )
-    )
+    return client_response(client, client_totals(db, [client.id])[client.id])
 
 @router.post("/", response_model=ClientResponse)
-async def create_client(
+def create_client(
     client: ClientCreate,
     db: Session = Depends(get_db),
     current_user = Depends(get_current_user)
@@ -163,8 +181,11 @@ async def create_client(
     if not client_data.get('mobile'):
         client_data['mobile'] = client_data['phone']
 
-    # Check if mobile number already exists (mobile is our unique identifier)
-    existing_client = db.query(Client).filter(Client.mobile == client_data['mobile']).first()
+    # Check if mobile number already exists (mobile is our unique identifier),
+    # however it was formatted
+    existing_client = db.query(Client).filter(
+        Client.mobile_normalized == normalize_phone(client_data['mobile'])
+    ).first()
     if existing_client:
         raise HTTPException(status_code=400, detail="Mobile number already exists")
 
@@ -173,23 +194,10 @@ async def create_client(
     db.commit()
     db.refresh(db_client)
 
-    return ClientResponse(
-        id=db_client.id,
-        name=db_client.name,
-        phone=db_client.phone,
-        mobile=db_client.mobile,
-        email=db_client.email,
-        address=db_client.address,
-        city=db_client.city,
-        state=db_client.state,
-        pincode=db_client.pincode,
-        total_vehicles=0,
-        total_invoices=0,
-        outstanding_amount=0.0
-    )
+    return client_response(db_client)
 
 @router.put("/{client_id}", response_model=ClientResponse)
-async def update_client(
+def update_client(
     client_id: int,
     client_update: ClientCreate,
     db: Session = Depends(get_db),
@@ -199,6 +207,14 @@ async def update_client(
     if not db_client:
         raise HTTPException(status_code=404, detail="Client not found")
 
+    mobile = normalize_phone(client_update.mobile)
+    if mobile and mobile != db_client.mobile_normalized:
+        existing_client = db.query(Client).filter(
+            Client.mobile_normalized == mobile, Client.id != client_id
+        ).first()
+        if existing_client:
+            raise HTTPException(status_code=400, detail="Mobile number already exists")
+
     # Update fields
     for field, value in client_update.dict().items():
         setattr(db_client, field, value)
@@ -206,30 +222,13 @@ async def update_client(
     db.commit()
     db.refresh(db_client)
 
-    return ClientResponse(
-        id=db_client.id,
-        name=db_client.name,
-        phone=db_client.phone,
-        mobile=db_client.mobile,
-        email=db_client.email,
-        address=db_client.address,
-        city=db_client.city,
-        state=db_client.state,
-        pincode=db_client.pincode,
-        total_vehicles=len(db_client.vehicles),
-        total_invoices=len(db_client.invoices),
-        outstanding_amount=sum(
-            inv.total_amount - inv.paid_amount
-            for inv in db_client.invoices
-            if inv.payment_status != "paid"
-        )
-    )
+    return client_response(db_client, client_totals(db, [db_client.id])[db_client.id])
 
 class DeleteRequest(BaseModel):
     password: str
 
 @router.delete("/{client_id}")
-async def delete_client(
+def delete_client(
     client_id: int,
     delete_data: DeleteRequest,
     db: Session = Depends(get_db),
@@ -254,8 +253,7 @@ async def delete_client(
         client_name = db_client.name
 
         # Check if client has vehicles or invoices
-        vehicle_count = len(db_client.vehicles)
-        invoice_count = len(db_client.invoices)
+        vehicle_count, invoice_count, _ = client_totals(db, [client_id])[client_id]
 
         if vehicle_count > 0 or invoice_count > 0:
             raise HTTPException(
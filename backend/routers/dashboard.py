@@ -1,23 +1,21 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 from sqlalchemy import func
 from datetime import datetime, timedelta
 
-from database.database import SessionLocal
+from database.database import get_db
 from models.models import Invoice, Client, Vehicle, Service
 from auth.auth import get_current_user
+from services.cache import cache_metrics, cached
+from services.revenue_rollup import monthly_totals
+from services.scheduler import scheduler
 
 router = APIRouter()
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
 
 @router.get("/stats")
-async def get_dashboard_stats(
+@cached("dashboard:stats")
+def get_dashboard_stats(
     db: Session = Depends(get_db),
     current_user = Depends(get_current_user)
 ):
@@ -41,7 +39,7 @@ async def get_dashboard_stats(
     ).scalar() or 0
 
     # Total outstanding amount
-    outstanding_amount = db.query(func.sum(Invoice.total_amount - Invoice.paid_amount)).filter(
+    outstanding_amount = db.query(func.sum(Invoice.balance_due)).filter(
         Invoice.payment_status != "paid"
     ).scalar() or 0
 
@@ -72,26 +70,36 @@ async def get_dashboard_stats(
     }
 
 @router.get("/revenue-chart")
-async def get_revenue_chart(
+def get_revenue_chart(
     db: Session = Depends(get_db),
     current_user = Depends(get_current_user)
 ):
-    # Get revenue for last 12 months
-    chart_data = []
-    for i in range(12):
-        month_start = datetime.now().replace(day=1, hour=0, minute=0, second=0, microsecond=0) - timedelta(days=30*i)
-        month_end = month_start + timedelta(days=30)
-
-        revenue = db.query(func.sum(Invoice.total_amount)).filter(
-            Invoice.invoice_date >= month_start,
-            Invoice.invoice_date < month_end,
-            Invoice.payment_status == "paid"
-        ).scalar() or 0
-
-        chart_data.append({
+    # Paid revenue for the last 12 calendar months, from the daily rollup
+    return [
+        {
             "month": month_start.strftime("%b %Y"),
             "revenue": float(revenue)
-        })
-
-    chart_data.reverse()  # Show chronological order
-    return chart_data
\ No newline at end of file
+        }
+        for month_start, revenue in monthly_totals(db, 12, payment_status="paid")
+    ]
+
+@router.get("/cache-stats")
+def get_cache_stats(current_user = Depends(get_current_user)):
+    """Hit rate of the dashboard/report response cache"""
+    return cache_metrics()
+
+@router.get("/jobs")
+def get_scheduled_jobs(current_user = Depends(get_current_user)):
+    """Scheduled sweeps: whether this worker runs them, and how their last runs went"""
+    return scheduler.status()
+
+@router.post("/jobs/{job_name}/run")
+async def run_scheduled_job(job_name: str, current_user = Depends(get_current_user)):
+    """Run a scheduled sweep now instead of waiting for its next turn"""
+    if job_name not in scheduler.jobs:
+        raise HTTPException(status_code=404, detail="Job not found")
+    changed = await scheduler.run_job(job_name)
+    job = scheduler.jobs[job_name]
+    if job.last_error:
+        raise HTTPException(status_code=500, detail=job.last_error)
+    return {"job": job_name, "changed": changed}
@@ -1,26 +1,28 @@
-from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from fastapi.responses import StreamingResponse
-from sqlalchemy.orm import Session
+from sqlalchemy import and_, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, joinedload
 from typing import List, Optional, Union
-from pydantic import BaseModel, ValidationError, validator
-from datetime import datetime
+from pydantic import BaseModel, validator
+from datetime import date, datetime, timedelta
+import base64
 import io
 import os
 import uuid
 import qrcode
 
-from database.database import SessionLocal
+from database.database import get_async_db, get_db
 from models.models import Invoice, InvoiceService, InvoicePart, Client, Vehicle, User, Payment
 from auth.auth import get_current_user, verify_password
+from services.invoice_numbers import allocate_invoice_number
+from services.payment_ledger import MONEY_TOLERANCE, InvoiceNotFound, post_payment, settled_status
+from services.pdf_export import create_export_job, export_progress, get_export_job, stream_invoice_zip
+from services.revenue_rollup import apply_rollup_change, rollup_snapshot
+from services.stock_ledger import InsufficientStockError, consume_invoice_stock, resolve_part_id, restore_invoice_stock
 
 router = APIRouter()
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
 
 class InvoiceItemCreate(BaseModel):
     item_type: Optional[str] = None  # service or part
@@ -31,6 +33,7 @@ class InvoiceItemCreate(BaseModel):
     qty: Optional[float] = None      # Alternative field name from frontend
     rate: float
     total: float
+    part_id: Optional[int] = None    # Catalog part, for stock tracking
 
 class InvoiceCreate(BaseModel):
     client_id: Union[int, str]  # Accept both int and string
@@ -161,25 +164,95 @@ class InvoiceResponse(BaseModel):
     class Config:
         from_attributes = True
 
+def encode_invoice_cursor(invoice: Invoice) -> str:
+    """Encode the (invoice_date, id) keyset position of an invoice as an opaque cursor"""
+    raw = f"{invoice.invoice_date.isoformat() if invoice.invoice_date else ''}|{invoice.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+def decode_invoice_cursor(cursor: str):
+    """Decode a cursor produced by encode_invoice_cursor into (invoice_date, id)"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode()).decode()
+        date_part, id_part = raw.rsplit("|", 1)
+        return (datetime.fromisoformat(date_part) if date_part else None), int(id_part)
+    except (ValueError, UnicodeDecodeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def invoices_after_cursor(cursor_date: Optional[datetime], cursor_id: int, order: str):
+    """Keyset condition for the invoices after (cursor_date, cursor_id), with undated invoices at the NULL end"""
+    undated = Invoice.invoice_date.is_(None)
+    if order == "desc":
+        if cursor_date is None:
+            return and_(undated, Invoice.id < cursor_id)
+        return or_(
+            Invoice.invoice_date < cursor_date,
+            and_(Invoice.invoice_date == cursor_date, Invoice.id < cursor_id),
+            undated
+        )
+    if cursor_date is None:
+        return or_(and_(undated, Invoice.id > cursor_id), Invoice.invoice_date.isnot(None))
+    return or_(
+        Invoice.invoice_date > cursor_date,
+        and_(Invoice.invoice_date == cursor_date, Invoice.id > cursor_id)
+    )
+
 @router.get("/")
 async def get_invoices(
+    response: Response,
     skip: int = 0,
-    limit: int = 100,
+    limit: int = Query(100, ge=1, le=500),
     status: Optional[str] = None,
-    db: Session = Depends(get_db),
+    client_id: Optional[int] = None,
+    vehicle_id: Optional[int] = None,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    order: str = Query("desc", regex="^(asc|desc)$"),
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db),
     current_user = Depends(get_current_user)
 ):
-    query = db.query(Invoice).outerjoin(Client).outerjoin(Vehicle)
+    """
+    List invoices ordered by (invoice_date, id).
+
+    Pass the X-Next-Cursor response header back as `cursor` to fetch the next
+    page; keyset pages stay fast however deep you go. `skip` is still honoured
+    when no cursor is given.
+    """
+    query = select(Invoice).options(
+        joinedload(Invoice.client),
+        joinedload(Invoice.vehicle)
+    )
 
     if status:
         query = query.filter(Invoice.payment_status == status)
+    if client_id:
+        query = query.filter(Invoice.client_id == client_id)
+    if vehicle_id:
+        query = query.filter(Invoice.vehicle_id == vehicle_id)
+    if date_from:
+        query = query.filter(Invoice.invoice_date >= datetime.combine(date_from, datetime.min.time()))
+    if date_to:
+        query = query.filter(Invoice.invoice_date < datetime.combine(date_to + timedelta(days=1), datetime.min.time()))
+
+    if cursor:
+        query = query.filter(invoices_after_cursor(*decode_invoice_cursor(cursor), order))
+
+    # Undated invoices sort as SQLite puts NULLs: last when descending, first when ascending
+    if order == "desc":
+        query = query.order_by(Invoice.invoice_date.desc().nulls_last(), Invoice.id.desc())
+    else:
+        query = query.order_by(Invoice.invoice_date.asc().nulls_first(), Invoice.id.asc())
+
+    if not cursor and skip:
+        query = query.offset(skip)
 
-    invoices = query.offset(skip).limit(limit).all()
+    invoices = (await db.execute(query.limit(limit))).scalars().all()
+
+    if len(invoices) == limit:
+        response.headers["X-Next-Cursor"] = encode_invoice_cursor(invoices[-1])
 
     result = []
     for invoice in invoices:
-        # Debug logging
-        print(f"[DEBUG] Invoice {invoice.id}: client_id={invoice.client_id}, vehicle_id={invoice.vehicle_id}")
         result.append({
             "id": invoice.id,
             "invoice_number": invoice.invoice_number,
@@ -189,7 +262,7 @@ async def get_invoices(
             "vehicle_id": invoice.vehicle_id,
 
             # Display names
-            "client_name": invoice.client.name,
+            "client_name": invoice.client.name if invoice.client else "",
             "vehicle_registration": invoice.vehicle.registration_number if invoice.vehicle else "",
             "invoice_date": invoice.invoice_date,
             "due_date": invoice.due_date,
@@ -225,26 +298,73 @@ async def get_invoices(
 
     return result
 
+@router.get("/export/pdf-zip")
+def export_invoice_pdfs(
+    status: Optional[str] = None,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    after_id: Optional[int] = None,
+    db: Session = Depends(get_db),
+    current_user = Depends(get_current_user)
+):
+    """
+    Download the PDFs of all matching invoices as one streamed ZIP archive.
+
+    Poll /export/pdf-zip/{X-Export-Id} for progress. If the download is cut
+    off, repeat the request with after_id set to the reported
+    resume_after_id to get the remaining invoices.
+    """
+    query = db.query(Invoice.id)
+    if status:
+        query = query.filter(Invoice.payment_status == status)
+    if date_from:
+        query = query.filter(Invoice.invoice_date >= datetime.combine(date_from, datetime.min.time()))
+    if date_to:
+        query = query.filter(Invoice.invoice_date < datetime.combine(date_to + timedelta(days=1), datetime.min.time()))
+    if after_id:
+        query = query.filter(Invoice.id > after_id)
+
+    invoice_ids = [invoice_id for (invoice_id,) in query.order_by(Invoice.id).all()]
+    if not invoice_ids:
+        raise HTTPException(status_code=404, detail="No invoices match the export filters")
+
+    filters = {"status": status, "date_from": date_from, "date_to": date_to, "after_id": after_id}
+    job = create_export_job(db, invoice_ids, filters)
+
+    filename = f"invoices-{date_from or 'all'}-to-{date_to or 'all'}.zip"
+    if after_id:
+        filename = filename.replace(".zip", f"-after-{after_id}.zip")
+
+    return StreamingResponse(
+        stream_invoice_zip(job),
+        media_type="application/zip",
+        headers={
+            "Content-Disposition": f'attachment; filename="{filename}"',
+            "X-Export-Id": job["export_id"],
+            "X-Export-Total": str(job["total"]),
+        }
+    )
+
+@router.get("/export/pdf-zip/{export_id}")
+def get_invoice_export_progress(
+    export_id: str,
+    db: Session = Depends(get_db),
+    current_user = Depends(get_current_user)
+):
+    """Progress of a running or finished ZIP export"""
+    job = get_export_job(db, export_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Export not found")
+    return export_progress(job)
+
 
 @router.post("/", response_model=InvoiceResponse)
-async def create_invoice(
-    request: Request,
+def create_invoice(
+    invoice_data: InvoiceCreate,
     db: Session = Depends(get_db),
     current_user = Depends(get_current_user)
 ):
     try:
-        # Get raw request body first
-        body = await request.body()
-        print(f"[DEBUG] Raw request body: {body.decode()}")
-
-        # Parse as JSON to see the actual data structure
-        import json
-        raw_data = json.loads(body.decode())
-        print(f"[DEBUG] Parsed JSON data: {raw_data}")
-
-        # Try to create the InvoiceCreate object
-        invoice_data = InvoiceCreate(**raw_data)
-        print(f"[DEBUG] Successfully parsed InvoiceCreate object")
         print(f"[DEBUG] ========== INVOICE CREATION ATTEMPT ==========")
         print(f"[DEBUG] Client ID: {invoice_data.client_id}")
         print(f"[DEBUG] Vehicle ID: {invoice_data.vehicle_id}")
@@ -270,8 +390,7 @@ async def create_invoice(
             raise HTTPException(status_code=404, detail="Vehicle not found")
 
         # Generate invoice number
-        invoice_count = db.query(Invoice).count()
-        invoice_number = f"INV{(invoice_count + 1):06d}"
+        invoice_number = allocate_invoice_number(db, invoice_data.invoice_date)
 
         # Generate unique access code for QR
         unique_access_code = str(uuid.uuid4())[:12].upper()
@@ -303,6 +422,7 @@ async def create_invoice(
             discount_amount=invoice_data.discount_amount,
             round_off=invoice_data.round_off,
             total_amount=invoice_data.total_amount,
+            balance_due=invoice_data.total_amount,
 
             # Car service fields
             service_type=invoice_data.service_type,
@@ -356,10 +476,11 @@ async def create_invoice(
         )
 
         db.add(db_invoice)
-        db.commit()
-        db.refresh(db_invoice)
+        db.flush()
+        apply_rollup_change(db, None, rollup_snapshot(db_invoice))
 
         # Process invoice items (services and parts)
+        stock_lines = []
         if invoice_data.items:
             for item in invoice_data.items:
                 # Determine item type
@@ -380,8 +501,11 @@ async def create_invoice(
                     db.add(service)
                 elif item_type == 'part' or item_type == 'Part':
                     # Create part
+                    part_id = resolve_part_id(db, item.part_id, item.name)
+                    stock_lines.append((part_id, quantity))
                     part = InvoicePart(
                         invoice_id=db_invoice.id,
+                        part_id=part_id,
                         part_name=item.name,
                         cost=item.rate,
                         quantity=quantity,
@@ -391,7 +515,10 @@ async def create_invoice(
                     )
                     db.add(part)
 
-            db.commit()
+        # Stock is taken in the same transaction, so a short part leaves no invoice behind
+        consume_invoice_stock(db, db_invoice.id, stock_lines, current_user.id)
+        db.commit()
+        db.refresh(db_invoice)
 
         print(f"[SUCCESS] Invoice {invoice_number} created successfully with {len(invoice_data.items)} items")
 
@@ -435,11 +562,9 @@ async def create_invoice(
     except HTTPException:
         db.rollback()
         raise
-    except ValidationError as e:
-        print(f"[ERROR] Validation error in invoice creation: {str(e)}")
-        print(f"[ERROR] Validation details: {e.errors()}")
+    except InsufficientStockError as e:
         db.rollback()
-        raise HTTPException(status_code=422, detail=f"Validation error: {str(e)}")
+        raise HTTPException(status_code=409, detail=str(e))
     except Exception as e:
         print(f"[ERROR] Failed to create invoice: {str(e)}")
         print(f"[ERROR] Exception type: {type(e)}")
@@ -449,7 +574,7 @@ async def create_invoice(
         raise HTTPException(status_code=400, detail=str(e))
 
 @router.put("/{invoice_id}", response_model=InvoiceResponse)
-async def update_invoice(
+def update_invoice(
     invoice_id: int,
     invoice_data: InvoiceCreate,
     db: Session = Depends(get_db),
@@ -476,6 +601,8 @@ async def update_invoice(
         if not vehicle:
             raise HTTPException(status_code=404, detail="Vehicle not found")
 
+        rollup_before = rollup_snapshot(db_invoice)
+
         # Update invoice fields
         db_invoice.client_id = invoice_data.client_id
         db_invoice.vehicle_id = invoice_data.vehicle_id
@@ -498,6 +625,13 @@ async def update_invoice(
         db_invoice.discount_amount = invoice_data.discount_amount
         db_invoice.round_off = invoice_data.round_off
         db_invoice.total_amount = invoice_data.total_amount
+        if db_invoice.late_fee_charged_at is not None:
+            # The submitted total is rebuilt from the items; keep the late fee already charged
+            db_invoice.total_amount = (db_invoice.total_amount or 0) + (db_invoice.late_fee_amount or 0)
+        db_invoice.balance_due = (db_invoice.total_amount or 0) - (db_invoice.paid_amount or 0)
+        db_invoice.payment_status = settled_status(
+            db_invoice.paid_amount or 0, db_invoice.total_amount or 0, db_invoice.payment_status
+        )
 
         # Update car service fields
         db_invoice.service_type = invoice_data.service_type
@@ -525,8 +659,10 @@ async def update_invoice(
             # Delete existing services and parts
             db.query(InvoiceService).filter(InvoiceService.invoice_id == invoice_id).delete()
             db.query(InvoicePart).filter(InvoicePart.invoice_id == invoice_id).delete()
+            restore_invoice_stock(db, invoice_id, current_user.id)
 
             # Add new items
+            stock_lines = []
             for item in invoice_data.items:
                 # Determine item type
                 item_type = getattr(item, 'item_type', None) or getattr(item, 'type', 'service')
@@ -546,8 +682,11 @@ async def update_invoice(
                     db.add(service)
                 elif item_type == 'part' or item_type == 'Part':
                     # Create part with all required fields
+                    part_id = resolve_part_id(db, item.part_id, item.name)
+                    stock_lines.append((part_id, quantity))
                     part = InvoicePart(
                         invoice_id=invoice_id,
+                        part_id=part_id,
                         part_name=item.name,
                         cost=item.rate,
                         unit_price=item.rate,      # Required field
@@ -557,6 +696,9 @@ async def update_invoice(
                     )
                     db.add(part)
 
+            consume_invoice_stock(db, invoice_id, stock_lines, current_user.id)
+
+        apply_rollup_change(db, rollup_before, rollup_snapshot(db_invoice))
         db.commit()
         db.refresh(db_invoice)
 
@@ -602,13 +744,16 @@ async def update_invoice(
     except HTTPException:
         db.rollback()
         raise
+    except InsufficientStockError as e:
+        db.rollback()
+        raise HTTPException(status_code=409, detail=str(e))
     except Exception as e:
         print(f"[ERROR] Failed to update invoice: {str(e)}")
         db.rollback()
         raise HTTPException(status_code=400, detail=str(e))
 
 @router.get("/{invoice_id}/preview")
-async def preview_invoice(
+def preview_invoice(
     invoice_id: int,
     db: Session = Depends(get_db),
     current_user = Depends(get_current_user)
@@ -654,7 +799,7 @@ async def preview_invoice(
             <p><strong>Discount: ₹{invoice.discount_amount:.2f}</strong></p>
             <p><strong>Total Amount: ₹{invoice.total_amount:.2f}</strong></p>
             <p><strong>Paid Amount: ₹{invoice.paid_amount:.2f}</strong></p>
-            <p><strong>Balance Due: ₹{(invoice.total_amount - invoice.paid_amount):.2f}</strong></p>
+            <p><strong>Balance Due: ₹{(invoice.balance_due or 0):.2f}</strong></p>
         </div>
 
         {f'<p><strong>Notes:</strong> {invoice.notes}</p>' if invoice.notes else ''}
@@ -665,9 +810,8 @@ async def preview_invoice(
     return {"html": html_content}
 
 
-
 @router.get("/view/{access_code}")
-async def view_invoice_by_qr(access_code: str, db: Session = Depends(get_db)):
+def view_invoice_by_qr(access_code: str, db: Session = Depends(get_db)):
     """View invoice via QR code access - no authentication required"""
     invoice = db.query(Invoice).filter(Invoice.unique_access_code == access_code).first()
     if not invoice:
@@ -694,23 +838,23 @@ async def view_invoice_by_qr(access_code: str, db: Session = Depends(get_db)):
 
 # Test endpoint without authentication for debugging
 @router.get("/{invoice_id}/test")
-async def get_invoice_test(
+def get_invoice_test(
     invoice_id: int,
     db: Session = Depends(get_db)
 ):
     """Get invoice without authentication for testing"""
-    return await get_invoice_internal(invoice_id, db)
+    return get_invoice_internal(invoice_id, db)
 
 @router.get("/{invoice_id}", response_model=InvoiceResponse)
-async def get_invoice(
+def get_invoice(
     invoice_id: int,
     db: Session = Depends(get_db),
     current_user = Depends(get_current_user)
 ):
     """Get a specific invoice by ID with authentication"""
-    return await get_invoice_internal(invoice_id, db)
+    return get_invoice_internal(invoice_id, db)
 
-async def get_invoice_internal(invoice_id: int, db: Session):
+def get_invoice_internal(invoice_id: int, db: Session):
     """Internal function to get invoice data"""
     try:
         # Use left joins to handle cases where client or vehicle might be missing
@@ -891,7 +1035,7 @@ class DeleteRequest(BaseModel):
     password: str
 
 @router.delete("/{invoice_id}")
-async def delete_invoice(
+def delete_invoice(
     invoice_id: int,
     delete_data: DeleteRequest,
     db: Session = Depends(get_db),
@@ -920,8 +1064,10 @@ async def delete_invoice(
 
         # Delete associated invoice parts
         db.query(InvoicePart).filter(InvoicePart.invoice_id == invoice_id).delete()
+        restore_invoice_stock(db, invoice_id, current_user.id)
 
         # Delete the invoice
+        apply_rollup_change(db, rollup_snapshot(invoice), None)
         db.delete(invoice)
         db.commit()
 
@@ -937,7 +1083,7 @@ async def delete_invoice(
 
 
 @router.patch("/{invoice_id}/status")
-async def update_invoice_status(
+def update_invoice_status(
     invoice_id: int,
     status_data: dict,
     db: Session = Depends(get_db),
@@ -956,31 +1102,34 @@ async def update_invoice_status(
             raise HTTPException(status_code=400, detail=f"Invalid status. Must be one of: {valid_statuses}")
 
         # Check if invoice exists
-        invoice = db.query(Invoice).filter(Invoice.id == invoice_id).first()
+        invoice = db.query(Invoice.total_amount, Invoice.paid_amount).filter(Invoice.id == invoice_id).first()
         if not invoice:
             raise HTTPException(status_code=404, detail="Invoice not found")
 
-        # Update status
-        old_status = invoice.payment_status
-        invoice.payment_status = new_status
-
-        # Update paid amount if status is paid
-        if new_status == "paid":
-            invoice.paid_amount = invoice.total_amount
-            invoice.balance_due = 0.0
-        elif new_status == "pending":
-            invoice.paid_amount = 0.0
-            invoice.balance_due = invoice.total_amount
-
+        # Paid and pending settle the balance through the payment ledger: a payment
+        # of the outstanding balance, or a reversal of everything paid so far
+        paid = invoice.paid_amount or 0
+        amount, notes = 0.0, None
+        if new_status == "paid" and (invoice.total_amount or 0) - paid > MONEY_TOLERANCE:
+            amount, notes = (invoice.total_amount or 0) - paid, "Marked as paid"
+        elif new_status == "pending" and abs(paid) > MONEY_TOLERANCE:
+            amount, notes = -paid, "Payments reversed: marked as pending"
+
+        _, posted = post_payment(
+            db, invoice_id, amount,
+            payment_method=status_data.get("payment_method") or ("Cash" if amount > 0 else "Adjustment"),
+            notes=notes,
+            payment_status=new_status
+        )
         db.commit()
 
         return {
-            "message": f"Invoice #{invoice.invoice_number} status updated from '{old_status}' to '{new_status}'",
+            "message": f"Invoice #{posted['invoice_number']} status updated from '{posted['previous_status']}' to '{new_status}'",
             "invoice_id": invoice_id,
-            "old_status": old_status,
+            "old_status": posted["previous_status"],
             "new_status": new_status,
-            "paid_amount": invoice.paid_amount,
-            "balance_due": invoice.balance_due
+            "paid_amount": posted["paid_amount"],
+            "balance_due": posted["balance_due"]
         }
 
     except HTTPException:
@@ -992,7 +1141,7 @@ async def update_invoice_status(
         raise HTTPException(status_code=500, detail=f"Failed to update invoice status: {str(e)}")
 
 @router.get("/{invoice_id}/verify")
-async def verify_invoice(
+def verify_invoice(
     invoice_id: int,
     db: Session = Depends(get_db)
 ):
@@ -1105,7 +1254,7 @@ async def verify_invoice(
 
 # Payment Schema
 class PaymentCreate(BaseModel):
-    amount: float
+    amount: float  # Negative for a correction of an earlier payment
     payment_method: str = "Cash"  # Cash, UPI, Card, Bank Transfer, Cheque
     transaction_id: Optional[str] = None
     payment_date: Optional[datetime] = None
@@ -1122,42 +1271,38 @@ class PaymentResponse(BaseModel):
 
 # Payment Endpoints
 @router.post("/{invoice_id}/payment", response_model=PaymentResponse)
-async def record_payment(
+def record_payment(
     invoice_id: int,
     payment: PaymentCreate,
     db: Session = Depends(get_db),
     current_user = Depends(get_current_user)
 ):
-    """Record a payment for an invoice"""
-    # Get the invoice
-    invoice = db.query(Invoice).filter(Invoice.id == invoice_id).first()
-    if not invoice:
-        raise HTTPException(status_code=404, detail="Invoice not found")
+    """Record a payment for an invoice, or a correction (negative amount, with notes) of earlier payments"""
+    if payment.amount == 0:
+        raise HTTPException(status_code=400, detail="Payment amount must not be zero")
+    if payment.amount < 0 and not (payment.notes or "").strip():
+        raise HTTPException(status_code=400, detail="A correction needs notes giving the reason")
 
-    # Create payment record
-    db_payment = Payment(
-        invoice_id=invoice_id,
-        amount=payment.amount,
-        payment_method=payment.payment_method,
-        transaction_id=payment.transaction_id,
-        payment_date=payment.payment_date or datetime.now(),
-        notes=payment.notes
-    )
-    db.add(db_payment)
-
-    # Update invoice payment status and paid amount
-    invoice.paid_amount = (invoice.paid_amount or 0) + payment.amount
-
-    # Determine payment status
-    if invoice.paid_amount >= invoice.total_amount:
-        invoice.payment_status = "paid"
-    elif invoice.paid_amount > 0:
-        invoice.payment_status = "partially_paid"
-    else:
-        invoice.payment_status = "pending"
-
-    db.commit()
-    db.refresh(db_payment)
+    try:
+        db_payment, _ = post_payment(
+            db, invoice_id, payment.amount,
+            payment_method=payment.payment_method,
+            transaction_id=payment.transaction_id,
+            payment_date=payment.payment_date,
+            notes=payment.notes
+        )
+        db.commit()
+        db.refresh(db_payment)
+    except InvoiceNotFound:
+        db.rollback()
+        raise HTTPException(status_code=404, detail="Invoice not found")
+    except ValueError as e:
+        db.rollback()
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        db.rollback()
+        print(f"[ERROR] Error recording payment for invoice {invoice_id}: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Failed to record payment: {str(e)}")
 
     return PaymentResponse(
         id=db_payment.id,
@@ -1170,7 +1315,7 @@ async def record_payment(
     )
 
 @router.get("/{invoice_id}/payments", response_model=List[PaymentResponse])
-async def get_invoice_payments(
+def get_invoice_payments(
     invoice_id: int,
     db: Session = Depends(get_db),
     current_user = Depends(get_current_user)
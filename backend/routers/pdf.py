@@ -0,0 +1,84 @@
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from database.database import get_db
+from auth.auth import get_current_user
+from services.pdf_service import (
+    PDF_WORKERS, cached_file_count, document_hash, invoice_document, quotation_document, render_document
+)
+
+router = APIRouter()
+
+
+async def _pdf_response(doc: dict, request: Request, inline: bool) -> Response:
+    """Serve a rendered (or cached) PDF with an ETag so browsers can revalidate"""
+    # The ETag is the document's content hash, so a revalidation needs no render or cache read
+    content_hash = document_hash(doc)
+    etag = f'"{content_hash}"'
+    filename = f'{doc["kind"]}-{doc["number"]}.pdf'.replace("/", "-")
+    headers = {
+        "ETag": etag,
+        "Cache-Control": "private, no-cache",
+        "Content-Disposition": f'{"inline" if inline else "attachment"}; filename="{filename}"',
+    }
+
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+
+    pdf_bytes, _, cache_hit = await render_document(doc, content_hash)
+    headers["X-PDF-Cache"] = "hit" if cache_hit else "miss"
+    return Response(content=pdf_bytes, media_type="application/pdf", headers=headers)
+
+@router.get("/health")
+async def pdf_health():
+    """PDF service health check"""
+    return {
+        "status": "healthy",
+        "workers": PDF_WORKERS,
+        "cached_documents": cached_file_count()
+    }
+
+@router.get("/invoices/{invoice_id}/pdf")
+async def get_invoice_pdf(
+    invoice_id: int,
+    request: Request,
+    inline: bool = False,
+    db: Session = Depends(get_db),
+    current_user = Depends(get_current_user)
+):
+    """Download an invoice as PDF"""
+    doc = await run_in_threadpool(invoice_document, db, invoice_id)
+    if not doc:
+        raise HTTPException(status_code=404, detail="Invoice not found")
+    return await _pdf_response(doc, request, inline)
+
+@router.get("/quotations/{quotation_id}/pdf")
+async def get_quotation_pdf(
+    quotation_id: int,
+    request: Request,
+    inline: bool = False,
+    db: Session = Depends(get_db),
+    current_user = Depends(get_current_user)
+):
+    """Download a quotation as PDF"""
+    doc = await run_in_threadpool(quotation_document, db, quotation_id)
+    if not doc:
+        raise HTTPException(status_code=404, detail="Quotation not found")
+    return await _pdf_response(doc, request, inline)
+
+@router.get("/invoices/{invoice_id}/preview")
+async def get_invoice_pdf_preview(
+    invoice_id: int,
+    current_user = Depends(get_current_user)
+):
+    """URL for viewing the invoice PDF inline"""
+    return {"preview_url": f"/api/pdf/invoices/{invoice_id}/pdf?inline=true"}
+
+@router.get("/quotations/{quotation_id}/preview")
+async def get_quotation_pdf_preview(
+    quotation_id: int,
+    current_user = Depends(get_current_user)
+):
+    """URL for viewing the quotation PDF inline"""
+    return {"preview_url": f"/api/pdf/quotations/{quotation_id}/pdf?inline=true"}
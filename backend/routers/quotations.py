@@ -1,23 +1,21 @@
 from fastapi import APIRouter, Depends, HTTPException, Query, Request
 from fastapi.exceptions import RequestValidationError
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, selectinload
 from typing import List, Optional, Union
 from pydantic import BaseModel, validator
 from datetime import datetime, date
 import json
 
-from database.database import SessionLocal
+from database.database import get_db
 from models.models import Quotation, QuotationItem, Client, Vehicle
 from auth.auth import get_current_user
+from services.quotation_conversion import QuotationNotConvertible, QuotationNotFound, convert_quotations
+from services.quotation_versions import diff_versions, latest_version, list_versions, new_version_fields, root_id_of
+from services.search_index import search_filter
+from services.stock_ledger import InsufficientStockError, release_quotation_stock, reserve_quotation_stock
 
 router = APIRouter()
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
 
 class QuotationItemCreate(BaseModel):
     item_type: Optional[str] = None  # service or part
@@ -99,6 +97,10 @@ class QuotationCreate(BaseModel):
             return datetime.strptime(v, '%Y-%m-%d').date()
         return v
 
+class QuotationConversion(BaseModel):
+    quotation_ids: List[int]
+    igst: bool = False  # Inter-state supply: charge IGST instead of CGST + SGST
+
 class QuotationResponse(BaseModel):
     id: int
     quotation_number: str
@@ -110,6 +112,9 @@ class QuotationResponse(BaseModel):
     total_amount: float
     status: str
     notes: Optional[str]
+    root_id: Optional[int] = None
+    parent_id: Optional[int] = None
+    version: Optional[int] = None
     client_name: Optional[str] = None
     vehicle_registration: Optional[str] = None
     items: List[QuotationItemResponse] = []
@@ -119,7 +124,8 @@ class QuotationResponse(BaseModel):
 
 def generate_quotation_number(db: Session) -> str:
     """Generate a unique quotation number"""
-    last_quotation = db.query(Quotation).order_by(Quotation.id.desc()).first()
+    # Versions reuse their original's number with a -vN suffix
+    last_quotation = db.query(Quotation).filter(Quotation.parent_id.is_(None)).order_by(Quotation.id.desc()).first()
     if last_quotation:
         try:
             last_num = int(last_quotation.quotation_number.split('-')[-1])
@@ -131,41 +137,89 @@ def generate_quotation_number(db: Session) -> str:
 
     return f"QT-{next_num:04d}"
 
+# Optional parts of the quotation list, requested with ?include=
+LIST_INCLUDES = {"items"}
+
+def _quotation_summary(quotation: Quotation, client_name: Optional[str], vehicle_registration: Optional[str]) -> dict:
+    return {
+        "id": quotation.id,
+        "quotation_number": quotation.quotation_number,
+        "client_id": quotation.client_id,
+        "vehicle_id": quotation.vehicle_id,
+        "quotation_date": quotation.quotation_date,
+        "valid_until": quotation.valid_until,
+        "subtotal": quotation.subtotal,
+        "total_amount": quotation.total_amount,
+        "status": quotation.status,
+        "notes": quotation.notes,
+        "root_id": quotation.root_id,
+        "parent_id": quotation.parent_id,
+        "version": quotation.version,
+        "client_name": client_name,
+        "vehicle_registration": vehicle_registration
+    }
+
+def _quotation_item(item: QuotationItem) -> dict:
+    return {
+        "id": item.id,
+        "item_type": item.item_type,
+        "name": item.name,
+        "hsn_sac": item.hsn_sac,
+        "quantity": item.quantity,
+        "rate": item.rate,
+        "discount": item.discount,
+        "tax_rate": item.tax_rate,
+        "total": item.total
+    }
+
 @router.get("/")
-async def get_quotations(
+def get_quotations(
     skip: int = 0,
-    limit: int = 100,
+    limit: int = Query(100, ge=1, le=500),
     search: Optional[str] = None,
     status: Optional[str] = None,
+    include: Optional[str] = Query(None, description="Comma-separated extras: items"),
     db: Session = Depends(get_db),
     current_user = Depends(get_current_user)
 ):
-    """Get all quotations with optional search and status filter"""
-    print(f"[DEBUG] GET request for quotations list")
-    query = db.query(Quotation)
+    """
+    List quotations with their client name and vehicle registration.
+
+    Rows are summaries; pass `include=items` to add each quotation's items,
+    which are loaded with one extra query for the whole page.
+    """
+    includes = {part.strip() for part in (include or "").split(",") if part.strip()}
+    if includes - LIST_INCLUDES:
+        raise HTTPException(status_code=400, detail=f"Unknown include: {', '.join(sorted(includes - LIST_INCLUDES))}")
+
+    # Names come from the same query instead of a lazy load per row
+    query = (
+        db.query(Quotation, Client.name, Vehicle.registration_number)
+        .outerjoin(Client, Quotation.client_id == Client.id)
+        .outerjoin(Vehicle, Quotation.vehicle_id == Vehicle.id)
+    )
+    if "items" in includes:
+        query = query.options(selectinload(Quotation.items))
 
     if search:
-        query = query.join(Client).join(Vehicle).filter(
-            (Client.name.contains(search)) |
-            (Vehicle.registration_number.contains(search)) |
-            (Quotation.quotation_number.contains(search))
-        )
+        query = query.filter(search_filter(
+            db, "quotation", search,
+            fallback=(
+                (Client.name.contains(search)) |
+                (Vehicle.registration_number.contains(search)) |
+                (Quotation.quotation_number.contains(search))
+            )
+        ))
 
     if status:
         query = query.filter(Quotation.status == status)
 
-    quotations = query.offset(skip).limit(limit).all()
-
-    # Add related data
     result = []
-    for quotation in quotations:
-        quotation_dict = QuotationResponse.from_orm(quotation).__dict__
-        if quotation.client:
-            quotation_dict["client_name"] = quotation.client.name
-        if quotation.vehicle:
-            quotation_dict["vehicle_registration"] = quotation.vehicle.registration_number
-        quotation_dict["items"] = [QuotationItemResponse.from_orm(item).__dict__ for item in quotation.items]
-        result.append(quotation_dict)
+    for quotation, client_name, vehicle_registration in query.order_by(Quotation.id).offset(skip).limit(limit):
+        row = _quotation_summary(quotation, client_name, vehicle_registration)
+        if "items" in includes:
+            row["items"] = [_quotation_item(item) for item in quotation.items]
+        result.append(row)
 
     return result
 
@@ -183,7 +237,7 @@ async def debug_quotation(request: Request):
         return {"error": str(e)}
 
 @router.post("/", response_model=QuotationResponse)
-async def create_quotation(
+def create_quotation(
     quotation: QuotationCreate,
     db: Session = Depends(get_db),
     current_user = Depends(get_current_user)
@@ -221,6 +275,7 @@ async def create_quotation(
 
         db.add(db_quotation)
         db.flush()  # Get the ID
+        db_quotation.root_id = db_quotation.id  # Starts its own version lineage
 
         # Add quotation items
         for item in quotation.items:
@@ -278,7 +333,7 @@ async def debug_update_quotation(quotation_id: int, request: Request):
         return {"error": str(e)}
 
 @router.put("/{quotation_id}")
-async def update_quotation(
+def update_quotation(
     quotation_id: int,
     quotation: QuotationCreate,
     db: Session = Depends(get_db),
@@ -324,17 +379,27 @@ async def update_quotation(
             )
             db.add(db_item)
 
+        if db_quotation.status == "accepted":
+            # Hold stock for the new items instead of the old ones
+            db.flush()
+            db.expire(db_quotation, ["items"])
+            release_quotation_stock(db, quotation_id)
+            reserve_quotation_stock(db, db_quotation, current_user.id)
+
         db.commit()
         db.refresh(db_quotation)
 
         print(f"[SUCCESS] Quotation {quotation_id} updated successfully")
 
         # Return the updated quotation data using the same format as GET
-        return await get_quotation(quotation_id, db, current_user)
+        return get_quotation(quotation_id, db, current_user)
 
     except HTTPException:
         db.rollback()
         raise
+    except InsufficientStockError as e:
+        db.rollback()
+        raise HTTPException(status_code=409, detail=str(e))
     except ValueError as e:
         print(f"[ERROR] Validation error: {str(e)}")
         db.rollback()
@@ -348,7 +413,7 @@ async def update_quotation(
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.delete("/{quotation_id}")
-async def delete_quotation(
+def delete_quotation(
     quotation_id: int,
     db: Session = Depends(get_db),
     current_user = Depends(get_current_user)
@@ -360,6 +425,7 @@ async def delete_quotation(
 
     # Delete quotation items first
     db.query(QuotationItem).filter(QuotationItem.quotation_id == quotation_id).delete()
+    release_quotation_stock(db, quotation_id)
 
     # Delete quotation
     db.delete(quotation)
@@ -368,7 +434,7 @@ async def delete_quotation(
     return {"message": "Quotation deleted successfully"}
 
 @router.post("/{quotation_id}/accept")
-async def accept_quotation(
+def accept_quotation(
     quotation_id: int,
     db: Session = Depends(get_db),
     current_user = Depends(get_current_user)
@@ -381,13 +447,20 @@ async def accept_quotation(
     if quotation.status not in ["pending"]:
         raise HTTPException(status_code=400, detail="Only pending quotations can be accepted")
 
+    # Hold the quoted parts so they are still in stock when the work is billed
+    try:
+        reserve_quotation_stock(db, quotation, current_user.id)
+    except InsufficientStockError as e:
+        db.rollback()
+        raise HTTPException(status_code=409, detail=str(e))
+
     quotation.status = "accepted"
     db.commit()
 
     return {"message": "Quotation accepted successfully", "status": "accepted"}
 
 @router.post("/{quotation_id}/reject")
-async def reject_quotation(
+def reject_quotation(
     quotation_id: int,
     db: Session = Depends(get_db),
     current_user = Depends(get_current_user)
@@ -406,7 +479,7 @@ async def reject_quotation(
     return {"message": "Quotation rejected successfully", "status": "rejected"}
 
 @router.post("/{quotation_id}/expire")
-async def expire_quotation(
+def expire_quotation(
     quotation_id: int,
     db: Session = Depends(get_db),
     current_user = Depends(get_current_user)
@@ -416,91 +489,101 @@ async def expire_quotation(
     if not quotation:
         raise HTTPException(status_code=404, detail="Quotation not found")
 
+    release_quotation_stock(db, quotation_id)
     quotation.status = "expired"
     db.commit()
 
     return {"message": "Quotation marked as expired", "status": "expired"}
 
+def _convert(db: Session, quotation_ids: List[int], user_id: int, igst: bool) -> List[dict]:
+    """Convert and commit, or roll back and raise the matching HTTP error"""
+    try:
+        converted = convert_quotations(db, quotation_ids, user_id, igst=igst)
+        db.commit()
+        return converted
+    except QuotationNotFound as e:
+        db.rollback()
+        raise HTTPException(status_code=404, detail=str(e))
+    except QuotationNotConvertible as e:
+        db.rollback()
+        raise HTTPException(status_code=400, detail=str(e))
+    except InsufficientStockError as e:
+        db.rollback()
+        raise HTTPException(status_code=409, detail=str(e))
+    except ValueError as e:
+        db.rollback()
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        print(f"[ERROR] Failed to convert quotations {quotation_ids}: {str(e)}")
+        db.rollback()
+        raise HTTPException(status_code=500, detail=str(e))
+
 @router.post("/{quotation_id}/convert-to-invoice")
-async def convert_quotation_to_invoice(
+def convert_quotation_to_invoice(
     quotation_id: int,
+    igst: bool = Query(False, description="Charge IGST instead of CGST + SGST"),
     db: Session = Depends(get_db),
     current_user = Depends(get_current_user)
 ):
-    """Convert a quotation to an invoice"""
-    quotation = db.query(Quotation).filter(Quotation.id == quotation_id).first()
-    if not quotation:
-        raise HTTPException(status_code=404, detail="Quotation not found")
-
-    if quotation.status != "accepted":
-        raise HTTPException(status_code=400, detail="Only accepted quotations can be converted to invoices")
-
-    # This would typically create an invoice from the quotation
-    # For now, just update the quotation status
-    quotation.status = "converted"
-    db.commit()
-
-    return {"message": "Quotation converted to invoice successfully"}
+    """Convert an accepted quotation to an invoice with the quotation's items"""
+    converted = _convert(db, [quotation_id], current_user.id, igst)[0]
+    print(f"[SUCCESS] Quotation {converted['quotation_number']} converted to invoice {converted['invoice_number']}")
+    return {"message": "Quotation converted to invoice successfully", **converted}
+
+@router.post("/convert-batch")
+def convert_quotations_to_invoices(
+    conversion: QuotationConversion,
+    db: Session = Depends(get_db),
+    current_user = Depends(get_current_user)
+):
+    """Convert many accepted quotations to invoices in one transaction; none are converted if any fails"""
+    if not conversion.quotation_ids:
+        raise HTTPException(status_code=400, detail="No quotations to convert")
+    converted = _convert(db, conversion.quotation_ids, current_user.id, conversion.igst)
+    print(f"[SUCCESS] Converted {len(converted)} quotations to invoices")
+    return {"converted": len(converted), "invoices": converted}
 
 @router.get("/analytics/stats")
-async def get_quotation_analytics(
+def get_quotation_analytics(
     db: Session = Depends(get_db),
     current_user = Depends(get_current_user)
 ):
     """Get quotation analytics and conversion stats"""
     from sqlalchemy import func
 
-    # Basic stats
-    total_quotations = db.query(Quotation).count()
-    pending_count = db.query(Quotation).filter(Quotation.status == 'pending').count()
-    accepted_count = db.query(Quotation).filter(Quotation.status == 'accepted').count()
-    rejected_count = db.query(Quotation).filter(Quotation.status == 'rejected').count()
-    converted_count = db.query(Quotation).filter(Quotation.status == 'converted').count()
-    expired_count = db.query(Quotation).filter(Quotation.status == 'expired').count()
-
-    # Value stats
-    total_value = db.query(func.sum(Quotation.total_amount)).scalar() or 0
-    accepted_value = db.query(func.sum(Quotation.total_amount)).filter(Quotation.status == 'accepted').scalar() or 0
-    converted_value = db.query(func.sum(Quotation.total_amount)).filter(Quotation.status == 'converted').scalar() or 0
+    # Counts and values per status in one pass; expiry is left to the scheduled sweep
+    by_status = {
+        status: (count, value or 0)
+        for status, count, value in db.query(
+            Quotation.status, func.count(Quotation.id), func.sum(Quotation.total_amount)
+        ).group_by(Quotation.status)
+    }
+    total_quotations = sum(count for count, _ in by_status.values())
+    count_of = lambda status: by_status.get(status, (0, 0))[0]
+    value_of = lambda status: by_status.get(status, (0, 0))[1]
 
     # Conversion rates
-    conversion_rate = (converted_count / total_quotations * 100) if total_quotations > 0 else 0
-    acceptance_rate = (accepted_count / total_quotations * 100) if total_quotations > 0 else 0
-
-    # Check for expired quotations
-    from datetime import datetime, date
-    today = date.today()
-    expired_quotations = db.query(Quotation).filter(
-        Quotation.valid_until < today,
-        Quotation.status == 'pending'
-    ).all()
-
-    # Auto-expire them
-    for quotation in expired_quotations:
-        quotation.status = 'expired'
-
-    if expired_quotations:
-        db.commit()
+    conversion_rate = (count_of('converted') / total_quotations * 100) if total_quotations > 0 else 0
+    acceptance_rate = (count_of('accepted') / total_quotations * 100) if total_quotations > 0 else 0
 
     return {
         "total_quotations": total_quotations,
         "status_breakdown": {
-            "pending": pending_count,
-            "accepted": accepted_count,
-            "rejected": rejected_count,
-            "converted": converted_count,
-            "expired": expired_count + len(expired_quotations)
+            "pending": count_of('pending'),
+            "accepted": count_of('accepted'),
+            "rejected": count_of('rejected'),
+            "converted": count_of('converted'),
+            "expired": count_of('expired')
         },
         "value_stats": {
-            "total_value": float(total_value),
-            "accepted_value": float(accepted_value),
-            "converted_value": float(converted_value)
+            "total_value": float(sum(value for _, value in by_status.values())),
+            "accepted_value": float(value_of('accepted')),
+            "converted_value": float(value_of('converted'))
         },
         "conversion_metrics": {
             "conversion_rate": round(conversion_rate, 2),
             "acceptance_rate": round(acceptance_rate, 2)
-        },
-        "auto_expired": len(expired_quotations)
+        }
     }
 
 @router.get("/templates/service-packages")
@@ -581,7 +664,7 @@ async def get_service_packages():
     return {"packages": packages}
 
 @router.post("/{quotation_id}/create-version")
-async def create_quotation_version(
+def create_quotation_version(
     quotation_id: int,
     quotation: QuotationCreate,
     db: Session = Depends(get_db),
@@ -594,29 +677,12 @@ async def create_quotation_version(
         if not original_quotation:
             raise HTTPException(status_code=404, detail="Original quotation not found")
 
-        # Generate new quotation number with version suffix
-        base_number = original_quotation.quotation_number.split('-v')[0]  # Remove existing version if any
-
-        # Find highest version number for this quotation
-        version_quotations = db.query(Quotation).filter(
-            Quotation.quotation_number.like(f"{base_number}%")
-        ).all()
-
-        version_numbers = []
-        for q in version_quotations:
-            if '-v' in q.quotation_number:
-                try:
-                    version_num = int(q.quotation_number.split('-v')[-1])
-                    version_numbers.append(version_num)
-                except ValueError:
-                    pass
-
-        next_version = max(version_numbers, default=0) + 1
-        new_quotation_number = f"{base_number}-v{next_version}"
+        # Next version number in the original's lineage, with its -vN quotation number
+        lineage = new_version_fields(db, original_quotation)
 
         # Create new quotation version
         db_quotation = Quotation(
-            quotation_number=new_quotation_number,
+            **lineage,
             client_id=quotation.client_id,
             vehicle_id=quotation.vehicle_id,
             quotation_date=quotation.quotation_date,
@@ -672,8 +738,20 @@ async def create_quotation_version(
         db.rollback()
         raise HTTPException(status_code=400, detail=str(e))
 
+def _version_summary(version: Quotation) -> dict:
+    return {
+        "id": version.id,
+        "quotation_number": version.quotation_number,
+        "version": version.version,
+        "parent_id": version.parent_id,
+        "status": version.status,
+        "total_amount": version.total_amount,
+        "quotation_date": version.quotation_date,
+        "created_at": version.created_at
+    }
+
 @router.get("/{quotation_id}/versions")
-async def get_quotation_versions(
+def get_quotation_versions(
     quotation_id: int,
     db: Session = Depends(get_db),
     current_user = Depends(get_current_user)
@@ -683,32 +761,47 @@ async def get_quotation_versions(
     if not quotation:
         raise HTTPException(status_code=404, detail="Quotation not found")
 
-    # Get base quotation number (without version)
-    base_number = quotation.quotation_number.split('-v')[0]
+    versions = list_versions(db, root_id_of(quotation))
+    return {"root_id": root_id_of(quotation), "versions": [_version_summary(version) for version in versions]}
 
-    # Find all quotations with the same base number
-    versions = db.query(Quotation).filter(
-        Quotation.quotation_number.like(f"{base_number}%")
-    ).order_by(Quotation.quotation_number).all()
+@router.get("/{quotation_id}/versions/latest")
+def get_latest_quotation_version(
+    quotation_id: int,
+    db: Session = Depends(get_db),
+    current_user = Depends(get_current_user)
+):
+    """Get the newest version of a quotation"""
+    quotation = db.query(Quotation).filter(Quotation.id == quotation_id).first()
+    if not quotation:
+        raise HTTPException(status_code=404, detail="Quotation not found")
 
-    # Format versions
-    result = []
-    for version in versions:
-        version_dict = {
-            "id": version.id,
-            "quotation_number": version.quotation_number,
-            "version": version.quotation_number.split('-v')[-1] if '-v' in version.quotation_number else "original",
-            "status": version.status,
-            "total_amount": version.total_amount,
-            "quotation_date": version.quotation_date,
-            "created_at": version.created_at if hasattr(version, 'created_at') else None
-        }
-        result.append(version_dict)
+    return _version_summary(latest_version(db, root_id_of(quotation)) or quotation)
+
+@router.get("/{quotation_id}/versions/diff")
+def diff_quotation_versions(
+    quotation_id: int,
+    compare_to: Optional[int] = Query(None, description="Version to compare with; defaults to the version this one revises"),
+    db: Session = Depends(get_db),
+    current_user = Depends(get_current_user)
+):
+    """Changes from another version of a quotation to this one"""
+    if compare_to is None:
+        quotation = db.query(Quotation.parent_id).filter(Quotation.id == quotation_id).first()
+        if not quotation:
+            raise HTTPException(status_code=404, detail="Quotation not found")
+        compare_to = quotation.parent_id
+        if compare_to is None:
+            raise HTTPException(status_code=400, detail="This quotation has no earlier version; pass compare_to")
 
-    return {"versions": result}
+    try:
+        return diff_versions(db, compare_to, quotation_id)
+    except LookupError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 @router.get("/{quotation_id}/preview")
-async def preview_quotation(
+def preview_quotation(
     quotation_id: int,
     db: Session = Depends(get_db),
     current_user = Depends(get_current_user)
@@ -785,7 +878,7 @@ async def preview_quotation(
 
 
 @router.get("/{quotation_id}")
-async def get_quotation(
+def get_quotation(
     quotation_id: int,
     db: Session = Depends(get_db),
     current_user = Depends(get_current_user)
@@ -811,6 +904,9 @@ async def get_quotation(
         "total_amount": quotation.total_amount,
         "status": quotation.status,
         "notes": quotation.notes,
+        "root_id": quotation.root_id,
+        "parent_id": quotation.parent_id,
+        "version": quotation.version,
         "client_name": quotation.client.name if quotation.client else None,
         "vehicle_registration": quotation.vehicle.registration_number if quotation.vehicle else None,
         "items": []
@@ -1,22 +1,20 @@
 from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 from sqlalchemy import func, case, and_
-from typing import List, Optional
-from datetime import datetime, timedelta
-from pydantic import BaseModel
+from typing import Any, Dict, List, Optional
+from datetime import date, datetime, timedelta
+from pydantic import BaseModel, Field
 
-from database.database import SessionLocal
+from database.database import get_db
 from models.models import Client, Vehicle, Invoice, InvoiceService, Service
 from auth.auth import get_current_user
+from services.cache import cached
+from services.revenue_rollup import monthly_totals
+from services.report_export import EXPORT_DATASETS, EXTENSIONS, MEDIA_TYPES, iter_table, stream_export
 
 router = APIRouter()
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
 
 class RevenueData(BaseModel):
     total: float
@@ -68,7 +66,8 @@ class ServiceTypeData(BaseModel):
     color: str
 
 @router.get("/live-summary", response_model=LiveReportSummary)
-async def get_live_summary(
+@cached("reports:live-summary")
+def get_live_summary(
     db: Session = Depends(get_db),
     current_user = Depends(get_current_user)
 ):
@@ -78,41 +77,48 @@ async def get_live_summary(
     current_month_start = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
     last_month_start = (current_month_start - timedelta(days=1)).replace(day=1)
 
-    # Get actual client data
-    total_clients = db.query(Client).count()
-    new_clients_this_month = db.query(Client).filter(
-        Client.id >= current_month_start.timestamp() if hasattr(Client, 'created_date') else True
-    ).count()
-
-    # Get actual invoice data
-    current_month_invoices = db.query(Invoice).filter(
-        Invoice.invoice_date >= current_month_start
-    ).all()
-
-    last_month_invoices = db.query(Invoice).filter(
-        and_(
-            Invoice.invoice_date >= last_month_start,
-            Invoice.invoice_date < current_month_start
-        )
-    ).all()
-
-    # Calculate revenue
-    current_month_revenue = sum(inv.total_amount or 0 for inv in current_month_invoices)
-    last_month_revenue = sum(inv.total_amount or 0 for inv in last_month_invoices) or 1  # Avoid division by zero
-
-    total_revenue = db.query(func.sum(Invoice.total_amount)).scalar() or 0
+    # Client totals in one pass
+    total_clients, new_clients_this_month = db.query(
+        func.count(Client.id),
+        func.coalesce(func.sum(case((Client.created_at >= current_month_start, 1), else_=0)), 0)
+    ).one()
+
+    # Every invoice figure in one pass over the invoices table
+    is_current_month = Invoice.invoice_date >= current_month_start
+    is_last_month = and_(Invoice.invoice_date >= last_month_start, Invoice.invoice_date < current_month_start)
+    balance = func.coalesce(Invoice.balance_due, 0)
+
+    def sum_where(condition, value):
+        return func.coalesce(func.sum(case((condition, value), else_=0)), 0)
+
+    (
+        total_revenue,
+        current_month_revenue,
+        services_this_month,
+        last_month_revenue,
+        services_last_month,
+        pending_count,
+        overdue_count,
+        pending_amount,
+        outstanding_amount
+    ) = db.query(
+        func.coalesce(func.sum(Invoice.total_amount), 0),
+        sum_where(is_current_month, func.coalesce(Invoice.total_amount, 0)),
+        sum_where(is_current_month, 1),
+        sum_where(is_last_month, func.coalesce(Invoice.total_amount, 0)),
+        sum_where(is_last_month, 1),
+        sum_where(Invoice.payment_status == "pending", 1),
+        sum_where(Invoice.payment_status == "overdue", 1),
+        sum_where(Invoice.payment_status == "pending", balance),
+        sum_where(Invoice.payment_status.in_(["pending", "overdue"]), balance)
+    ).one()
+
+    # Calculate revenue growth
+    last_month_revenue = last_month_revenue or 1  # Avoid division by zero
     revenue_growth = ((current_month_revenue - last_month_revenue) / last_month_revenue) * 100 if last_month_revenue > 0 else 0
 
-    # Get pending and overdue invoices
-    pending_invoices = db.query(Invoice).filter(Invoice.payment_status == "pending").all()
-    overdue_invoices = db.query(Invoice).filter(Invoice.payment_status == "overdue").all()
-
-    pending_amount = sum(inv.total_amount - (inv.paid_amount or 0) for inv in pending_invoices)
-    outstanding_amount = sum(inv.total_amount - (inv.paid_amount or 0) for inv in pending_invoices + overdue_invoices)
-
     # Get service data (using invoices as proxy for services)
-    services_this_month = len(current_month_invoices)
-    services_last_month = len(last_month_invoices) or 1
+    services_last_month = services_last_month or 1
     service_growth = ((services_this_month - services_last_month) / services_last_month) * 100 if services_last_month > 0 else 0
 
     # Calculate client growth
@@ -138,8 +144,8 @@ async def get_live_summary(
             change=0
         ),
         invoices=InvoiceData(
-            pending=len(pending_invoices),
-            overdue=len(overdue_invoices),
+            pending=pending_count,
+            overdue=overdue_count,
             pendingAmount=pending_amount,
             change=0
         ),
@@ -153,49 +159,29 @@ async def get_live_summary(
     )
 
 @router.get("/chart/revenue", response_model=List[ChartDataPoint])
-async def get_revenue_chart(
-    months: int = 6,
+def get_revenue_chart(
+    months: int = Query(6, ge=1, le=60),
     db: Session = Depends(get_db),
     current_user = Depends(get_current_user)
 ):
     """Get revenue chart data for the last N months"""
 
     chart_data = []
-    now = datetime.now()
-
-    for i in range(months):
-        # Calculate month start/end
-        month_date = now - timedelta(days=i*30)
-        month_start = month_date.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-
-        if month_date.month == 12:
-            next_month = month_date.replace(year=month_date.year + 1, month=1, day=1)
-        else:
-            next_month = month_date.replace(month=month_date.month + 1, day=1)
-
-        # Get invoices for this month
-        month_invoices = db.query(Invoice).filter(
-            and_(
-                Invoice.invoice_date >= month_start,
-                Invoice.invoice_date < next_month
-            )
-        ).all()
-
-        revenue = sum(inv.total_amount or 0 for inv in month_invoices)
+    for month_start, revenue in monthly_totals(db, months):
         expenses = revenue * 0.4  # Assuming 40% expenses
         profit = revenue - expenses
 
         chart_data.append(ChartDataPoint(
-            month=month_date.strftime("%b"),
+            month=month_start.strftime("%b"),
             revenue=revenue,
             expenses=expenses,
             profit=profit
         ))
 
-    return list(reversed(chart_data))  # Return in chronological order
+    return chart_data
 
 @router.get("/chart/services", response_model=List[ServiceTypeData])
-async def get_services_chart(
+def get_services_chart(
     db: Session = Depends(get_db),
     current_user = Depends(get_current_user)
 ):
@@ -239,7 +225,8 @@ async def get_services_chart(
     return result
 
 @router.get("/summary")
-async def get_reports_summary(
+@cached("reports:summary")
+def get_reports_summary(
     db: Session = Depends(get_db),
     current_user = Depends(get_current_user)
 ):
@@ -258,7 +245,7 @@ async def get_reports_summary(
     overdue_invoices = db.query(Invoice).filter(Invoice.payment_status == "overdue").count()
 
     # Calculate outstanding amount
-    outstanding_query = db.query(func.sum(Invoice.total_amount - func.coalesce(Invoice.paid_amount, 0))).filter(
+    outstanding_query = db.query(func.sum(Invoice.balance_due)).filter(
         Invoice.payment_status.in_(["pending", "overdue"])
     )
     outstanding_amount = outstanding_query.scalar() or 0
@@ -304,21 +291,72 @@ async def get_reports_summary(
         }
     }
 
+def _export_response(format: str, report_type: str, date_from: Optional[date], date_to: Optional[date], db: Session, current_user):
+    if report_type not in EXPORT_DATASETS:
+        # Any other report type exports the summary figures
+        summary_data = get_reports_summary(db=db, current_user=current_user)
+        if format == "pdf":
+            return {
+                "message": f"Export in {format} format requested",
+                "data": summary_data,
+                "timestamp": datetime.now().isoformat()
+            }
+        rows = [
+            (section, metric, value)
+            for section, metrics in summary_data.items()
+            for metric, value in metrics.items()
+        ]
+        chunks = iter_table(format, ["Section", "Metric", "Value"], rows, "Summary")
+        filename = f"summary-{date.today().isoformat()}.{EXTENSIONS[format]}"
+        media_type = MEDIA_TYPES[format]
+    else:
+        if format == "pdf":
+            raise HTTPException(
+                status_code=400,
+                detail="PDF export is not available for this report; use /api/invoices/export/pdf-zip for invoice PDFs"
+            )
+        if date_from and date_to and date_from > date_to:
+            raise HTTPException(status_code=400, detail="date_from must not be after date_to")
+        chunks, media_type, filename = stream_export(report_type, format, date_from, date_to)
+
+    return StreamingResponse(
+        chunks,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
 @router.get("/export")
-async def export_report(
+def export_report(
     format: str = Query(..., regex="^(pdf|excel|csv)$"),
     report_type: str = Query("summary"),
+    date_from: Optional[date] = Query(None),
+    date_to: Optional[date] = Query(None),
     db: Session = Depends(get_db),
     current_user = Depends(get_current_user)
 ):
-    """Export report in various formats"""
-
-    # Get the data
-    summary_data = await get_reports_summary(db=db, current_user=current_user)
-
-    # For now, return JSON (you can implement actual PDF/Excel generation later)
-    return {
-        "message": f"Export in {format} format requested",
-        "data": summary_data,
-        "timestamp": datetime.now().isoformat()
-    }
\ No newline at end of file
+    """
+    Export a report. report_type invoices, line_items, payments or clients
+    streams every row in the date range as CSV or Excel; anything else
+    exports the summary figures.
+    """
+    return _export_response(format, report_type, date_from, date_to, db, current_user)
+
+class ReportExportRequest(BaseModel):
+    format: str = Field(..., pattern="^(pdf|excel|csv)$")
+    report_type: str = "summary"
+    filters: Optional[Dict[str, Any]] = None
+
+@router.post("/export")
+def export_report_from_body(
+    export_request: ReportExportRequest,
+    db: Session = Depends(get_db),
+    current_user = Depends(get_current_user)
+):
+    """Same as GET /export, with the options in a JSON body as the frontend sends them"""
+    filters = export_request.filters or {}
+    try:
+        date_from = date.fromisoformat(str(filters["date_from"])[:10]) if filters.get("date_from") else None
+        date_to = date.fromisoformat(str(filters["date_to"])[:10]) if filters.get("date_to") else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid date filter, expected YYYY-MM-DD")
+    return _export_response(export_request.format, export_request.report_type, date_from, date_to, db, current_user)
@@ -0,0 +1,39 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+from typing import List, Optional
+from pydantic import BaseModel
+
+from database.database import get_db
+from auth.auth import get_current_user
+from services.search_index import SEARCH_ENTITIES, search
+
+router = APIRouter()
+
+
+class SearchResult(BaseModel):
+    type: str
+    id: int
+    title: Optional[str]
+    subtitle: Optional[str]
+    score: float
+
+@router.get("/", response_model=List[SearchResult])
+def search_all(
+    q: str = Query(..., min_length=1),
+    types: Optional[str] = Query(None, description="Comma separated: client, vehicle, invoice, quotation"),
+    limit: int = Query(20, ge=1, le=100),
+    db: Session = Depends(get_db),
+    current_user = Depends(get_current_user)
+):
+    """Search clients, vehicles, invoices and quotations at once, best matches first"""
+    entities = None
+    if types:
+        entities = [entity.strip() for entity in types.split(",") if entity.strip()]
+        unknown = [entity for entity in entities if entity not in SEARCH_ENTITIES]
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown search types: {', '.join(unknown)}")
+
+    return [
+        SearchResult(type=entity, id=entity_id, title=title, subtitle=" ".join((body or "").split()), score=score)
+        for entity, entity_id, title, body, score in search(db, q, entities, limit)
+    ]
@@ -1,20 +1,21 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, File, HTTPException, Query, Request, Response, UploadFile
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from pydantic import BaseModel
+import json
+from datetime import datetime
 
-from database.database import SessionLocal
-from models.models import Service, ServiceCategory, Part, PartCategory
+from database.database import get_db
+from models.models import Service, ServiceCategory, Part, PartCategory, StockMovement
 from auth.auth import get_current_user
+from services.catalog_import import FORMATS, IMPORT_ENTITIES, CatalogImport, format_for_filename, read_records
+from services.service_catalog import (
+    PART_FIELDS, SERVICE_FIELDS, filter_items, get_service_catalog, public_fields, stock_etag, with_live_stock
+)
+from services.stock_ledger import InsufficientStockError, low_stock_parts, return_stock, take_stock
 
 router = APIRouter()
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
 
 class ServiceResponse(BaseModel):
     id: int
@@ -51,9 +52,46 @@ class PartResponse(BaseModel):
     category_name: str
     hsn_code: Optional[str]
 
+class LowStockPartResponse(BaseModel):
+    id: int
+    name: str
+    part_number: Optional[str]
+    stock_quantity: int
+    reserved_quantity: int
+    available_quantity: int
+    minimum_stock: int
+    shortfall: int
+    supplier: Optional[str]
+
+class StockAdjustment(BaseModel):
+    quantity: int  # Positive to add stock, negative to remove it
+    notes: Optional[str] = None
+
+class StockMovementResponse(BaseModel):
+    id: int
+    movement_type: str
+    quantity: int
+    reference_type: Optional[str]
+    reference_id: Optional[int]
+    notes: Optional[str]
+    created_at: Optional[datetime]
+
+    class Config:
+        from_attributes = True
+
+def _catalog_response(request: Request, catalog, payload, etag: Optional[str] = None) -> Response:
+    """Serve catalog data with the catalog version (or etag) as ETag so clients can revalidate"""
+    etag = etag or catalog.etag
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache", "X-Catalog-Version": str(catalog.version)}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    body = payload if isinstance(payload, bytes) else json.dumps(payload).encode("utf-8")
+    return Response(content=body, media_type="application/json", headers=headers)
+
 # Root endpoint for /api/services/ (what frontend expects)
 @router.get("/", response_model=List[ServiceResponse])
-async def get_all_services(
+def get_all_services(
+    request: Request,
     skip: int = 0,
     limit: int = 100,
     search: Optional[str] = None,
@@ -62,35 +100,13 @@ async def get_all_services(
     current_user = Depends(get_current_user)
 ):
     """Get all services - main endpoint for frontend"""
-    query = db.query(Service).join(ServiceCategory)
-
-    if category_id:
-        query = query.filter(Service.category_id == category_id)
-
-    if search:
-        query = query.filter(
-            (Service.name.contains(search)) |
-            (Service.description.contains(search))
-        )
-
-    services = query.offset(skip).limit(limit).all()
-
-    result = []
-    for service in services:
-        result.append({
-            "id": service.id,
-            "name": service.name,
-            "description": service.description,
-            "base_price": service.base_price,
-            "labor_hours": service.labor_hours,
-            "category_name": service.category.name if service.category else "Unknown",
-            "hsn_sac_code": service.hsn_sac_code
-        })
-
-    return result
+    catalog = get_service_catalog(db)
+    services = filter_items(catalog.services, search, ("name", "description"), category_id)
+    return _catalog_response(request, catalog, public_fields(services[skip:skip + limit], SERVICE_FIELDS))
 
 @router.get("/services", response_model=List[ServiceResponse])
-async def get_services(
+def get_services(
+    request: Request,
     skip: int = 0,
     limit: int = 100,
     search: Optional[str] = None,
@@ -98,65 +114,25 @@ async def get_services(
     db: Session = Depends(get_db),
     current_user = Depends(get_current_user)
 ):
-    query = db.query(Service).join(ServiceCategory)
-
-    if category_id:
-        query = query.filter(Service.category_id == category_id)
-
-    if search:
-        query = query.filter(
-            (Service.name.contains(search)) |
-            (Service.description.contains(search))
-        )
-
-    services = query.offset(skip).limit(limit).all()
-
-    result = []
-    for service in services:
-        result.append({
-            "id": service.id,
-            "name": service.name,
-            "description": service.description,
-            "base_price": service.base_price,
-            "labor_hours": service.labor_hours,
-            "category_name": service.category.name,
-            "hsn_sac_code": service.hsn_sac_code
-        })
-
-    return result
+    catalog = get_service_catalog(db)
+    services = filter_items(catalog.services, search, ("name", "description"), category_id)
+    return _catalog_response(request, catalog, public_fields(services[skip:skip + limit], SERVICE_FIELDS))
 
 @router.get("/services/search")
-async def search_services_public(
+def search_services_public(
+    request: Request,
     search: Optional[str] = None,
     limit: int = 20,
     db: Session = Depends(get_db)
 ):
     """Public endpoint for auto-fill services search"""
-    query = db.query(Service).join(ServiceCategory)
-
-    if search:
-        query = query.filter(
-            Service.name.ilike(f"%{search}%")
-        )
-
-    services = query.limit(limit).all()
-
-    result = []
-    for service in services:
-        result.append({
-            "id": service.id,
-            "name": service.name,
-            "description": service.description,
-            "base_price": service.base_price,
-            "labor_hours": service.labor_hours,
-            "category_name": service.category.name,
-            "hsn_sac_code": service.hsn_sac_code
-        })
-
-    return result
+    catalog = get_service_catalog(db)
+    services = filter_items(catalog.services, search, ("name",))
+    return _catalog_response(request, catalog, public_fields(services[:limit], SERVICE_FIELDS))
 
 @router.get("/parts", response_model=List[PartResponse])
-async def get_parts(
+def get_parts(
+    request: Request,
     skip: int = 0,
     limit: int = 100,
     search: Optional[str] = None,
@@ -164,83 +140,145 @@ async def get_parts(
     db: Session = Depends(get_db),
     current_user = Depends(get_current_user)
 ):
-    query = db.query(Part).join(PartCategory)
-
-    if category_id:
-        query = query.filter(Part.category_id == category_id)
-
-    if search:
-        query = query.filter(
-            (Part.name.contains(search)) |
-            (Part.part_number.contains(search)) |
-            (Part.description.contains(search))
-        )
-
-    parts = query.offset(skip).limit(limit).all()
-
-    result = []
-    for part in parts:
-        result.append({
-            "id": part.id,
-            "name": part.name,
-            "part_number": part.part_number,
-            "description": part.description,
-            "unit_price": part.unit_price,
-            "stock_quantity": part.stock_quantity,
-            "category_name": part.category.name,
-            "hsn_code": part.hsn_code
-        })
-
-    return result
+    catalog = get_service_catalog(db)
+    parts = filter_items(catalog.parts, search, ("name", "part_number", "description"), category_id)
+    parts = with_live_stock(db, public_fields(parts[skip:skip + limit], PART_FIELDS))
+    return _catalog_response(request, catalog, parts, stock_etag(catalog, parts))
 
 @router.get("/parts/search")
-async def search_parts_public(
+def search_parts_public(
+    request: Request,
     search: Optional[str] = None,
     limit: int = 20,
     db: Session = Depends(get_db)
 ):
     """Public endpoint for auto-fill parts search"""
-    query = db.query(Part).join(PartCategory)
-
-    if search:
-        query = query.filter(
-            (Part.name.ilike(f"%{search}%")) |
-            (Part.part_number.ilike(f"%{search}%"))
-        )
-
-    parts = query.limit(limit).all()
-
-    result = []
-    for part in parts:
-        result.append({
-            "id": part.id,
-            "name": part.name,
-            "part_number": part.part_number,
-            "description": part.description,
-            "unit_price": part.unit_price,
-            "stock_quantity": part.stock_quantity,
-            "category_name": part.category.name,
-            "hsn_code": part.hsn_code
-        })
-
-    return result
+    catalog = get_service_catalog(db)
+    parts = filter_items(catalog.parts, search, ("name", "part_number"))
+    parts = with_live_stock(db, public_fields(parts[:limit], PART_FIELDS))
+    return _catalog_response(request, catalog, parts, stock_etag(catalog, parts))
 
-@router.get("/categories")
-async def get_categories(
+@router.get("/parts/low-stock", response_model=List[LowStockPartResponse])
+def get_low_stock_parts(
+    limit: int = 100,
+    db: Session = Depends(get_db),
+    current_user = Depends(get_current_user)
+):
+    """Parts whose unreserved stock is at or below their minimum, most short first"""
+    results = []
+    for part in low_stock_parts(db, limit):
+        available = (part.stock_quantity or 0) - (part.reserved_quantity or 0)
+        results.append(LowStockPartResponse(
+            id=part.id,
+            name=part.name,
+            part_number=part.part_number,
+            stock_quantity=part.stock_quantity or 0,
+            reserved_quantity=part.reserved_quantity or 0,
+            available_quantity=available,
+            minimum_stock=part.minimum_stock or 0,
+            shortfall=(part.minimum_stock or 0) - available,
+            supplier=part.supplier
+        ))
+    return results
+
+@router.post("/parts/{part_id}/stock")
+def adjust_part_stock(
+    part_id: int,
+    adjustment: StockAdjustment,
     db: Session = Depends(get_db),
     current_user = Depends(get_current_user)
 ):
-    service_categories = db.query(ServiceCategory).all()
-    part_categories = db.query(PartCategory).all()
+    """Receive or write off stock of a part, recorded in the stock ledger"""
+    if not db.query(Part.id).filter(Part.id == part_id).first():
+        raise HTTPException(status_code=404, detail="Part not found")
+    if adjustment.quantity == 0:
+        raise HTTPException(status_code=400, detail="Quantity must not be zero")
 
+    try:
+        if adjustment.quantity > 0:
+            return_stock(db, part_id, adjustment.quantity, "manual", None, current_user.id, adjustment.notes)
+        elif not take_stock(db, part_id, -adjustment.quantity, "manual", None, current_user.id, adjustment.notes):
+            raise HTTPException(status_code=400, detail="Stock is not tracked for this part")
+        db.commit()
+    except InsufficientStockError as e:
+        db.rollback()
+        raise HTTPException(status_code=409, detail=str(e))
+
+    part = db.query(Part).filter(Part.id == part_id).first()
     return {
-        "service_categories": [{"id": cat.id, "name": cat.name} for cat in service_categories],
-        "part_categories": [{"id": cat.id, "name": cat.name} for cat in part_categories]
+        "id": part.id,
+        "stock_quantity": part.stock_quantity,
+        "reserved_quantity": part.reserved_quantity,
+        "available_quantity": part.stock_quantity - part.reserved_quantity
     }
 
+@router.get("/parts/{part_id}/movements", response_model=List[StockMovementResponse])
+def get_part_movements(
+    part_id: int,
+    limit: int = 100,
+    db: Session = Depends(get_db),
+    current_user = Depends(get_current_user)
+):
+    """Latest stock ledger entries of a part"""
+    return db.query(StockMovement).filter(StockMovement.part_id == part_id)\
+        .order_by(StockMovement.id.desc()).limit(limit).all()
+
+@router.get("/categories")
+def get_categories(
+    request: Request,
+    db: Session = Depends(get_db),
+    current_user = Depends(get_current_user)
+):
+    catalog = get_service_catalog(db)
+    return _catalog_response(request, catalog, {
+        "service_categories": catalog.service_categories,
+        "part_categories": catalog.part_categories
+    })
+
+@router.get("/catalog")
+def get_catalog_snapshot(
+    request: Request,
+    db: Session = Depends(get_db),
+    current_user = Depends(get_current_user)
+):
+    """
+    The whole services and parts catalog in one compact response, for
+    clients that keep it locally and revalidate with If-None-Match
+    """
+    catalog = get_service_catalog(db)
+    return _catalog_response(request, catalog, catalog.snapshot_json())
+
+@router.post("/import")
+def import_catalog(
+    entity: str = Query(..., description="parts or services"),
+    file: UploadFile = File(...),
+    format: Optional[str] = Query(None, description="csv or jsonl; taken from the file name if omitted"),
+    db: Session = Depends(get_db),
+    current_user = Depends(get_current_user)
+):
+    """
+    Upsert parts (by part_number) or services (by name) from a CSV or JSON
+    Lines file. Rows that fail are listed in the report and skipped.
+    """
+    if entity not in IMPORT_ENTITIES:
+        raise HTTPException(status_code=400, detail=f"entity must be one of: {', '.join(IMPORT_ENTITIES)}")
+    fmt = format or format_for_filename(file.filename)
+    if fmt not in FORMATS:
+        raise HTTPException(status_code=400, detail=f"format must be one of: {', '.join(FORMATS)}")
+
+    try:
+        report = CatalogImport(db, entity).run(read_records(file.file, fmt))
+    except Exception as e:
+        db.rollback()
+        print(f"[ERROR] Catalog import failed: {str(e)}")
+        raise HTTPException(status_code=400, detail=f"Import failed: {str(e)}")
+
+    print(f"[SUCCESS] Imported {entity}: {report['inserted']} inserted, {report['updated']} updated, {report['merged']} merged, {report['failed']} failed")
+    return report
+
 # CRUD Operations for Services
 @router.post("/", response_model=ServiceResponse)
-async def create_service(
+def create_service(
     service: ServiceCreate,
     db: Session = Depends(get_db),
     current_user = Depends(get_current_user)
@@ -274,7 +312,7 @@ async def create_service(
     }
 
 @router.put("/{service_id}", response_model=ServiceResponse)
-async def update_service(
+def update_service(
     service_id: int,
     service_update: ServiceUpdate,
     db: Session = Depends(get_db),
@@ -316,7 +354,7 @@ async def update_service(
     }
 
 @router.delete("/{service_id}")
-async def delete_service(
+def delete_service(
     service_id: int,
     db: Session = Depends(get_db),
     current_user = Depends(get_current_user)
@@ -332,7 +370,7 @@ async def delete_service(
     return {"detail": "Service deleted successfully"}
 
 @router.get("/{service_id}", response_model=ServiceResponse)
-async def get_service(
+def get_service(
     service_id: int,
     db: Session = Depends(get_db),
     current_user = Depends(get_current_user)
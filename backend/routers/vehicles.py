@@ -1,21 +1,19 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from pydantic import BaseModel, validator
 from datetime import datetime
+import json
 
-from database.database import SessionLocal
+from database.database import get_db
 from models.models import Vehicle, VehicleBrand, VehicleModel, Client, User
 from auth.auth import get_current_user, verify_password
+from services.search_index import search_filter
+from services.vehicle_catalog import get_vehicle_catalog
+from utils.normalization import normalize_registration
 
 router = APIRouter()
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
 
 class VehicleCreate(BaseModel):
     model_config = {'protected_namespaces': ()}
@@ -70,34 +68,32 @@ class ModelResponse(BaseModel):
     year_end: Optional[int]
     fuel_type: Optional[str]
 
+def _catalog_response(request: Request, catalog, body: bytes) -> Response:
+    """Serve catalog JSON with the catalog's ETag so browsers can revalidate"""
+    headers = {"ETag": catalog.etag, "Cache-Control": "private, no-cache"}
+    if request.headers.get("if-none-match") == catalog.etag:
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
 @router.get("/brands", response_model=List[BrandResponse])
-async def get_vehicle_brands(
-    db: Session = Depends(get_db),
+def get_vehicle_brands(
+    request: Request,
     current_user = Depends(get_current_user)
 ):
-    brands = db.query(VehicleBrand).all()
-    result = []
-    for brand in brands:
-        brand_data = {
-            "id": brand.id,
-            "name": brand.name,
-            "country": brand.country,
-            "models": [{"id": m.id, "name": m.name} for m in brand.models]
-        }
-        result.append(brand_data)
-    return result
+    catalog = get_vehicle_catalog()
+    return _catalog_response(request, catalog, catalog.brands_json)
 
 @router.get("/models/{brand_id}", response_model=List[ModelResponse])
-async def get_vehicle_models(
+def get_vehicle_models(
     brand_id: int,
-    db: Session = Depends(get_db),
+    request: Request,
     current_user = Depends(get_current_user)
 ):
-    models = db.query(VehicleModel).filter(VehicleModel.brand_id == brand_id).all()
-    return models
+    catalog = get_vehicle_catalog()
+    return _catalog_response(request, catalog, catalog.models_json(brand_id))
 
 @router.get("/", response_model=List[VehicleResponse])
-async def get_vehicles(
+def get_vehicles(
     skip: int = 0,
     limit: int = 100,
     client_id: Optional[int] = None,
@@ -111,12 +107,15 @@ async def get_vehicles(
         query = query.filter(Vehicle.client_id == client_id)
 
     if search:
-        query = query.filter(
-            (Vehicle.registration_number.contains(search)) |
-            (Client.name.contains(search)) |
-            (VehicleBrand.name.contains(search)) |
-            (VehicleModel.name.contains(search))
-        )
+        query = query.filter(search_filter(
+            db, "vehicle", search,
+            fallback=(
+                (Vehicle.registration_number.contains(search)) |
+                (Client.name.contains(search)) |
+                (VehicleBrand.name.contains(search)) |
+                (VehicleModel.name.contains(search))
+            )
+        ))
 
     vehicles = query.offset(skip).limit(limit).all()
 
@@ -151,14 +150,14 @@ async def get_vehicles(
     return result
 
 @router.post("/", response_model=VehicleResponse)
-async def create_vehicle(
+def create_vehicle(
     vehicle: VehicleCreate,
     db: Session = Depends(get_db),
     current_user = Depends(get_current_user)
 ):
-    # Check if registration number already exists
+    # Check if registration number already exists, however it was formatted
     existing_vehicle = db.query(Vehicle).filter(
-        Vehicle.registration_number == vehicle.registration_number
+        Vehicle.registration_normalized == normalize_registration(vehicle.registration_number)
     ).first()
     if existing_vehicle:
         raise HTTPException(status_code=400, detail="Registration number already exists")
@@ -233,42 +232,17 @@ async def create_vehicle(
     )
 
 @router.get("/search/models")
-async def search_models(
+def search_models(
     q: str,  # Search query - required
+    request: Request,
     brand_id: Optional[int] = None,  # Optional brand filter
     limit: int = 20,  # Limit for search results
-    db: Session = Depends(get_db),
     current_user = Depends(get_current_user)
 ):
     """Search vehicle models by name with optional brand filter for auto-complete"""
-    query = db.query(VehicleModel)
-
-    # Filter by brand if specified
-    if brand_id:
-        query = query.filter(VehicleModel.brand_id == brand_id)
-
-    # Search by model name
-    query = query.filter(VehicleModel.name.ilike(f"%{q}%"))
-
-    # Join with brand for response
-    query = query.join(VehicleBrand).limit(limit)
-
-    models = query.all()
-
-    # Create simple search response
-    result = []
-    for model in models:
-        result.append({
-            "id": model.id,
-            "name": model.name,
-            "brand_id": model.brand_id,
-            "brand_name": model.brand.name,
-            "year_start": model.year_start,
-            "year_end": model.year_end,
-            "fuel_type": model.fuel_type
-        })
-
-    return result
+    catalog = get_vehicle_catalog()
+    models = catalog.search_models(q, brand_id, limit)
+    return _catalog_response(request, catalog, json.dumps(models).encode("utf-8"))
 
 
 # Individual vehicle endpoints - These MUST come AFTER all specific routes
@@ -290,17 +264,7 @@ class VehicleUpdate(BaseModel):
     puc_expiry: Optional[str] = None
     notes: Optional[str] = None
 
-@router.get("/{vehicle_id}", response_model=VehicleResponse)
-async def get_vehicle(
-    vehicle_id: int,
-    db: Session = Depends(get_db),
-    current_user = Depends(get_current_user)
-):
-    """Get a single vehicle by ID"""
-    vehicle = db.query(Vehicle).filter(Vehicle.id == vehicle_id).first()
-    if not vehicle:
-        raise HTTPException(status_code=404, detail="Vehicle not found")
-
+def vehicle_response(vehicle: Vehicle) -> VehicleResponse:
     # Convert datetime objects to string for date fields
     insurance_expiry = vehicle.insurance_expiry.strftime('%Y-%m-%d') if vehicle.insurance_expiry else None
     puc_expiry = vehicle.puc_expiry.strftime('%Y-%m-%d') if vehicle.puc_expiry else None
@@ -326,8 +290,36 @@ async def get_vehicle(
         model_name=vehicle.model.name
     )
 
+@router.get("/by-reg/{registration_number}", response_model=VehicleResponse)
+def get_vehicle_by_registration(
+    registration_number: str,
+    db: Session = Depends(get_db),
+    current_user = Depends(get_current_user)
+):
+    """Get a vehicle by registration number, however it is spaced or cased"""
+    normalized = normalize_registration(registration_number)
+    if not normalized:
+        raise HTTPException(status_code=400, detail="Registration number must contain letters or digits")
+
+    vehicle = db.query(Vehicle).filter(Vehicle.registration_normalized == normalized).order_by(Vehicle.id).first()
+    if not vehicle:
+        raise HTTPException(status_code=404, detail="Vehicle not found")
+    return vehicle_response(vehicle)
+
+@router.get("/{vehicle_id}", response_model=VehicleResponse)
+def get_vehicle(
+    vehicle_id: int,
+    db: Session = Depends(get_db),
+    current_user = Depends(get_current_user)
+):
+    """Get a single vehicle by ID"""
+    vehicle = db.query(Vehicle).filter(Vehicle.id == vehicle_id).first()
+    if not vehicle:
+        raise HTTPException(status_code=404, detail="Vehicle not found")
+    return vehicle_response(vehicle)
+
 @router.put("/{vehicle_id}", response_model=VehicleResponse)
-async def update_vehicle(
+def update_vehicle(
     vehicle_id: int,
     vehicle_update: VehicleUpdate,
     db: Session = Depends(get_db),
@@ -341,7 +333,8 @@ async def update_vehicle(
     # Check if registration number already exists (if being updated)
     if vehicle_update.registration_number and vehicle_update.registration_number != vehicle.registration_number:
         existing_vehicle = db.query(Vehicle).filter(
-            Vehicle.registration_number == vehicle_update.registration_number
+            Vehicle.registration_normalized == normalize_registration(vehicle_update.registration_number),
+            Vehicle.id != vehicle_id
         ).first()
         if existing_vehicle:
             raise HTTPException(status_code=400, detail="Registration number already exists")
@@ -403,7 +396,7 @@ class DeleteRequest(BaseModel):
     password: str
 
 @router.delete("/{vehicle_id}")
-async def delete_vehicle(
+def delete_vehicle(
     vehicle_id: int,
     delete_data: DeleteRequest,
     db: Session = Depends(get_db),
@@ -3,9 +3,26 @@ Services Package
 Business logic and service layer components
 """
 
-from .new_invoice_service import NewInvoiceService, new_invoice_service
+from .pdf_service import (
+    invoice_document,
+    invoice_documents,
+    quotation_document,
+    render_document,
+    shutdown_render_pool
+)
+from .pdf_export import (
+    create_export_job,
+    export_progress,
+    stream_invoice_zip
+)
 
 __all__ = [
-    'NewInvoiceService',
-    'new_invoice_service'
-]
\ No newline at end of file
+    'invoice_document',
+    'invoice_documents',
+    'quotation_document',
+    'render_document',
+    'shutdown_render_pool',
+    'create_export_job',
+    'export_progress',
+    'stream_invoice_zip'
+]
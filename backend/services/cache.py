@@ -0,0 +1,188 @@
+"""
+Response Cache
+TTL cache for read-only aggregate endpoints (dashboard stats, report
+summaries). Entries are grouped under tags; invalidate(tag) bumps the tag's
+version so every entry cached under the old version is ignored from then on.
+
+The backend is an in-process dict by default. Set CACHE_BACKEND=redis and
+CACHE_REDIS_URL to share the cache (and invalidations) between workers;
+anything speaking the Redis GET/SETEX/INCR commands will do.
+"""
+
+import functools
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Optional
+
+from fastapi.encoders import jsonable_encoder
+
+CACHE_BACKEND = os.getenv("CACHE_BACKEND", "local")
+CACHE_REDIS_URL = os.getenv("CACHE_REDIS_URL", "redis://localhost:6379/0")
+CACHE_TTL_SECONDS = int(os.getenv("CACHE_TTL_SECONDS", "30"))
+CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", "1024"))
+CACHE_KEY_PREFIX = os.getenv("CACHE_KEY_PREFIX", "carservice")
+
+# Tag for everything derived from invoices, clients, vehicles and payments
+AGGREGATES = "aggregates"
+
+class LocalCacheBackend:
+    """In-process stand-in for Redis with the few commands the cache uses"""
+
+    def __init__(self, max_entries: int = CACHE_MAX_ENTRIES):
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._counters: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._max_entries = max_entries
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def setex(self, key: str, ttl: int, value: str):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
+
+    def incr(self, key: str) -> int:
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + 1
+            return self._counters[key]
+
+    def get_counter(self, key: str) -> int:
+        with self._lock:
+            return self._counters.get(key, 0)
+
+    def size(self) -> int:
+        return len(self._entries)
+
+class RedisCacheBackend:
+    """Shared backend for multi-worker deployments (needs the redis package)"""
+
+    def __init__(self, url: str):
+        import redis
+        self._client = redis.Redis.from_url(url, socket_timeout=0.5, decode_responses=True)
+
+    def get(self, key: str) -> Optional[str]:
+        return self._client.get(key)
+
+    def setex(self, key: str, ttl: int, value: str):
+        self._client.setex(key, ttl, value)
+
+    def incr(self, key: str) -> int:
+        return self._client.incr(key)
+
+    def get_counter(self, key: str) -> int:
+        return int(self._client.get(key) or 0)
+
+    def size(self) -> Optional[int]:
+        return None
+
+def _create_backend():
+    if CACHE_BACKEND == "redis":
+        try:
+            return RedisCacheBackend(CACHE_REDIS_URL)
+        except ImportError:
+            print("[ERROR] CACHE_BACKEND=redis but the redis package is not installed, using the local cache")
+    return LocalCacheBackend()
+
+_backend = _create_backend()
+_metrics_lock = threading.Lock()
+_metrics: Dict[str, Dict[str, int]] = {}
+
+def set_backend(backend):
+    """Swap the cache backend, e.g. for a fake Redis in tests"""
+    global _backend
+    _backend = backend
+
+def _record(namespace: str, outcome: str):
+    with _metrics_lock:
+        counts = _metrics.setdefault(namespace, {"hits": 0, "misses": 0, "errors": 0})
+        counts[outcome] += 1
+
+def _version_key(tag: str) -> str:
+    return f"{CACHE_KEY_PREFIX}:version:{tag}"
+
+def invalidate(tag: str = AGGREGATES):
+    """Drop every entry cached under tag"""
+    try:
+        _backend.incr(_version_key(tag))
+    except Exception as e:
+        print(f"[ERROR] Cache invalidation failed for {tag}: {e}")
+        _record(tag, "errors")
+
+def get_or_compute(namespace: str, params: dict, compute: Callable, ttl: Optional[int] = None,
+                   tag: str = AGGREGATES):
+    """
+    Return the cached JSON-compatible result for (namespace, params), calling
+    compute() on a miss. Backend failures fall through to compute().
+    """
+    ttl = CACHE_TTL_SECONDS if ttl is None else ttl
+    if ttl <= 0:
+        return jsonable_encoder(compute())
+
+    key = None
+    try:
+        version = _backend.get_counter(_version_key(tag))
+        key = f"{CACHE_KEY_PREFIX}:{tag}:{version}:{namespace}:{json.dumps(params, sort_keys=True, default=str)}"
+        cached_value = _backend.get(key)
+        if cached_value is not None:
+            _record(namespace, "hits")
+            return json.loads(cached_value)
+        _record(namespace, "misses")
+    except Exception as e:
+        print(f"[ERROR] Cache read failed for {namespace}: {e}")
+        _record(namespace, "errors")
+
+    result = jsonable_encoder(compute())
+    if key is not None:
+        try:
+            _backend.setex(key, ttl, json.dumps(result))
+        except Exception as e:
+            print(f"[ERROR] Cache write failed for {namespace}: {e}")
+            _record(namespace, "errors")
+    return result
+
+def cached(namespace: str, ttl: Optional[int] = None, tag: str = AGGREGATES):
+    """
+    Cache a route handler's response. Query parameters form part of the key;
+    the db session and current user do not, so only use this on endpoints
+    whose result is the same for every user.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            params = {name: value for name, value in kwargs.items() if name not in ("db", "current_user")}
+            return get_or_compute(namespace, params, lambda: func(*args, **kwargs), ttl, tag)
+        return wrapper
+    return decorator
+
+def cache_metrics() -> dict:
+    with _metrics_lock:
+        namespaces = {
+            namespace: {**counts, "hit_rate": round(counts["hits"] / ((counts["hits"] + counts["misses"]) or 1), 4)}
+            for namespace, counts in _metrics.items()
+        }
+    hits = sum(counts["hits"] for counts in namespaces.values())
+    misses = sum(counts["misses"] for counts in namespaces.values())
+    return {
+        "backend": type(_backend).__name__,
+        "ttl_seconds": CACHE_TTL_SECONDS,
+        "entries": _backend.size(),
+        "hits": hits,
+        "misses": misses,
+        "hit_rate": round(hits / ((hits + misses) or 1), 4),
+        "namespaces": namespaces,
+    }
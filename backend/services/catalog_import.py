@@ -0,0 +1,337 @@
+"""
+Catalog Import
+Bulk upsert of services and parts from CSV or JSON Lines, e.g. supplier
+price lists.
+
+Records are read one at a time from the stream and written in batches of
+CATALOG_IMPORT_BATCH_SIZE: one query finds the rows that already exist
+(parts by part_number, services by name), then the new rows go in with a
+single multi-row INSERT and the rest with a single executemany UPDATE of the
+columns the record supplies. Categories are matched by name and created when
+missing. Records repeating a key within a batch are merged, later values
+winning, and counted as merged rather than as updates. A record that fails
+validation, or a line that is not UTF-8, is reported with its line number
+and skipped; a batch the database rejects is retried key by key so only the
+offending rows are lost. Each batch commits on its own and bumps the catalog
+version.
+
+Part stock is not imported: it only moves through the stock ledger (see
+services.stock_ledger), which records each movement and keeps stock above
+what accepted quotations have reserved.
+"""
+
+import codecs
+import csv
+import io
+import json
+import os
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from sqlalchemy import insert, select, update
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+from sqlalchemy.orm import Session
+
+from models.models import Part, PartCategory, Service, ServiceCategory
+from services.service_catalog import bump_catalog_version
+
+CATALOG_IMPORT_BATCH_SIZE = int(os.getenv("CATALOG_IMPORT_BATCH_SIZE", "1000"))
+MAX_REPORTED_ERRORS = 1000
+
+FORMATS = ("csv", "jsonl")
+
+def _text(value) -> Optional[str]:
+    if value is None:
+        return None
+    value = str(value).strip()
+    return value or None
+
+def _float(value) -> Optional[float]:
+    value = _text(value)
+    if value is None:
+        return None
+    number = float(value.replace(",", ""))
+    if number < 0:
+        raise ValueError(f"must not be negative: {value}")
+    return number
+
+def _int(value) -> Optional[int]:
+    number = _float(value)
+    if number is None:
+        return None
+    if number != int(number):
+        raise ValueError(f"must be a whole number: {value}")
+    return int(number)
+
+def _bool(value) -> Optional[bool]:
+    if isinstance(value, bool):
+        return value
+    value = _text(value)
+    if value is None:
+        return None
+    if value.lower() in ("1", "true", "yes", "y"):
+        return True
+    if value.lower() in ("0", "false", "no", "n"):
+        return False
+    raise ValueError(f"not a yes/no value: {value}")
+
+class ImportEntity:
+    """How records of one kind map onto a table"""
+
+    def __init__(self, model, category_model, key: str, fields: Dict[str, Callable], required: Tuple[str, ...]):
+        self.model = model
+        self.category_model = category_model
+        self.key = key
+        self.fields = fields
+        self.required = required
+
+IMPORT_ENTITIES = {
+    "parts": ImportEntity(
+        Part, PartCategory, "part_number",
+        {
+            "part_number": _text,
+            "name": _text,
+            "hsn_code": _text,
+            "description": _text,
+            "unit_price": _float,
+            "minimum_stock": _int,
+            "supplier": _text,
+            "is_oem": _bool,
+            "warranty_months": _int,
+            "auto_reduce_stock": _bool,
+        },
+        ("part_number", "name")
+    ),
+    "services": ImportEntity(
+        Service, ServiceCategory, "name",
+        {
+            "name": _text,
+            "description": _text,
+            "service_type": _text,
+            "base_price": _float,
+            "labor_hours": _float,
+            "labor_rate": _float,
+            "hsn_sac_code": _text,
+        },
+        ("name",)
+    ),
+}
+
+def _decoded_lines(stream, bad_lines: List[int]) -> Iterator[str]:
+    """
+    Text lines of a binary stream, decoded one at a time so a line that is
+    not UTF-8 costs only that line: its number goes on bad_lines and it is
+    passed on with the undecodable bytes replaced.
+    """
+    for line_number, line in enumerate(stream, start=1):
+        if line_number == 1 and line.startswith(codecs.BOM_UTF8):
+            line = line[len(codecs.BOM_UTF8):]
+        try:
+            yield line.decode("utf-8")
+        except UnicodeDecodeError:
+            bad_lines.append(line_number)
+            yield line.decode("utf-8", "replace")
+
+def read_records(stream, fmt: str) -> Iterator[Tuple[int, object]]:
+    """
+    (line number, record) pairs from a binary or text stream. A line that
+    cannot be decoded or parsed gives a ValueError in place of the record.
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"Unsupported import format: {fmt}")
+    bad_lines: List[int] = []
+    lines = stream if isinstance(stream, io.TextIOBase) else _decoded_lines(stream, bad_lines)
+
+    if fmt == "csv":
+        reader = csv.DictReader(lines)
+        if reader.fieldnames:
+            reader.fieldnames = [name.strip().lower() for name in reader.fieldnames]
+        if bad_lines:
+            raise ValueError("the header line is not valid UTF-8")
+        last_line = reader.line_num
+        for record in reader:
+            # A quoted field can span lines; the record fails if any of its lines did not decode
+            if bad_lines and bad_lines[-1] > last_line:
+                record = ValueError("not valid UTF-8")
+            last_line = reader.line_num
+            yield reader.line_num, record
+        return
+
+    for line_number, line in enumerate(lines, start=1):
+        if bad_lines and bad_lines[-1] == line_number:
+            yield line_number, ValueError("not valid UTF-8")
+            continue
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as e:
+            yield line_number, ValueError(f"Invalid JSON: {e}")
+            continue
+        if not isinstance(record, dict):
+            record = ValueError("each line must be a JSON object")
+        yield line_number, record
+
+def format_for_filename(filename: Optional[str]) -> Optional[str]:
+    extension = os.path.splitext(filename or "")[1].lower()
+    return {".csv": "csv", ".jsonl": "jsonl", ".ndjson": "jsonl"}.get(extension)
+
+class CatalogImport:
+    """One import run; feed it records and read the counts afterwards"""
+
+    def __init__(self, db: Session, entity: str, batch_size: int = CATALOG_IMPORT_BATCH_SIZE):
+        if entity not in IMPORT_ENTITIES:
+            raise ValueError(f"Unknown import entity: {entity}")
+        self.db = db
+        self.entity_name = entity
+        self.entity = IMPORT_ENTITIES[entity]
+        self.batch_size = max(1, batch_size)
+        self.processed = 0
+        self.inserted = 0
+        self.updated = 0
+        self.merged = 0
+        self.failed = 0
+        self.errors: List[dict] = []
+        self._categories: Dict[str, int] = {
+            name.lower(): category_id
+            for category_id, name in db.execute(select(self.entity.category_model.id, self.entity.category_model.name))
+        }
+
+    def report(self) -> dict:
+        return {
+            "entity": self.entity_name,
+            "processed": self.processed,
+            "inserted": self.inserted,
+            "updated": self.updated,
+            "merged": self.merged,
+            "failed": self.failed,
+            "errors": sorted(self.errors, key=lambda error: error["line"]),
+            "errors_truncated": self.failed > len(self.errors),
+        }
+
+    def _error(self, line: int, message: str):
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"line": line, "error": message})
+
+    def run(self, records: Iterable[Tuple[int, object]]) -> dict:
+        batch: List[Tuple[int, dict]] = []
+        for line, record in records:
+            self.processed += 1
+            try:
+                if isinstance(record, Exception):
+                    raise record
+                batch.append((line, self._row(record)))
+            except ValueError as e:
+                self._error(line, str(e))
+                continue
+            if len(batch) >= self.batch_size:
+                self._write_batch(batch)
+                batch = []
+        if batch:
+            self._write_batch(batch)
+        return self.report()
+
+    def _row(self, record: dict) -> dict:
+        """Validated column values for a record; only the columns it supplies"""
+        record = {str(name).strip().lower(): value for name, value in record.items() if name is not None}
+        row = {}
+        for field, parse in self.entity.fields.items():
+            if field in record:
+                try:
+                    value = parse(record[field])
+                except ValueError as e:
+                    raise ValueError(f"{field}: {e}")
+                if value is not None:
+                    row[field] = value
+        for field in self.entity.required:
+            if field not in row:
+                raise ValueError(f"{field} is required")
+
+        category = _text(record.get("category") or record.get("category_name"))
+        if category:
+            row["category_id"] = self._category_id(category)
+        elif _text(record.get("category_id")):
+            category_id = _int(record["category_id"])
+            if category_id not in self._categories.values():
+                raise ValueError(f"category_id: no category {category_id}")
+            row["category_id"] = category_id
+        return row
+
+    def _category_id(self, name: str) -> int:
+        category_id = self._categories.get(name.lower())
+        if category_id is None:
+            model = self.entity.category_model
+            try:
+                with self.db.begin_nested():
+                    category_id = self.db.execute(insert(model).values(name=name).returning(model.id)).scalar()
+            except IntegrityError:
+                # Created by a concurrent import, or differs only in case
+                category_id = self.db.execute(select(model.id).where(model.name == name)).scalar()
+                if category_id is None:
+                    raise ValueError(f"category: could not create {name}")
+            self._categories[name.lower()] = category_id
+        return category_id
+
+    def _write_batch(self, batch: List[Tuple[int, dict]]):
+        rows = self._merge(batch)
+        try:
+            with self.db.begin_nested():
+                inserted, updated, rejected = self._upsert(rows)
+        except SQLAlchemyError:
+            # Find the keys the database rejects and keep the rest
+            inserted, updated, rejected = 0, 0, []
+            for key, (lines, row) in rows.items():
+                try:
+                    with self.db.begin_nested():
+                        key_inserted, key_updated, key_rejected = self._upsert({key: (lines, row)})
+                    inserted += key_inserted
+                    updated += key_updated
+                    rejected += key_rejected
+                except SQLAlchemyError as e:
+                    rejected += [(line, str(getattr(e, "orig", e))) for line in lines]
+        bump_catalog_version(self.db.connection())
+        self.db.commit()
+
+        for line, message in rejected:
+            self._error(line, message)
+        self.inserted += inserted
+        self.updated += updated
+        self.merged += len(batch) - inserted - updated - len(rejected)
+
+    def _merge(self, batch: List[Tuple[int, dict]]) -> Dict[str, Tuple[List[int], dict]]:
+        """key -> (lines, row) with the records for each key merged, later records winning"""
+        rows: Dict[str, Tuple[List[int], dict]] = {}
+        for line, row in batch:
+            key = row[self.entity.key]
+            if key in rows:
+                rows[key][0].append(line)
+                rows[key] = (rows[key][0], {**rows[key][1], **row})
+            else:
+                rows[key] = ([line], row)
+        return rows
+
+    def _upsert(self, rows: Dict[str, Tuple[List[int], dict]]) -> Tuple[int, int, List[Tuple[int, str]]]:
+        """Write merged rows; returns the rows inserted, the rows updated and the (line, error) of records left out"""
+        model = self.entity.model
+        key_column = getattr(model, self.entity.key)
+
+        existing: Dict[str, int] = {}
+        for row_id, key in self.db.execute(
+            select(model.id, key_column).where(key_column.in_(list(rows))).order_by(model.id)
+        ):
+            existing.setdefault(key, row_id)
+
+        new_rows, changed_rows, rejected = [], [], []
+        for key, (lines, row) in rows.items():
+            if key in existing:
+                changed_rows.append({"id": existing[key], **row})
+            elif "category_id" in row:
+                new_rows.append(row)
+            else:
+                rejected += [(line, "category is required for new rows") for line in lines]
+
+        if new_rows:
+            self.db.execute(insert(model), new_rows)
+        if changed_rows:
+            self.db.execute(update(model), changed_rows)
+        return len(new_rows), len(changed_rows), rejected
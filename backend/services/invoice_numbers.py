@@ -0,0 +1,119 @@
+"""
+Invoice Numbers
+Allocates invoice numbers like INV/2026-27/000123 from the invoice_sequences
+counter table: one row per (prefix, financial year), advanced with a single
+UPDATE so concurrent requests can never draw the same number.
+"""
+
+import os
+import threading
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from database.database import SessionLocal
+from models.models import InvoiceSequence
+
+INVOICE_PREFIX = os.getenv("INVOICE_PREFIX", "INV")
+INVOICE_NUMBER_DIGITS = int(os.getenv("INVOICE_NUMBER_DIGITS", "6"))
+# 1 = allocate inside the invoice's transaction (gapless); >1 = reserve numbers
+# in blocks of this size per process (faster, but unused numbers are skipped on restart)
+INVOICE_NUMBER_BLOCK_SIZE = int(os.getenv("INVOICE_NUMBER_BLOCK_SIZE", "1"))
+
+# (prefix, year) -> [next number, last reserved number]
+_reserved_blocks: Dict[Tuple[str, int], List[int]] = {}
+_block_lock = threading.Lock()
+
+def financial_year_start(when: datetime) -> int:
+    """Indian financial year (April-March) that a date falls in, by its starting year"""
+    return when.year if when.month >= 4 else when.year - 1
+
+def format_invoice_number(prefix: str, year: int, number: int) -> str:
+    return f"{prefix}/{year}-{(year + 1) % 100:02d}/{number:0{INVOICE_NUMBER_DIGITS}d}"
+
+def reserve_numbers(db: Session, prefix: str, year: int, count: int = 1) -> int:
+    """
+    Advance the (prefix, year) counter by count and return its new value;
+    the caller owns numbers (value - count, value]. The row stays locked
+    until db commits or rolls back.
+    """
+    advance = (
+        update(InvoiceSequence)
+        .where(InvoiceSequence.prefix == prefix, InvoiceSequence.year == year)
+        .values(last_number=InvoiceSequence.last_number + count)
+        .returning(InvoiceSequence.last_number)
+        .execution_options(synchronize_session=False)
+    )
+    last_number = db.execute(advance).scalar()
+    if last_number is not None:
+        return last_number
+
+    # First number of a new series
+    try:
+        with db.begin_nested():
+            db.add(InvoiceSequence(prefix=prefix, year=year, last_number=count))
+        return count
+    except IntegrityError:
+        # Another request started the series first
+        return db.execute(advance).scalar()
+
+def _next_from_block(prefix: str, year: int) -> int:
+    with _block_lock:
+        block = _reserved_blocks.get((prefix, year))
+        if block is None or block[0] > block[1]:
+            # Reserve in a short transaction of its own so the counter row is not
+            # held for the lifetime of the invoice being created
+            block_db = SessionLocal()
+            try:
+                last_number = reserve_numbers(block_db, prefix, year, INVOICE_NUMBER_BLOCK_SIZE)
+                block_db.commit()
+            finally:
+                block_db.close()
+            block = _reserved_blocks[(prefix, year)] = [last_number - INVOICE_NUMBER_BLOCK_SIZE + 1, last_number]
+
+        number = block[0]
+        block[0] += 1
+        return number
+
+def allocate_invoice_number(db: Session, invoice_date: Optional[datetime] = None,
+                            prefix: Optional[str] = None) -> str:
+    """
+    Next invoice number for the financial year of invoice_date.
+
+    In the default mode the number is drawn in db's transaction, so it is
+    released again if the invoice is rolled back. In block mode call it
+    before the invoice's first write: new blocks are reserved on a separate
+    connection, which would otherwise wait on this transaction's lock.
+    """
+    prefix = prefix or INVOICE_PREFIX
+    year = financial_year_start(invoice_date or datetime.now())
+
+    if INVOICE_NUMBER_BLOCK_SIZE > 1:
+        number = _next_from_block(prefix, year)
+    else:
+        number = reserve_numbers(db, prefix, year)
+
+    return format_invoice_number(prefix, year, number)
+
+def allocate_invoice_numbers(db: Session, count: int, invoice_date: Optional[datetime] = None,
+                             prefix: Optional[str] = None) -> List[str]:
+    """
+    count consecutive invoice numbers for one financial year, for invoices
+    created together. The default mode advances the counter once for all of
+    them; block mode draws them as allocate_invoice_number does.
+    """
+    prefix = prefix or INVOICE_PREFIX
+    year = financial_year_start(invoice_date or datetime.now())
+    if count <= 0:
+        return []
+
+    if INVOICE_NUMBER_BLOCK_SIZE > 1:
+        numbers = [_next_from_block(prefix, year) for _ in range(count)]
+    else:
+        last_number = reserve_numbers(db, prefix, year, count)
+        numbers = range(last_number - count + 1, last_number + 1)
+
+    return [format_invoice_number(prefix, year, number) for number in numbers]
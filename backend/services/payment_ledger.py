@@ -0,0 +1,179 @@
+"""
+Payment Ledger
+payments is an append-only ledger: a payment is a new row, a correction is a
+new row with a negative amount, and no row is ever updated or deleted. An
+invoice's paid_amount is the sum of its entries; balance_due and
+payment_status follow from it.
+
+post_payment() appends an entry and moves the invoice with one
+UPDATE ... SET paid_amount = paid_amount + :amount, so concurrent payments
+never overwrite each other, and moves the revenue rollup in the same
+transaction. reconcile_balances() recomputes every invoice from the ledger
+with one grouped query and reports, or fixes, the ones that have drifted.
+"""
+
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+from sqlalchemy import case, func, or_, update
+from sqlalchemy.orm import Session
+
+from models.models import Invoice, Payment
+from services.revenue_rollup import (
+    SNAPSHOT_COLUMNS, apply_rollup_changes, rebuild_daily_revenue_rollup, row_snapshot
+)
+
+# Amounts closer than this are equal (paise rounding)
+MONEY_TOLERANCE = 0.005
+
+# Attempts before giving up on an invoice whose status keeps changing underneath
+POST_ATTEMPTS = 3
+
+class InvoiceNotFound(Exception):
+    def __init__(self, invoice_id: int):
+        self.invoice_id = invoice_id
+        super().__init__(f"Invoice not found: {invoice_id}")
+
+class CorrectionExceedsPaid(ValueError):
+    def __init__(self, invoice_id: int, amount: float, paid: float):
+        self.invoice_id = invoice_id
+        super().__init__(f"A correction of {-amount:.2f} is more than the {paid:.2f} paid on this invoice")
+
+def settled_status(paid: float, total: float, current: Optional[str]) -> str:
+    """payment_status for an invoice with paid of total paid; overdue stays overdue until paid"""
+    if paid >= total - MONEY_TOLERANCE:
+        return "paid"
+    if current == "overdue":
+        return "overdue"
+    return "partially_paid" if paid > MONEY_TOLERANCE else "pending"
+
+def _settled_status_sql(paid, total):
+    """settled_status() as a SQL expression over the row being updated"""
+    return case(
+        (paid >= total - MONEY_TOLERANCE, "paid"),
+        (Invoice.payment_status == "overdue", "overdue"),
+        (paid > MONEY_TOLERANCE, "partially_paid"),
+        else_="pending"
+    )
+
+def post_payment(db: Session, invoice_id: int, amount: float, payment_method: str = "Cash",
+                 transaction_id: Optional[str] = None, payment_date: Optional[datetime] = None,
+                 notes: Optional[str] = None, payment_status: Optional[str] = None) -> Tuple[Optional[Payment], dict]:
+    """
+    Append a ledger entry of amount (none if it is 0) and apply it to the
+    invoice. A negative amount is a correction and may not take paid_amount
+    below zero. payment_status overrides the status derived from the new
+    balance. Returns the entry and the invoice's invoice_number,
+    previous_status, payment_status, paid_amount and balance_due. The
+    caller commits.
+    """
+    paid = func.coalesce(Invoice.paid_amount, 0) + amount
+    total = func.coalesce(Invoice.total_amount, 0)
+
+    for _ in range(POST_ATTEMPTS):
+        seen = db.query(Invoice.payment_status, Invoice.paid_amount).filter(Invoice.id == invoice_id).first()
+        if seen is None:
+            raise InvoiceNotFound(invoice_id)
+        if (seen.paid_amount or 0) + amount < -MONEY_TOLERANCE:
+            raise CorrectionExceedsPaid(invoice_id, amount, seen.paid_amount or 0)
+
+        # Conditional on the status just read, so the rollup moves out of the right bucket
+        row = db.execute(
+            update(Invoice)
+            .where(
+                Invoice.id == invoice_id,
+                Invoice.payment_status.is_not_distinct_from(seen.payment_status),
+                paid >= -MONEY_TOLERANCE
+            )
+            .values(
+                paid_amount=paid,
+                balance_due=total - paid,
+                payment_status=payment_status or _settled_status_sql(paid, total)
+            )
+            .returning(*SNAPSHOT_COLUMNS, Invoice.invoice_number, Invoice.balance_due)
+            .execution_options(synchronize_session=False)
+        ).mappings().first()
+        if row is not None:
+            break
+    else:
+        raise RuntimeError(f"Invoice {invoice_id} changed during the payment; try again")
+
+    row = dict(row)
+    result = {
+        "invoice_number": row.pop("invoice_number"),
+        "previous_status": seen.payment_status,
+        "payment_status": row["payment_status"],
+        "paid_amount": row["paid_amount"],
+        "balance_due": row.pop("balance_due"),
+    }
+    apply_rollup_changes(db, [(
+        row_snapshot(row, payment_status=seen.payment_status, paid_amount=row["paid_amount"] - amount),
+        row_snapshot(row)
+    )])
+
+    payment = None
+    if amount:
+        payment = Payment(
+            invoice_id=invoice_id,
+            amount=amount,
+            payment_method=payment_method,
+            transaction_id=transaction_id,
+            payment_date=payment_date or datetime.now(),
+            notes=notes
+        )
+        db.add(payment)
+        db.flush()
+    return payment, result
+
+def reconcile_balances(db: Session, apply: bool = False) -> List[dict]:
+    """
+    Compare every invoice's paid_amount and balance_due with its ledger and
+    return the invoices that disagree. With apply the invoices are rewritten
+    from the ledger (status rederived), the rollup is rebuilt over their
+    dates (the drift may never have reached it), and the result committed.
+    """
+    ledger = db.query(
+        Payment.invoice_id.label("invoice_id"),
+        func.sum(Payment.amount).label("paid")
+    ).group_by(Payment.invoice_id).subquery()
+    ledger_paid = func.coalesce(ledger.c.paid, 0)
+    expected_balance = func.coalesce(Invoice.total_amount, 0) - ledger_paid
+
+    rows = db.query(
+        Invoice.id, Invoice.invoice_number, Invoice.balance_due, ledger_paid.label("ledger_paid"), *SNAPSHOT_COLUMNS
+    ).outerjoin(ledger, ledger.c.invoice_id == Invoice.id).filter(or_(
+        func.abs(func.coalesce(Invoice.paid_amount, 0) - ledger_paid) > MONEY_TOLERANCE,
+        Invoice.balance_due.is_(None),
+        func.abs(Invoice.balance_due - expected_balance) > MONEY_TOLERANCE
+    )).order_by(Invoice.id).all()
+
+    drift, updates, days = [], [], []
+    for row in rows:
+        row = row._asdict()
+        invoice_id, invoice_number, balance_due = row.pop("id"), row.pop("invoice_number"), row.pop("balance_due")
+        paid = row.pop("ledger_paid")
+        total = row["total_amount"] or 0
+        status = row["payment_status"]
+        if abs((row["paid_amount"] or 0) - paid) > MONEY_TOLERANCE:
+            status = settled_status(paid, total, status)
+
+        drift.append({
+            "invoice_id": invoice_id,
+            "invoice_number": invoice_number,
+            "paid_amount": row["paid_amount"],
+            "ledger_paid": paid,
+            "balance_due": balance_due,
+            "expected_balance": total - paid,
+            "payment_status": row["payment_status"],
+            "expected_status": status,
+        })
+        updates.append({"id": invoice_id, "paid_amount": paid, "balance_due": total - paid, "payment_status": status})
+        if row["invoice_date"] is not None:
+            days.append(row["invoice_date"].date())
+
+    if apply and updates:
+        db.execute(update(Invoice), updates)
+        if days:
+            rebuild_daily_revenue_rollup(db, min(days), max(days))
+        db.commit()
+    return drift
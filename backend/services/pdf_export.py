@@ -0,0 +1,170 @@
+"""
+PDF Export
+Streams many invoice PDFs as a ZIP archive. PDFs are rendered a batch at a
+time in the render pool and written to the response as soon as each one is
+ready, so memory use stays flat however many invoices are exported.
+
+Job progress is kept in the pdf_export_jobs table, saved after every PDF
+the client has received, so any worker process can answer a progress poll
+for an export another worker is streaming.
+"""
+
+import asyncio
+import json
+import os
+import re
+import time
+import uuid
+import zipfile
+from typing import AsyncIterator, List, Optional
+
+from sqlalchemy import delete, select, update
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from database.database import SessionLocal
+from models.models import PdfExportJob
+from services.pdf_service import invoice_documents, render_document
+from utils.zip_stream import ZipChunkStream
+
+PDF_EXPORT_BATCH_SIZE = int(os.getenv("PDF_EXPORT_BATCH_SIZE", "25"))
+PDF_EXPORT_MAX_JOBS = 100
+
+# Job fields stored in pdf_export_jobs; invoice_ids only lives with the stream
+_JSON_FIELDS = ("filters", "failed")
+_STATE_FIELDS = ("status", "completed", "failed", "last_invoice_id", "finished_at")
+
+def _load_documents(invoice_ids: List[int]) -> List[dict]:
+    db = SessionLocal()
+    try:
+        return invoice_documents(db, invoice_ids)
+    finally:
+        db.close()
+
+def _archive_name(doc: dict) -> str:
+    number = re.sub(r"[^A-Za-z0-9._-]+", "-", doc.get("number") or str(doc["id"]))
+    return f"{number}.pdf"
+
+def _stored(job: dict, fields) -> dict:
+    return {
+        field: json.dumps(job[field], default=str) if field in _JSON_FIELDS else job[field]
+        for field in fields
+    }
+
+def create_export_job(db: Session, invoice_ids: List[int], filters: dict) -> dict:
+    """Register a new export so its progress can be polled while it streams"""
+    job = {
+        "export_id": uuid.uuid4().hex,
+        "status": "pending",
+        "filters": filters,
+        "total": len(invoice_ids),
+        "completed": 0,
+        "failed": [],
+        "last_invoice_id": filters.get("after_id"),
+        "started_at": time.time(),
+        "finished_at": None,
+    }
+    db.add(PdfExportJob(**_stored(job, job)))
+    # Keep the most recent PDF_EXPORT_MAX_JOBS
+    recent = select(PdfExportJob.export_id).order_by(PdfExportJob.started_at.desc()).limit(PDF_EXPORT_MAX_JOBS)
+    db.flush()
+    db.execute(delete(PdfExportJob).where(PdfExportJob.export_id.not_in(recent)).execution_options(
+        synchronize_session=False
+    ))
+    db.commit()
+    return {**job, "invoice_ids": invoice_ids}
+
+def _save_progress(job: dict):
+    db = SessionLocal()
+    try:
+        db.execute(
+            update(PdfExportJob)
+            .where(PdfExportJob.export_id == job["export_id"])
+            .values(_stored(job, _STATE_FIELDS))
+        )
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        print(f"[ERROR] PDF export {job['export_id']}: saving progress failed: {e}")
+    finally:
+        db.close()
+
+def get_export_job(db: Session, export_id: str) -> Optional[dict]:
+    row = db.get(PdfExportJob, export_id)
+    if row is None:
+        return None
+    job = {column.key: getattr(row, column.key) for column in PdfExportJob.__table__.columns}
+    for field in _JSON_FIELDS:
+        job[field] = json.loads(job[field]) if job[field] else ({} if field == "filters" else [])
+    return job
+
+def export_progress(job: dict) -> dict:
+    """Public view of an export job"""
+    progress = {key: value for key, value in job.items() if key != "invoice_ids"}
+    progress["remaining"] = job["total"] - job["completed"] - len(job["failed"])
+    # Pass this as after_id to continue an export that was cut off
+    progress["resume_after_id"] = job["last_invoice_id"]
+    return progress
+
+async def stream_invoice_zip(job: dict) -> AsyncIterator[bytes]:
+    """
+    Yield a ZIP archive of the job's invoices chunk by chunk.
+
+    Invoices are processed in ascending id order and last_invoice_id only
+    advances once the chunk holding a PDF has been handed to the client, so
+    an interrupted download can be continued with after_id=last_invoice_id.
+    A manifest.json listing exported and failed invoices is written as the
+    last entry.
+    """
+    stream = ZipChunkStream()
+    # PDF content streams are already Flate-compressed, deflating again gains little
+    archive = zipfile.ZipFile(stream, "w", compression=zipfile.ZIP_STORED)
+    exported = []
+    renders = []
+    job["status"] = "running"
+
+    try:
+        await run_in_threadpool(_save_progress, job)
+        invoice_ids = job["invoice_ids"]
+        for start in range(0, len(invoice_ids), PDF_EXPORT_BATCH_SIZE):
+            batch_ids = invoice_ids[start:start + PDF_EXPORT_BATCH_SIZE]
+
+            docs = await run_in_threadpool(_load_documents, batch_ids)
+
+            loaded_ids = {doc["id"] for doc in docs}
+            for invoice_id in batch_ids:
+                if invoice_id not in loaded_ids:
+                    job["failed"].append({"invoice_id": invoice_id, "error": "Invoice not found"})
+
+            renders = [asyncio.ensure_future(render_document(doc)) for doc in docs]
+            for doc, render in zip(docs, renders):
+                try:
+                    pdf_bytes, _, _ = await render
+                except Exception as e:
+                    print(f"[ERROR] PDF export {job['export_id']}: invoice {doc['id']} failed: {e}")
+                    job["failed"].append({"invoice_id": doc["id"], "error": str(e)})
+                    continue
+
+                name = _archive_name(doc)
+                archive.writestr(name, pdf_bytes)
+                exported.append({"invoice_id": doc["id"], "invoice_number": doc["number"], "file": name})
+                yield stream.drain()
+                # Resumed only after the server has sent the chunk holding this PDF
+                job["completed"] += 1
+                job["last_invoice_id"] = doc["id"]
+                await run_in_threadpool(_save_progress, job)
+
+        manifest = {key: job[key] for key in ("export_id", "filters", "total", "failed")}
+        manifest["exported"] = exported
+        archive.writestr("manifest.json", json.dumps(manifest, indent=2, default=str))
+        archive.close()
+        job["status"] = "completed"
+        yield stream.drain()
+    finally:
+        for render in renders:
+            render.cancel()
+        if job["status"] != "completed":
+            job["status"] = "interrupted"
+        job["finished_at"] = time.time()
+        # Not awaited: a cancelled download can no longer await here
+        _save_progress(job)
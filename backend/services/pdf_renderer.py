@@ -0,0 +1,285 @@
+"""
+PDF Renderer
+Builds invoice and quotation PDFs from plain document dicts.
+
+Everything in this module runs inside the PDF worker processes, so the
+render functions only take picklable dicts (see services.pdf_service for
+how those are built from the database) and return the PDF bytes.
+"""
+
+import io
+import os
+from xml.sax.saxutils import escape
+
+import qrcode
+from PIL import Image as PILImage
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.styles import ParagraphStyle, getSampleStyleSheet
+from reportlab.lib.units import mm
+from reportlab.platypus import Image, Paragraph, SimpleDocTemplate, Spacer, Table, TableStyle
+
+# Bump when the layout changes so cached PDFs are re-rendered
+RENDERER_VERSION = "2"
+
+COMPANY_INFO = {
+    "name": "OM MURUGAN AUTO WORKS",
+    "tagline": "Complete Multibrand Auto Care Services",
+    "address": "No.8 4th Main Road, Manikandapuram, Thirumullaivoyal, Chennai-600 062",
+    "phone": "9884551560",
+    "email": "ommurugan201205@gmail.com",
+    "pan": "AABCO1234M",
+    "gstin": "33AABCO1234M1ZX",
+}
+
+LOGO_PATH = os.getenv(
+    "PDF_LOGO_PATH",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "logo-om-murugan.png")
+)
+LOGO_MAX_PIXELS = 256
+
+BRAND_COLOR = colors.HexColor("#6B21A8")
+
+# Downscaled logo, loaded once per worker process
+_logo_cache = None
+
+def _get_logo():
+    """Return the company logo as small PNG bytes (the source file is 1024px / 1.4 MB)"""
+    global _logo_cache
+    if _logo_cache is None:
+        try:
+            with PILImage.open(LOGO_PATH) as logo:
+                logo = logo.convert("RGBA")
+                logo.thumbnail((LOGO_MAX_PIXELS, LOGO_MAX_PIXELS))
+                buffer = io.BytesIO()
+                logo.save(buffer, format="PNG", optimize=True)
+                _logo_cache = buffer.getvalue()
+        except (OSError, ValueError) as e:
+            print(f"[WARNING] PDF logo not available at {LOGO_PATH}: {e}")
+            _logo_cache = b""
+    return _logo_cache
+
+def _qr_image(data: str, size: float):
+    """Render a QR code for the given data as a reportlab Image"""
+    qr = qrcode.QRCode(border=1, box_size=4)
+    qr.add_data(data)
+    qr.make(fit=True)
+    buffer = io.BytesIO()
+    qr.make_image(fill_color="black", back_color="white").save(buffer, format="PNG")
+    buffer.seek(0)
+    return Image(buffer, width=size, height=size)
+
+def _text(value, default: str = "") -> str:
+    """A user-supplied value as Paragraph text; only the templates here are markup"""
+    return escape(str(value)) if value not in (None, "") else default
+
+def _money(amount) -> str:
+    return f"Rs. {float(amount or 0):,.2f}"
+
+_ONES = ["", "One", "Two", "Three", "Four", "Five", "Six", "Seven", "Eight", "Nine", "Ten",
+         "Eleven", "Twelve", "Thirteen", "Fourteen", "Fifteen", "Sixteen", "Seventeen", "Eighteen", "Nineteen"]
+_TENS = ["", "", "Twenty", "Thirty", "Forty", "Fifty", "Sixty", "Seventy", "Eighty", "Ninety"]
+
+def _words_below_thousand(n: int) -> str:
+    words = []
+    if n >= 100:
+        words.append(f"{_ONES[n // 100]} Hundred")
+        n %= 100
+    if n >= 20:
+        words.append(_TENS[n // 10])
+        n %= 10
+    if n:
+        words.append(_ONES[n])
+    return " ".join(words)
+
+def _indian_words(n: int) -> str:
+    if n < 1000:
+        return _words_below_thousand(n)
+    for divisor, label in ((10000000, "Crore"), (100000, "Lakh"), (1000, "Thousand")):
+        if n >= divisor:
+            head = f"{_indian_words(n // divisor)} {label}"
+            rest = n % divisor
+            return f"{head} {_indian_words(rest)}" if rest else head
+
+def amount_in_words(amount) -> str:
+    """Spell out a rupee amount using the Indian numbering system (lakh, crore)"""
+    rupees = int(round(float(amount or 0)))
+    if rupees <= 0:
+        return "Rupees Zero Only"
+    return f"Rupees {_indian_words(rupees)} Only"
+
+def _styles():
+    styles = getSampleStyleSheet()
+    return {
+        "title": ParagraphStyle("title", parent=styles["Title"], fontSize=16, textColor=BRAND_COLOR, spaceAfter=0),
+        "company": ParagraphStyle("company", parent=styles["Heading1"], fontSize=15, textColor=BRAND_COLOR, spaceAfter=1),
+        "small": ParagraphStyle("small", parent=styles["Normal"], fontSize=8, leading=10),
+        "normal": ParagraphStyle("normal", parent=styles["Normal"], fontSize=9, leading=11),
+        "bold": ParagraphStyle("bold", parent=styles["Normal"], fontSize=9, leading=11, fontName="Helvetica-Bold"),
+    }
+
+def _header(doc: dict, title: str, styles: dict, width: float):
+    """Company logo, name and address block with the document title"""
+    company = Paragraph(
+        f"{COMPANY_INFO['name']}<br/>"
+        f"<font size=8 color='black'>{COMPANY_INFO['tagline']}</font>",
+        styles["company"]
+    )
+    address = Paragraph(
+        f"{COMPANY_INFO['address']}<br/>"
+        f"Phone: {COMPANY_INFO['phone']} | Email: {COMPANY_INFO['email']}<br/>"
+        f"PAN: {COMPANY_INFO['pan']} | GSTIN: {COMPANY_INFO['gstin']}",
+        styles["small"]
+    )
+
+    logo_bytes = _get_logo()
+    logo = Image(io.BytesIO(logo_bytes), width=22 * mm, height=22 * mm) if logo_bytes else ""
+
+    header = Table(
+        [[logo, [company, address], Paragraph(title, styles["title"])]],
+        colWidths=[26 * mm, width - 76 * mm, 50 * mm]
+    )
+    header.setStyle(TableStyle([
+        ("VALIGN", (0, 0), (-1, -1), "MIDDLE"),
+        ("ALIGN", (2, 0), (2, 0), "RIGHT"),
+        ("LINEBELOW", (0, 0), (-1, 0), 1.5, BRAND_COLOR),
+    ]))
+    return header
+
+def _party_block(doc: dict, number_label: str, date_rows: list, styles: dict, width: float):
+    """Customer / vehicle details next to the document number and dates"""
+    client = doc.get("client") or {}
+    vehicle = doc.get("vehicle") or {}
+
+    customer = Paragraph(
+        f"<b>Bill To</b><br/>{_text(client.get('name'), 'N/A')}<br/>"
+        f"{_text(client.get('address'))}<br/>"
+        f"Phone: {_text(client.get('mobile') or client.get('phone'), 'N/A')}",
+        styles["normal"]
+    )
+    vehicle_info = Paragraph(
+        f"<b>Vehicle</b><br/>{_text(vehicle.get('registration_number'), 'N/A')}<br/>"
+        f"{_text(vehicle.get('brand_name'))} {_text(vehicle.get('model_name'))}",
+        styles["normal"]
+    )
+    meta_lines = [f"<b>{number_label}:</b> {_text(doc.get('number'))}"] + [
+        f"<b>{label}:</b> {_text(value)}" for label, value in date_rows if value
+    ]
+    meta = Paragraph("<br/>".join(meta_lines), styles["normal"])
+
+    block = Table([[customer, vehicle_info, meta]], colWidths=[width * 0.4, width * 0.3, width * 0.3])
+    block.setStyle(TableStyle([
+        ("VALIGN", (0, 0), (-1, -1), "TOP"),
+        ("BOX", (0, 0), (-1, -1), 0.5, colors.grey),
+        ("INNERGRID", (0, 0), (-1, -1), 0.5, colors.grey),
+    ]))
+    return block
+
+def _items_table(items: list, styles: dict, width: float):
+    rows = [["#", "Description", "HSN/SAC", "Qty", "Rate", "Amount"]]
+    for index, item in enumerate(items, start=1):
+        rows.append([
+            str(index),
+            Paragraph(_text(item.get("name")), styles["normal"]),
+            item.get("hsn_sac") or "",
+            f"{float(item.get('quantity') or 0):g}",
+            _money(item.get("rate")),
+            _money(item.get("total")),
+        ])
+
+    table = Table(
+        rows,
+        colWidths=[8 * mm, width - 98 * mm, 20 * mm, 14 * mm, 28 * mm, 28 * mm],
+        repeatRows=1
+    )
+    table.setStyle(TableStyle([
+        ("BACKGROUND", (0, 0), (-1, 0), BRAND_COLOR),
+        ("TEXTCOLOR", (0, 0), (-1, 0), colors.white),
+        ("FONTNAME", (0, 0), (-1, 0), "Helvetica-Bold"),
+        ("FONTSIZE", (0, 0), (-1, -1), 8.5),
+        ("ALIGN", (3, 0), (-1, -1), "RIGHT"),
+        ("VALIGN", (0, 0), (-1, -1), "MIDDLE"),
+        ("GRID", (0, 0), (-1, -1), 0.4, colors.grey),
+        ("ROWBACKGROUNDS", (0, 1), (-1, -1), [colors.white, colors.HexColor("#F5F3FF")]),
+    ]))
+    return table
+
+def _totals_block(doc: dict, styles: dict, width: float):
+    """GST breakdown and grand total, with the QR code alongside when available"""
+    rows = [["Taxable Amount", _money(doc.get("subtotal"))]]
+    if doc.get("discount_amount"):
+        rows.append(["Discount", f"- {_money(doc.get('discount_amount'))}"])
+    if doc.get("gst_enabled", True):
+        if doc.get("igst_amount") and not (doc.get("cgst_amount") or doc.get("sgst_amount")):
+            rows.append([f"IGST @ {float(doc.get('igst_rate') or 0):g}%", _money(doc.get("igst_amount"))])
+        else:
+            rows.append([f"CGST @ {float(doc.get('cgst_rate') or 0):g}%", _money(doc.get("cgst_amount"))])
+            rows.append([f"SGST @ {float(doc.get('sgst_rate') or 0):g}%", _money(doc.get("sgst_amount"))])
+    if doc.get("round_off"):
+        rows.append(["Round Off", _money(doc.get("round_off"))])
+    rows.append(["Grand Total", _money(doc.get("total_amount"))])
+
+    totals = Table(rows, colWidths=[40 * mm, 32 * mm])
+    totals.setStyle(TableStyle([
+        ("ALIGN", (1, 0), (1, -1), "RIGHT"),
+        ("FONTSIZE", (0, 0), (-1, -1), 9),
+        ("LINEABOVE", (0, -1), (-1, -1), 1, BRAND_COLOR),
+        ("FONTNAME", (0, -1), (-1, -1), "Helvetica-Bold"),
+    ]))
+
+    left = [Paragraph(f"<b>Amount in words:</b> {amount_in_words(doc.get('total_amount'))}", styles["normal"])]
+    if doc.get("notes"):
+        left.append(Spacer(1, 3 * mm))
+        left.append(Paragraph(f"<b>Notes:</b> {_text(doc['notes'])}", styles["small"]))
+    if doc.get("qr_data"):
+        left.append(Spacer(1, 3 * mm))
+        left.append(_qr_image(doc["qr_data"], 24 * mm))
+
+    block = Table([[left, totals]], colWidths=[width - 76 * mm, 76 * mm])
+    block.setStyle(TableStyle([("VALIGN", (0, 0), (-1, -1), "TOP")]))
+    return block
+
+def _render(doc: dict, title: str, number_label: str, date_rows: list) -> bytes:
+    buffer = io.BytesIO()
+    pdf = SimpleDocTemplate(
+        buffer,
+        pagesize=A4,
+        leftMargin=12 * mm,
+        rightMargin=12 * mm,
+        topMargin=10 * mm,
+        bottomMargin=12 * mm,
+        title=f"{title} {doc.get('number')}",
+        author=COMPANY_INFO["name"],
+    )
+    width = A4[0] - pdf.leftMargin - pdf.rightMargin
+    styles = _styles()
+
+    story = [
+        _header(doc, title, styles, width),
+        Spacer(1, 4 * mm),
+        _party_block(doc, number_label, date_rows, styles, width),
+        Spacer(1, 4 * mm),
+        _items_table(doc.get("items") or [], styles, width),
+        Spacer(1, 4 * mm),
+        _totals_block(doc, styles, width),
+        Spacer(1, 8 * mm),
+        Paragraph(f"For {COMPANY_INFO['name']}<br/><br/><br/>Authorised Signatory", styles["normal"]),
+    ]
+    pdf.build(story)
+    return buffer.getvalue()
+
+def render_invoice_pdf(doc: dict) -> bytes:
+    """Render an invoice document dict to PDF bytes"""
+    return _render(doc, "TAX INVOICE", "Invoice No", [
+        ("Date", doc.get("date")),
+        ("Due Date", doc.get("due_date")),
+        ("Status", (doc.get("payment_status") or "").replace("_", " ").title()),
+        ("Place of Supply", doc.get("place_of_supply")),
+    ])
+
+def render_quotation_pdf(doc: dict) -> bytes:
+    """Render a quotation document dict to PDF bytes"""
+    return _render(doc, "QUOTATION", "Quotation No", [
+        ("Date", doc.get("date")),
+        ("Valid Until", doc.get("valid_until")),
+    ])
@@ -0,0 +1,225 @@
+"""
+PDF Service
+Loads invoices/quotations, renders them in a process pool and caches the
+resulting PDF bytes on disk keyed by a content hash of the document.
+"""
+
+import asyncio
+import glob
+import hashlib
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional, Tuple
+
+from sqlalchemy.orm import Session, joinedload, selectinload
+
+from models.models import Invoice, Quotation, Vehicle, VehicleModel
+from services.pdf_renderer import RENDERER_VERSION, render_invoice_pdf, render_quotation_pdf
+
+PDF_WORKERS = int(os.getenv("PDF_WORKERS", "2"))
+PDF_CACHE_DIR = os.getenv("PDF_CACHE_DIR", "database/pdf_cache")
+PUBLIC_BASE_URL = os.getenv("PUBLIC_BASE_URL", "http://localhost:5173").rstrip("/")
+
+_render_pool: Optional[ProcessPoolExecutor] = None
+
+def get_render_pool() -> ProcessPoolExecutor:
+    """Process pool used for rendering, created on first use"""
+    global _render_pool
+    if _render_pool is None:
+        _render_pool = ProcessPoolExecutor(max_workers=PDF_WORKERS)
+    return _render_pool
+
+def shutdown_render_pool():
+    global _render_pool
+    if _render_pool is not None:
+        _render_pool.shutdown(wait=False, cancel_futures=True)
+        _render_pool = None
+
+def _format_date(value) -> Optional[str]:
+    return value.strftime('%d-%m-%Y') if value else None
+
+def _client_dict(client) -> dict:
+    if not client:
+        return {}
+    return {
+        "name": client.name,
+        "phone": client.phone,
+        "mobile": client.mobile,
+        "address": ", ".join(part for part in [client.address, client.city, client.state, client.pincode] if part),
+    }
+
+def _vehicle_dict(vehicle) -> dict:
+    if not vehicle:
+        return {}
+    return {
+        "registration_number": vehicle.registration_number,
+        "brand_name": vehicle.model.brand.name if vehicle.model and vehicle.model.brand else "",
+        "model_name": vehicle.model.name if vehicle.model else "",
+    }
+
+def _vehicle_options(relationship):
+    return joinedload(relationship).joinedload(Vehicle.model).joinedload(VehicleModel.brand)
+
+def _invoice_query(db: Session):
+    return db.query(Invoice).options(
+        joinedload(Invoice.client),
+        _vehicle_options(Invoice.vehicle),
+        selectinload(Invoice.services),
+        selectinload(Invoice.parts)
+    )
+
+def invoice_document(db: Session, invoice_id: int) -> Optional[dict]:
+    """Build the render input for an invoice in a single round of queries"""
+    invoice = _invoice_query(db).filter(Invoice.id == invoice_id).first()
+    if not invoice:
+        return None
+    return _invoice_to_document(invoice)
+
+def invoice_documents(db: Session, invoice_ids: List[int]) -> List[dict]:
+    """Batch version of invoice_document, returned in the order of invoice_ids"""
+    invoices = _invoice_query(db).filter(Invoice.id.in_(invoice_ids)).all()
+    by_id = {invoice.id: invoice for invoice in invoices}
+    return [_invoice_to_document(by_id[invoice_id]) for invoice_id in invoice_ids if invoice_id in by_id]
+
+def _invoice_to_document(invoice: Invoice) -> dict:
+    items = [{
+        "name": service.service_name or f"Service {service.service_id}",
+        "hsn_sac": service.hsn_sac_code or "9986",
+        "quantity": service.quantity,
+        "rate": service.unit_price,
+        "total": service.total_price,
+    } for service in sorted(invoice.services, key=lambda s: s.id)]
+    items += [{
+        "name": part.part_name or f"Part {part.part_id}",
+        "hsn_sac": part.hsn_sac_code or "8708",
+        "quantity": part.quantity,
+        "rate": part.unit_price,
+        "total": part.total_price,
+    } for part in sorted(invoice.parts, key=lambda p: p.id)]
+
+    if invoice.unique_access_code:
+        qr_data = f"{PUBLIC_BASE_URL}/invoice/view/{invoice.unique_access_code}"
+    else:
+        qr_data = f"{PUBLIC_BASE_URL}/verify-invoice/{invoice.id}"
+
+    return {
+        "kind": "invoice",
+        "id": invoice.id,
+        "number": invoice.invoice_number,
+        "date": _format_date(invoice.invoice_date),
+        "due_date": _format_date(invoice.due_date),
+        "payment_status": invoice.payment_status,
+        "place_of_supply": invoice.place_of_supply,
+        "client": _client_dict(invoice.client),
+        "vehicle": _vehicle_dict(invoice.vehicle),
+        "items": items,
+        "gst_enabled": invoice.gst_enabled,
+        "subtotal": invoice.subtotal,
+        "discount_amount": invoice.discount_amount,
+        "cgst_rate": invoice.cgst_rate,
+        "sgst_rate": invoice.sgst_rate,
+        "igst_rate": invoice.igst_rate,
+        "cgst_amount": invoice.cgst_amount,
+        "sgst_amount": invoice.sgst_amount,
+        "igst_amount": invoice.igst_amount,
+        "round_off": invoice.round_off,
+        "total_amount": invoice.total_amount,
+        "notes": invoice.notes,
+        "qr_data": qr_data,
+    }
+
+def quotation_document(db: Session, quotation_id: int) -> Optional[dict]:
+    """Build the render input for a quotation in a single round of queries"""
+    quotation = db.query(Quotation).options(
+        joinedload(Quotation.client),
+        _vehicle_options(Quotation.vehicle),
+        selectinload(Quotation.items)
+    ).filter(Quotation.id == quotation_id).first()
+    if not quotation:
+        return None
+
+    items = [{
+        "name": item.name,
+        "hsn_sac": item.hsn_sac or "",
+        "quantity": item.quantity,
+        "rate": item.rate,
+        "total": item.total,
+    } for item in sorted(quotation.items, key=lambda i: i.id)]
+
+    # Quotations only store subtotal and total; split the difference as CGST/SGST
+    tax_amount = round((quotation.total_amount or 0) - (quotation.subtotal or 0), 2)
+
+    return {
+        "kind": "quotation",
+        "id": quotation.id,
+        "number": quotation.quotation_number,
+        "date": _format_date(quotation.quotation_date),
+        "valid_until": _format_date(quotation.valid_until),
+        "client": _client_dict(quotation.client),
+        "vehicle": _vehicle_dict(quotation.vehicle),
+        "items": items,
+        "gst_enabled": tax_amount > 0,
+        "subtotal": quotation.subtotal,
+        "cgst_rate": 9.0,
+        "sgst_rate": 9.0,
+        "cgst_amount": round(tax_amount / 2, 2),
+        "sgst_amount": round(tax_amount / 2, 2),
+        "total_amount": quotation.total_amount,
+        "notes": quotation.notes,
+    }
+
+def document_hash(doc: dict) -> str:
+    """Content hash of everything that ends up on the page"""
+    payload = json.dumps(doc, sort_keys=True, default=str)
+    return hashlib.sha256(f"{RENDERER_VERSION}:{payload}".encode()).hexdigest()
+
+def _cache_path(doc: dict, content_hash: str) -> str:
+    return os.path.join(PDF_CACHE_DIR, f"{doc['kind']}-{doc['id']}-{content_hash[:32]}.pdf")
+
+def _read_cache(path: str) -> Optional[bytes]:
+    try:
+        with open(path, "rb") as f:
+            return f.read()
+    except FileNotFoundError:
+        return None
+
+def _write_cache(doc: dict, path: str, pdf_bytes: bytes):
+    """Atomically store a rendered PDF and drop stale renders of the same document"""
+    os.makedirs(PDF_CACHE_DIR, exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(pdf_bytes)
+    os.replace(tmp_path, path)
+
+    for stale in glob.glob(os.path.join(PDF_CACHE_DIR, f"{doc['kind']}-{doc['id']}-*.pdf")):
+        if stale != path:
+            try:
+                os.remove(stale)
+            except OSError:
+                pass
+
+async def render_document(doc: dict, content_hash: Optional[str] = None) -> Tuple[bytes, str, bool]:
+    """
+    Return (pdf_bytes, content_hash, cache_hit) for a document dict, taking
+    content_hash when the caller has already computed document_hash(doc).
+
+    Cache hits are served straight from disk; misses are rendered in the
+    process pool so the event loop stays free.
+    """
+    content_hash = content_hash or document_hash(doc)
+    path = _cache_path(doc, content_hash)
+
+    cached = _read_cache(path)
+    if cached is not None:
+        return cached, content_hash, True
+
+    render = render_invoice_pdf if doc["kind"] == "invoice" else render_quotation_pdf
+    loop = asyncio.get_running_loop()
+    pdf_bytes = await loop.run_in_executor(get_render_pool(), render, doc)
+
+    _write_cache(doc, path, pdf_bytes)
+    return pdf_bytes, content_hash, False
+
+def cached_file_count() -> int:
+    return len(glob.glob(os.path.join(PDF_CACHE_DIR, "*.pdf")))
@@ -0,0 +1,216 @@
+"""
+Quotation Conversion
+Turns accepted quotations into invoices inside the caller's transaction.
+
+Each quotation is claimed with a conditional UPDATE from accepted to
+converted, so it converts once however many requests race for it. The
+invoice is built from the quotation's own items, with GST recomputed per
+item (taxable value = quantity x rate - discount, at the item's tax rate)
+and split into CGST and SGST, or charged as IGST for inter-state supply.
+Invoice numbers are drawn as one block, the invoices, their services and
+their parts go in with one bulk INSERT each, and the parts a quotation held
+are billed out of its stock reservations.
+"""
+
+import math
+import os
+import uuid
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import insert, select, update
+from sqlalchemy.orm import Session, selectinload
+
+from models.models import Invoice, InvoicePart, InvoiceService, Quotation, QuotationItem
+from services.invoice_numbers import allocate_invoice_numbers
+from services.revenue_rollup import apply_rollup_changes, rollup_snapshot
+from services.stock_ledger import consume_quotation_stock, is_part_item, resolve_part_ids
+
+QUOTATION_CONVERSION_BATCH_LIMIT = int(os.getenv("QUOTATION_CONVERSION_BATCH_LIMIT", "200"))
+
+DEFAULT_TAX_RATE = 18.0
+PAYMENT_DUE_DAYS = 30
+SERVICE_HSN_SAC = "9986"
+PART_HSN_SAC = "8708"
+
+class QuotationNotFound(Exception):
+    def __init__(self, quotation_ids: List[int]):
+        self.quotation_ids = quotation_ids
+        super().__init__(f"Quotation not found: {', '.join(str(i) for i in quotation_ids)}")
+
+class QuotationNotConvertible(Exception):
+    def __init__(self, quotation_id: int, quotation_number: str, status: Optional[str]):
+        self.quotation_id = quotation_id
+        self.status = status
+        super().__init__(
+            f"Only accepted quotations can be converted to invoices: {quotation_number} is {status or 'pending'}"
+        )
+
+def _money(value: float) -> float:
+    return round(value, 2)
+
+def invoice_totals(items: Iterable[QuotationItem], igst: bool = False) -> dict:
+    """Invoice amount columns for a quotation's items"""
+    subtotal = discount = tax = 0.0
+    rates = set()
+    for item in items:
+        gross = (item.quantity or 1) * (item.rate or 0)
+        rate = item.tax_rate if item.tax_rate is not None else DEFAULT_TAX_RATE
+        subtotal += gross
+        discount += item.discount or 0
+        tax += (gross - (item.discount or 0)) * rate / 100
+        rates.add(rate)
+
+    tax_rate = rates.pop() if len(rates) == 1 else DEFAULT_TAX_RATE
+    gross_total = subtotal - discount + tax
+    total = math.floor(gross_total + 0.5)  # Nearest rupee, halves up
+    return {
+        "subtotal": _money(subtotal - discount),
+        "discount_amount": _money(discount),
+        "gst_enabled": tax > 0,
+        "tax_rate": tax_rate,
+        "cgst_rate": tax_rate / 2,
+        "sgst_rate": tax_rate / 2,
+        "igst_rate": tax_rate,
+        "tax_amount": _money(tax),
+        "cgst_amount": 0.0 if igst else _money(tax / 2),
+        "sgst_amount": 0.0 if igst else _money(tax / 2),
+        "igst_amount": _money(tax) if igst else 0.0,
+        "round_off": _money(total - gross_total),
+        "total_amount": float(total),
+    }
+
+def _claim(db: Session, quotation_ids: List[int]):
+    """Move the quotations from accepted to converted, or raise for the first that cannot be"""
+    claimed = set(db.execute(
+        update(Quotation)
+        .where(Quotation.id.in_(quotation_ids), Quotation.status == "accepted")
+        .values(status="converted")
+        .returning(Quotation.id)
+        .execution_options(synchronize_session=False)
+    ).scalars())
+    refused = [quotation_id for quotation_id in quotation_ids if quotation_id not in claimed]
+    if not refused:
+        return
+
+    found = {
+        row.id: row
+        for row in db.execute(
+            select(Quotation.id, Quotation.quotation_number, Quotation.status).where(Quotation.id.in_(refused))
+        )
+    }
+    missing = [quotation_id for quotation_id in refused if quotation_id not in found]
+    if missing:
+        raise QuotationNotFound(missing)
+    first = found[refused[0]]
+    raise QuotationNotConvertible(first.id, first.quotation_number, first.status)
+
+def convert_quotations(db: Session, quotation_ids: Iterable[int], user_id: Optional[int] = None,
+                       igst: bool = False) -> List[dict]:
+    """
+    Convert accepted quotations to invoices; all of them or, by raising, none.
+    The caller commits. Raises QuotationNotFound, QuotationNotConvertible or
+    InsufficientStockError, after which the transaction must be rolled back.
+    """
+    quotation_ids = list(dict.fromkeys(quotation_ids))
+    if not quotation_ids:
+        return []
+    if len(quotation_ids) > QUOTATION_CONVERSION_BATCH_LIMIT:
+        raise ValueError(f"At most {QUOTATION_CONVERSION_BATCH_LIMIT} quotations can be converted at once")
+
+    invoice_date = datetime.utcnow()
+    # Drawn before the first write, which block mode needs
+    numbers = allocate_invoice_numbers(db, len(quotation_ids), invoice_date)
+    _claim(db, quotation_ids)
+
+    quotations = {
+        quotation.id: quotation
+        for quotation in db.query(Quotation)
+        .options(selectinload(Quotation.items))
+        .filter(Quotation.id.in_(quotation_ids))
+        .populate_existing()
+    }
+    part_ids = resolve_part_ids(
+        db, [item.name for quotation in quotations.values() for item in quotation.items if is_part_item(item.item_type)]
+    )
+
+    invoices = []
+    for quotation_id, invoice_number in zip(quotation_ids, numbers):
+        quotation = quotations[quotation_id]
+        totals = invoice_totals(quotation.items, igst)
+        access_code = str(uuid.uuid4())[:12].upper()
+        invoices.append({
+            "invoice_number": invoice_number,
+            "client_id": quotation.client_id,
+            "vehicle_id": quotation.vehicle_id,
+            "invoice_date": invoice_date,
+            "due_date": invoice_date + timedelta(days=PAYMENT_DUE_DAYS),
+            "payment_status": "pending",
+            "payment_due_days": PAYMENT_DUE_DAYS,
+            **totals,
+            "balance_due": totals["total_amount"],
+            "estimate_no": quotation.quotation_number,
+            "quotation_id": quotation.id,
+            "invoice_unique_id": f"UID-{str(uuid.uuid4())[:8].upper()}",
+            "unique_access_code": access_code,
+            "qr_code_url": f"/api/invoices/view/{access_code}",
+            "notes": quotation.notes,
+            "created_by": user_id,
+        })
+    invoice_ids: Dict[int, int] = {
+        quotation_id: invoice_id
+        for invoice_id, quotation_id in db.execute(
+            insert(Invoice).returning(Invoice.id, Invoice.quotation_id), invoices
+        )
+    }
+
+    services, parts = [], []
+    stock_lines: Dict[int, List[Tuple[Optional[int], float]]] = defaultdict(list)
+    for quotation_id in quotation_ids:
+        invoice_id = invoice_ids[quotation_id]
+        for item in quotations[quotation_id].items:
+            quantity = item.quantity or 1
+            if is_part_item(item.item_type):
+                part_id = part_ids.get(item.name.strip().lower())
+                stock_lines[quotation_id].append((part_id, quantity))
+                parts.append({
+                    "invoice_id": invoice_id,
+                    "part_id": part_id,
+                    "part_name": item.name,
+                    "cost": item.rate,
+                    "hsn_sac_code": item.hsn_sac or PART_HSN_SAC,
+                    "quantity": quantity,
+                    "unit_price": item.rate,
+                    "total_price": item.rate * quantity,
+                })
+            else:
+                services.append({
+                    "invoice_id": invoice_id,
+                    "service_name": item.name,
+                    "amount": item.rate,
+                    "hsn_sac_code": item.hsn_sac or SERVICE_HSN_SAC,
+                    "quantity": quantity,
+                    "unit_price": item.rate,
+                    "total_price": item.rate * quantity,
+                })
+    if services:
+        db.execute(insert(InvoiceService), services)
+    if parts:
+        db.execute(insert(InvoicePart), parts)
+
+    for quotation_id in quotation_ids:
+        consume_quotation_stock(db, quotation_id, invoice_ids[quotation_id], stock_lines[quotation_id], user_id)
+
+    apply_rollup_changes(db, [(None, rollup_snapshot(Invoice(**invoice))) for invoice in invoices])
+
+    return [
+        {
+            "quotation_id": invoice["quotation_id"],
+            "quotation_number": invoice["estimate_no"],
+            "invoice_id": invoice_ids[invoice["quotation_id"]],
+            "invoice_number": invoice["invoice_number"],
+            "total_amount": invoice["total_amount"],
+        }
+        for invoice in invoices
+    ]
@@ -0,0 +1,135 @@
+"""
+Quotation Versions
+Revisions of a quotation form a lineage. Every version stores the original
+it descends from (root_id, which is the original's own id for the original),
+the version it revises (parent_id) and its number in the lineage (version,
+1 for the original). (root_id, version) is a unique index, so listing a
+lineage, finding its latest version and loading two versions to compare
+are each a single indexed query.
+
+Version numbers are drawn from latest_version on the original with one
+UPDATE ... RETURNING, so concurrent revisions never get the same number.
+"""
+
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import func, select, update
+from sqlalchemy.orm import Session
+
+from models.models import Quotation, QuotationItem
+
+# Compared by diff_versions()
+HEADER_FIELDS = ("client_id", "vehicle_id", "quotation_date", "valid_until", "subtotal", "total_amount", "status", "notes")
+ITEM_FIELDS = ("hsn_sac", "quantity", "rate", "discount", "tax_rate", "total")
+
+def root_id_of(quotation: Quotation) -> int:
+    return quotation.root_id or quotation.id
+
+def version_number(base_number: str, version: int) -> str:
+    return base_number if version == 1 else f"{base_number}-v{version}"
+
+def allocate_version(db: Session, root_id: int) -> int:
+    """Next version number in the lineage of root_id; the root row stays locked until db commits"""
+    version = db.execute(
+        update(Quotation)
+        .where(Quotation.id == root_id)
+        .values(latest_version=func.coalesce(Quotation.latest_version, 1) + 1)
+        .returning(Quotation.latest_version)
+        .execution_options(synchronize_session=False)
+    ).scalar()
+    if version is None:
+        raise LookupError(f"Quotation {root_id} not found")
+    return version
+
+def new_version_fields(db: Session, source: Quotation) -> dict:
+    """Lineage columns and quotation number for a new version revising source"""
+    root_id = root_id_of(source)
+    root_number = source.quotation_number if root_id == source.id else db.execute(
+        select(Quotation.quotation_number).where(Quotation.id == root_id)
+    ).scalar()
+    version = allocate_version(db, root_id)
+    return {
+        "quotation_number": version_number(root_number, version),
+        "root_id": root_id,
+        "parent_id": source.id,
+        "version": version,
+    }
+
+def list_versions(db: Session, root_id: int) -> List[Quotation]:
+    return db.query(Quotation).filter(Quotation.root_id == root_id).order_by(Quotation.version).all()
+
+def latest_version(db: Session, root_id: int) -> Optional[Quotation]:
+    return (
+        db.query(Quotation)
+        .filter(Quotation.root_id == root_id)
+        .order_by(Quotation.version.desc())
+        .first()
+    )
+
+def _item_key(item: QuotationItem) -> Tuple[str, str]:
+    return (item.item_type or "").lower(), (item.name or "").strip().lower()
+
+def _item_values(item: QuotationItem) -> dict:
+    return {"item_type": item.item_type, "name": item.name, **{field: getattr(item, field) for field in ITEM_FIELDS}}
+
+def diff_versions(db: Session, from_id: int, to_id: int) -> dict:
+    """
+    Header and item changes going from one version of a quotation to
+    another. Items are matched by type and name. Raises LookupError if
+    either is missing and ValueError if they are not in the same lineage.
+    """
+    quotations: Dict[int, Quotation] = {}
+    items: Dict[int, List[QuotationItem]] = {from_id: [], to_id: []}
+    for quotation, item in db.execute(
+        select(Quotation, QuotationItem)
+        .outerjoin(QuotationItem, QuotationItem.quotation_id == Quotation.id)
+        .where(Quotation.id.in_((from_id, to_id)))
+        .order_by(QuotationItem.id)
+    ):
+        quotations[quotation.id] = quotation
+        if item is not None:
+            items[quotation.id].append(item)
+
+    missing = [quotation_id for quotation_id in (from_id, to_id) if quotation_id not in quotations]
+    if missing:
+        raise LookupError(f"Quotation not found: {missing[0]}")
+    old, new = quotations[from_id], quotations[to_id]
+    if root_id_of(old) != root_id_of(new):
+        raise ValueError(f"{old.quotation_number} and {new.quotation_number} are not versions of the same quotation")
+
+    changes = {
+        field: {"from": getattr(old, field), "to": getattr(new, field)}
+        for field in HEADER_FIELDS if getattr(old, field) != getattr(new, field)
+    }
+
+    # Repeated lines of the same item are paired in order
+    def keyed(lines: List[QuotationItem]) -> Dict[Tuple[str, str, int], QuotationItem]:
+        seen: Dict[Tuple[str, str], int] = {}
+        result = {}
+        for line in lines:
+            key = _item_key(line)
+            seen[key] = seen.get(key, 0) + 1
+            result[(*key, seen[key])] = line
+        return result
+
+    old_items, new_items = keyed(items[from_id]), keyed(items[to_id])
+    changed = []
+    for key in old_items.keys() & new_items.keys():
+        before, after = old_items[key], new_items[key]
+        fields = {
+            field: {"from": getattr(before, field), "to": getattr(after, field)}
+            for field in ITEM_FIELDS if getattr(before, field) != getattr(after, field)
+        }
+        if fields:
+            changed.append({"item_type": after.item_type, "name": after.name, "changes": fields})
+
+    return {
+        "from": {"id": old.id, "quotation_number": old.quotation_number, "version": old.version},
+        "to": {"id": new.id, "quotation_number": new.quotation_number, "version": new.version},
+        "changes": changes,
+        "items": {
+            "added": [_item_values(new_items[key]) for key in new_items if key not in old_items],
+            "removed": [_item_values(old_items[key]) for key in old_items if key not in new_items],
+            "changed": sorted(changed, key=lambda line: (line["item_type"] or "", line["name"])),
+        },
+    }
@@ -0,0 +1,239 @@
+"""
+Report Export
+Streams invoices, line items, payments and clients as CSV or Excel (.xlsx).
+Rows are read with yield_per so the database hands them over in batches
+through a server-side cursor, and each format is written incrementally, so
+memory stays bounded and the first bytes go out immediately.
+"""
+
+import csv
+import io
+import os
+import re
+import zipfile
+from datetime import date, datetime, timedelta
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+from xml.sax.saxutils import escape
+
+from sqlalchemy import literal
+from sqlalchemy.orm import Session
+
+from database.database import SessionLocal
+from models.models import Client, Invoice, InvoicePart, InvoiceService, Payment, Vehicle
+from utils.zip_stream import ZipChunkStream
+
+EXPORT_YIELD_PER = int(os.getenv("EXPORT_YIELD_PER", "1000"))
+CSV_CHUNK_BYTES = 64 * 1024
+XLSX_ROWS_PER_CHUNK = 500
+
+MEDIA_TYPES = {
+    "csv": "text/csv; charset=utf-8",
+    "excel": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+}
+EXTENSIONS = {"csv": "csv", "excel": "xlsx"}
+
+def _date_range(query, column, date_from: Optional[date], date_to: Optional[date]):
+    if date_from:
+        query = query.filter(column >= datetime.combine(date_from, datetime.min.time()))
+    if date_to:
+        query = query.filter(column < datetime.combine(date_to + timedelta(days=1), datetime.min.time()))
+    return query
+
+def _invoice_rows(db: Session, date_from, date_to):
+    query = db.query(
+        Invoice.id, Invoice.invoice_number, Invoice.invoice_date, Invoice.due_date,
+        Client.name, Vehicle.registration_number, Invoice.payment_status,
+        Invoice.subtotal, Invoice.discount_amount, Invoice.cgst_amount, Invoice.sgst_amount,
+        Invoice.igst_amount, Invoice.total_amount, Invoice.paid_amount,
+        Invoice.balance_due
+    ).outerjoin(Client, Invoice.client_id == Client.id).outerjoin(Vehicle, Invoice.vehicle_id == Vehicle.id)
+    query = _date_range(query, Invoice.invoice_date, date_from, date_to)
+    return query.order_by(Invoice.id).yield_per(EXPORT_YIELD_PER)
+
+def _line_item_rows(db: Session, date_from, date_to):
+    services = db.query(
+        Invoice.invoice_number, Invoice.invoice_date, literal("service"), InvoiceService.service_name,
+        InvoiceService.hsn_sac_code, InvoiceService.quantity, InvoiceService.unit_price, InvoiceService.total_price
+    ).join(Invoice, InvoiceService.invoice_id == Invoice.id)
+    parts = db.query(
+        Invoice.invoice_number, Invoice.invoice_date, literal("part"), InvoicePart.part_name,
+        InvoicePart.hsn_sac_code, InvoicePart.quantity, InvoicePart.unit_price, InvoicePart.total_price
+    ).join(Invoice, InvoicePart.invoice_id == Invoice.id)
+
+    services = _date_range(services, Invoice.invoice_date, date_from, date_to)
+    parts = _date_range(parts, Invoice.invoice_date, date_from, date_to)
+    yield from services.order_by(InvoiceService.invoice_id, InvoiceService.id).yield_per(EXPORT_YIELD_PER)
+    yield from parts.order_by(InvoicePart.invoice_id, InvoicePart.id).yield_per(EXPORT_YIELD_PER)
+
+def _payment_rows(db: Session, date_from, date_to):
+    query = db.query(
+        Payment.id, Invoice.invoice_number, Payment.payment_date, Payment.payment_method,
+        Payment.amount, Payment.transaction_id, Payment.notes
+    ).outerjoin(Invoice, Payment.invoice_id == Invoice.id)
+    query = _date_range(query, Payment.payment_date, date_from, date_to)
+    return query.order_by(Payment.id).yield_per(EXPORT_YIELD_PER)
+
+def _client_rows(db: Session, date_from, date_to):
+    query = db.query(
+        Client.id, Client.name, Client.phone, Client.mobile, Client.email,
+        Client.address, Client.city, Client.state, Client.pincode, Client.created_at
+    )
+    query = _date_range(query, Client.created_at, date_from, date_to)
+    return query.order_by(Client.id).yield_per(EXPORT_YIELD_PER)
+
+# report_type -> (column headers, row query)
+EXPORT_DATASETS: Dict[str, Tuple[Sequence[str], Callable]] = {
+    "invoices": (
+        ["ID", "Invoice Number", "Invoice Date", "Due Date", "Client", "Vehicle", "Status",
+         "Subtotal", "Discount", "CGST", "SGST", "IGST", "Total", "Paid", "Balance"],
+        _invoice_rows
+    ),
+    "line_items": (
+        ["Invoice Number", "Invoice Date", "Type", "Description", "HSN/SAC", "Quantity", "Rate", "Total"],
+        _line_item_rows
+    ),
+    "payments": (
+        ["ID", "Invoice Number", "Payment Date", "Method", "Amount", "Transaction ID", "Notes"],
+        _payment_rows
+    ),
+    "clients": (
+        ["ID", "Name", "Phone", "Mobile", "Email", "Address", "City", "State", "Pincode", "Created At"],
+        _client_rows
+    ),
+}
+
+def dataset_rows(report_type: str, date_from: Optional[date] = None,
+                 date_to: Optional[date] = None) -> Iterator[tuple]:
+    """Rows of an export dataset, read on a session owned by the generator"""
+    _, row_query = EXPORT_DATASETS[report_type]
+    db = SessionLocal()
+    try:
+        for row in row_query(db, date_from, date_to):
+            yield tuple(row)
+    finally:
+        db.close()
+
+def _cell_text(value) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, (datetime, date)):
+        return value.isoformat(sep=" ") if isinstance(value, datetime) else value.isoformat()
+    return str(value)
+
+def iter_csv(headers: Sequence[str], rows: Iterable[Sequence]) -> Iterator[bytes]:
+    """CSV in ~64 KB chunks, with a BOM so Excel detects UTF-8"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    buffer.write("﻿")
+    writer.writerow(headers)
+    for row in rows:
+        writer.writerow([_cell_text(value) for value in row])
+        if buffer.tell() >= CSV_CHUNK_BYTES:
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue().encode("utf-8")
+
+_INVALID_XML_CHARS = re.compile(r"[\x00-\x08\x0b\x0c\x0e-\x1f]")
+
+def _xlsx_cell(value) -> str:
+    if value is None:
+        return "<c/>"
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return f"<c><v>{value}</v></c>"
+    text = escape(_INVALID_XML_CHARS.sub("", _cell_text(value)))
+    return f'<c t="inlineStr"><is><t xml:space="preserve">{text}</t></is></c>'
+
+def _xlsx_row(values: Sequence) -> str:
+    return "<row>" + "".join(_xlsx_cell(value) for value in values) + "</row>"
+
+_XLSX_STATIC_PARTS = {
+    "[Content_Types].xml": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/xl/workbook.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+        '<Override PartName="/xl/worksheets/sheet1.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+        '<Override PartName="/xl/styles.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>'
+        '</Types>'
+    ),
+    "_rels/.rels": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" Target="xl/workbook.xml"/>'
+        '</Relationships>'
+    ),
+    "xl/_rels/workbook.xml.rels": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" Target="worksheets/sheet1.xml"/>'
+        '<Relationship Id="rId2" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles" Target="styles.xml"/>'
+        '</Relationships>'
+    ),
+    "xl/styles.xml": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<styleSheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+        '<fonts count="1"><font><sz val="11"/><name val="Calibri"/></font></fonts>'
+        '<fills count="1"><fill><patternFill patternType="none"/></fill></fills>'
+        '<borders count="1"><border/></borders>'
+        '<cellStyleXfs count="1"><xf/></cellStyleXfs>'
+        '<cellXfs count="1"><xf/></cellXfs>'
+        '</styleSheet>'
+    ),
+}
+
+def iter_xlsx(headers: Sequence[str], rows: Iterable[Sequence], sheet_name: str = "Export") -> Iterator[bytes]:
+    """A single-sheet .xlsx workbook, streamed as the worksheet is written"""
+    stream = ZipChunkStream()
+    archive = zipfile.ZipFile(stream, "w", compression=zipfile.ZIP_DEFLATED)
+    for name, content in _XLSX_STATIC_PARTS.items():
+        archive.writestr(name, content)
+    archive.writestr("xl/workbook.xml", (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+        'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+        f'<sheets><sheet name="{escape(sheet_name[:31])}" sheetId="1" r:id="rId1"/></sheets>'
+        '</workbook>'
+    ))
+    yield stream.drain()
+
+    with archive.open("xl/worksheets/sheet1.xml", "w", force_zip64=True) as sheet:
+        sheet.write((
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+            '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>'
+            + _xlsx_row(headers)
+        ).encode("utf-8"))
+
+        pending: List[str] = []
+        for row in rows:
+            pending.append(_xlsx_row(row))
+            if len(pending) >= XLSX_ROWS_PER_CHUNK:
+                sheet.write("".join(pending).encode("utf-8"))
+                pending = []
+                chunk = stream.drain()
+                if chunk:
+                    yield chunk
+        sheet.write(("".join(pending) + "</sheetData></worksheet>").encode("utf-8"))
+
+    archive.close()
+    yield stream.drain()
+
+def stream_export(report_type: str, format: str, date_from: Optional[date] = None,
+                  date_to: Optional[date] = None) -> Tuple[Iterator[bytes], str, str]:
+    """(byte chunks, media type, filename) for exporting a dataset"""
+    headers, _ = EXPORT_DATASETS[report_type]
+    rows = dataset_rows(report_type, date_from, date_to)
+    if format == "excel":
+        chunks = iter_xlsx(headers, rows, sheet_name=report_type.replace("_", " ").title())
+    else:
+        chunks = iter_csv(headers, rows)
+
+    period = f"{date_from or 'all'}-to-{date_to or 'all'}"
+    return chunks, MEDIA_TYPES[format], f"{report_type}-{period}.{EXTENSIONS[format]}"
+
+def iter_table(format: str, headers: Sequence[str], rows: Iterable[Sequence], sheet_name: str) -> Iterator[bytes]:
+    """Export an in-memory table (e.g. the summary) in the requested format"""
+    if format == "excel":
+        return iter_xlsx(headers, rows, sheet_name)
+    return iter_csv(headers, rows)
@@ -0,0 +1,179 @@
+"""
+Revenue Rollup
+Maintains daily_revenue_rollup, a per-day summary of invoice totals keyed by
+payment status and GST type, so charts never have to rescan invoices.
+
+Writers take a rollup_snapshot() of an invoice before changing it and pass
+it with the snapshot afterwards to apply_rollup_change() in the same
+transaction. rebuild_daily_revenue_rollup() recomputes the table from the
+invoices for backfills.
+"""
+
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import case, func, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from models.models import DailyRevenueRollup, Invoice
+
+# Summed columns, in snapshot order
+ROLLUP_FIELDS = ("invoice_count", "total_amount", "tax_amount", "paid_amount")
+
+RollupKey = Tuple[date, str, str]
+RollupSnapshot = Tuple[RollupKey, Tuple[float, ...]]
+
+def invoice_gst_type(invoice: Invoice) -> str:
+    if invoice.gst_enabled is False:
+        return "none"
+    if (invoice.cgst_amount or 0) > 0 or (invoice.sgst_amount or 0) > 0:
+        return "cgst_sgst"
+    if (invoice.igst_amount or 0) > 0:
+        return "igst"
+    return "none"
+
+def rollup_snapshot(invoice: Optional[Invoice]) -> Optional[RollupSnapshot]:
+    """What an invoice currently contributes to the rollup"""
+    if invoice is None or invoice.invoice_date is None:
+        return None
+    key = (invoice.invoice_date.date(), invoice.payment_status or "pending", invoice_gst_type(invoice))
+    tax = (invoice.cgst_amount or 0) + (invoice.sgst_amount or 0) + (invoice.igst_amount or 0)
+    return key, (1, invoice.total_amount or 0, tax, invoice.paid_amount or 0)
+
+# What rollup_snapshot() reads from an invoice, for UPDATE ... RETURNING
+SNAPSHOT_COLUMNS = (
+    Invoice.invoice_date, Invoice.payment_status, Invoice.gst_enabled, Invoice.cgst_amount,
+    Invoice.sgst_amount, Invoice.igst_amount, Invoice.total_amount, Invoice.paid_amount,
+)
+
+def row_snapshot(row, **changes) -> Optional[RollupSnapshot]:
+    """rollup_snapshot() of a SNAPSHOT_COLUMNS row, with changes applied"""
+    return rollup_snapshot(Invoice(**{**row, **changes}))
+
+def apply_rollup_change(db: Session, before: Optional[RollupSnapshot], after: Optional[RollupSnapshot]):
+    """Move an invoice's contribution from its before snapshot to its after snapshot"""
+    apply_rollup_changes(db, [(before, after)])
+
+def apply_rollup_changes(db: Session, changes: Iterable[Tuple[Optional[RollupSnapshot], Optional[RollupSnapshot]]]):
+    """apply_rollup_change() for many invoices, with one write per rollup row touched"""
+    deltas: Dict[RollupKey, List[float]] = {}
+    for before, after in changes:
+        for snapshot, sign in ((before, -1), (after, 1)):
+            if snapshot is None:
+                continue
+            key, values = snapshot
+            totals = deltas.setdefault(key, [0] * len(ROLLUP_FIELDS))
+            for i, value in enumerate(values):
+                totals[i] += sign * value
+
+    for key, values in deltas.items():
+        if any(values):
+            _add_to_rollup(db, key, values)
+
+def _add_to_rollup(db: Session, key: RollupKey, values: List[float]):
+    day, payment_status, gst_type = key
+    columns = [getattr(DailyRevenueRollup, field) for field in ROLLUP_FIELDS]
+    increment = (
+        update(DailyRevenueRollup)
+        .where(
+            DailyRevenueRollup.day == day,
+            DailyRevenueRollup.payment_status == payment_status,
+            DailyRevenueRollup.gst_type == gst_type
+        )
+        .values({column: column + value for column, value in zip(columns, values)})
+        .execution_options(synchronize_session=False)
+    )
+    if db.execute(increment).rowcount:
+        return
+
+    try:
+        with db.begin_nested():
+            db.add(DailyRevenueRollup(
+                day=day, payment_status=payment_status, gst_type=gst_type,
+                **dict(zip(ROLLUP_FIELDS, values))
+            ))
+    except IntegrityError:
+        # Another request created the row first
+        db.execute(increment)
+
+def rebuild_daily_revenue_rollup(db: Session, date_from: Optional[date] = None,
+                                 date_to: Optional[date] = None) -> int:
+    """
+    Recompute the rollup from the invoices table, for all days or the
+    inclusive date_from..date_to range. Returns the number of rollup rows
+    written. The caller commits.
+    """
+    day = func.date(Invoice.invoice_date)
+    payment_status = func.coalesce(Invoice.payment_status, "pending")
+    gst_type = case(
+        (Invoice.gst_enabled.is_(False), "none"),
+        (func.coalesce(Invoice.cgst_amount, 0) + func.coalesce(Invoice.sgst_amount, 0) > 0, "cgst_sgst"),
+        (func.coalesce(Invoice.igst_amount, 0) > 0, "igst"),
+        else_="none"
+    )
+    tax = (func.coalesce(Invoice.cgst_amount, 0) + func.coalesce(Invoice.sgst_amount, 0)
+           + func.coalesce(Invoice.igst_amount, 0))
+
+    query = db.query(
+        day, payment_status, gst_type,
+        func.count(Invoice.id),
+        func.coalesce(func.sum(Invoice.total_amount), 0),
+        func.sum(tax),
+        func.coalesce(func.sum(Invoice.paid_amount), 0)
+    ).filter(Invoice.invoice_date.isnot(None))
+
+    rollup = db.query(DailyRevenueRollup)
+    if date_from:
+        query = query.filter(Invoice.invoice_date >= datetime.combine(date_from, datetime.min.time()))
+        rollup = rollup.filter(DailyRevenueRollup.day >= date_from)
+    if date_to:
+        query = query.filter(Invoice.invoice_date < datetime.combine(date_to + timedelta(days=1), datetime.min.time()))
+        rollup = rollup.filter(DailyRevenueRollup.day <= date_to)
+
+    rows = query.group_by(day, payment_status, gst_type).all()
+    rollup.delete(synchronize_session=False)
+
+    db.bulk_insert_mappings(DailyRevenueRollup, [
+        {
+            "day": row_day if isinstance(row_day, date) else date.fromisoformat(row_day),
+            "payment_status": row_status,
+            "gst_type": row_gst_type,
+            **dict(zip(ROLLUP_FIELDS, values))
+        }
+        for row_day, row_status, row_gst_type, *values in rows
+    ])
+    return len(rows)
+
+def rollup_is_empty(db: Session) -> bool:
+    return db.query(DailyRevenueRollup.day).first() is None
+
+def month_starts(months: int, today: Optional[date] = None) -> List[date]:
+    """First day of each of the last `months` calendar months, oldest first"""
+    current = (today or date.today()).replace(day=1)
+    starts = []
+    for _ in range(months):
+        starts.append(current)
+        current = (current - timedelta(days=1)).replace(day=1)
+    return list(reversed(starts))
+
+def monthly_totals(db: Session, months: int, field: str = "total_amount",
+                   payment_status: Optional[str] = None) -> List[Tuple[date, float]]:
+    """
+    Sum of a rollup field per calendar month for the last `months` months,
+    oldest first. Reads at most one row per day, status and GST type.
+    """
+    starts = month_starts(months)
+    column = getattr(DailyRevenueRollup, field)
+
+    query = db.query(DailyRevenueRollup.day, func.sum(column)).filter(DailyRevenueRollup.day >= starts[0])
+    if payment_status:
+        query = query.filter(DailyRevenueRollup.payment_status == payment_status)
+    daily = query.group_by(DailyRevenueRollup.day).all()
+
+    totals = {start: 0.0 for start in starts}
+    for day, value in daily:
+        month = day.replace(day=1)
+        if month in totals:
+            totals[month] += value or 0
+    return list(totals.items())
@@ -0,0 +1,197 @@
+"""
+Job Scheduler
+Runs periodic maintenance jobs, such as the status sweeps, on the API
+process's event loop. Job bodies are synchronous database work, so each run
+goes to the threadpool with a session of its own.
+
+However many worker processes serve the API, only one runs jobs. Every
+SCHEDULER_TICK_SECONDS each worker tries to take or renew the lease row in
+scheduler_leases with one conditional UPDATE; only the holder runs the jobs
+that are due. If the leader dies it stops renewing, and another worker takes
+over once the lease expires SCHEDULER_LEASE_SECONDS later.
+"""
+
+import asyncio
+import os
+import socket
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Optional
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import or_, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from database.database import SessionLocal
+from models.models import SchedulerLease
+from services.cache import AGGREGATES, invalidate as invalidate_cache
+from services.sweeps import accrue_late_fees, expire_quotations, mark_overdue_invoices
+
+SCHEDULER_ENABLED = os.getenv("SCHEDULER_ENABLED", "1") == "1"
+SCHEDULER_TICK_SECONDS = float(os.getenv("SCHEDULER_TICK_SECONDS", "30"))
+SCHEDULER_LEASE_SECONDS = float(os.getenv("SCHEDULER_LEASE_SECONDS", "90"))
+SWEEP_INTERVAL_SECONDS = float(os.getenv("SWEEP_INTERVAL_SECONDS", "900"))
+
+LEASE_NAME = "jobs"
+
+class Job:
+    def __init__(self, name: str, interval: float, func: Callable[[Session], int]):
+        self.name = name
+        self.interval = interval
+        self.func = func
+        self.next_run = 0.0  # Monotonic time; due at the first tick
+        self.runs = 0
+        self.failures = 0
+        self.last_run_at: Optional[datetime] = None
+        self.last_changed: Optional[int] = None
+        self.last_duration_ms: Optional[float] = None
+        self.last_error: Optional[str] = None
+
+    def status(self) -> dict:
+        return {
+            "name": self.name,
+            "interval_seconds": self.interval,
+            "runs": self.runs,
+            "failures": self.failures,
+            "last_run_at": self.last_run_at,
+            "last_changed": self.last_changed,
+            "last_duration_ms": self.last_duration_ms,
+            "last_error": self.last_error,
+        }
+
+class JobScheduler:
+    def __init__(self, tick: float = SCHEDULER_TICK_SECONDS, lease_seconds: float = SCHEDULER_LEASE_SECONDS):
+        self.tick = tick
+        self.lease_seconds = lease_seconds
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.jobs: Dict[str, Job] = {}
+        self.is_leader = False
+        self._task: Optional[asyncio.Task] = None
+
+    def add_job(self, name: str, interval: float, func: Callable[[Session], int]):
+        self.jobs[name] = Job(name, interval, func)
+
+    def _acquire_lease(self) -> bool:
+        """Take the lease if it is free or expired, or renew it if this worker holds it"""
+        db = SessionLocal()
+        try:
+            now = datetime.utcnow()
+            expires_at = now + timedelta(seconds=self.lease_seconds)
+            held = db.execute(
+                update(SchedulerLease)
+                .where(
+                    SchedulerLease.name == LEASE_NAME,
+                    or_(SchedulerLease.owner == self.owner, SchedulerLease.expires_at < now)
+                )
+                .values(owner=self.owner, expires_at=expires_at)
+                .returning(SchedulerLease.name)
+                .execution_options(synchronize_session=False)
+            ).scalar() is not None
+            if not held:
+                try:
+                    with db.begin_nested():
+                        db.add(SchedulerLease(name=LEASE_NAME, owner=self.owner, expires_at=expires_at))
+                    held = True
+                except IntegrityError:
+                    pass  # Held by another worker
+            db.commit()
+            return held
+        finally:
+            db.close()
+
+    def _release_lease(self):
+        db = SessionLocal()
+        try:
+            db.execute(
+                update(SchedulerLease)
+                .where(SchedulerLease.name == LEASE_NAME, SchedulerLease.owner == self.owner)
+                .values(expires_at=datetime.utcnow())
+                .execution_options(synchronize_session=False)
+            )
+            db.commit()
+        finally:
+            db.close()
+
+    def _run_job(self, job: Job) -> Optional[int]:
+        db = SessionLocal()
+        started = time.perf_counter()
+        try:
+            changed = job.func(db)
+            job.last_error = None
+        except Exception as e:
+            db.rollback()
+            changed = None
+            job.failures += 1
+            job.last_error = str(e)
+            print(f"[ERROR] Scheduled job {job.name} failed: {str(e)}")
+        finally:
+            db.close()
+        job.runs += 1
+        job.last_run_at = datetime.utcnow()
+        job.last_changed = changed
+        job.last_duration_ms = round(1000 * (time.perf_counter() - started), 2)
+        if changed:
+            invalidate_cache(AGGREGATES)
+        return changed
+
+    async def run_job(self, name: str) -> Optional[int]:
+        """Run one job now, whether or not this worker is the leader"""
+        return await run_in_threadpool(self._run_job, self.jobs[name])
+
+    async def _run(self):
+        while True:
+            try:
+                self.is_leader = await run_in_threadpool(self._acquire_lease)
+                if self.is_leader:
+                    for job in self.jobs.values():
+                        if job.next_run <= time.monotonic():
+                            await run_in_threadpool(self._run_job, job)
+                            job.next_run = time.monotonic() + job.interval
+            except Exception as e:
+                self.is_leader = False
+                print(f"[ERROR] Scheduler tick failed: {str(e)}")
+            await asyncio.sleep(self.tick)
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        task, self._task = self._task, None
+        if task is None:
+            return
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+        if self.is_leader:
+            # Let another worker take over without waiting for the lease to run out
+            await run_in_threadpool(self._release_lease)
+            self.is_leader = False
+
+    def status(self) -> dict:
+        return {
+            "enabled": SCHEDULER_ENABLED,
+            "running": self._task is not None,
+            "owner": self.owner,
+            "is_leader": self.is_leader,
+            "tick_seconds": self.tick,
+            "lease_seconds": self.lease_seconds,
+            "jobs": [job.status() for job in self.jobs.values()],
+        }
+
+scheduler = JobScheduler()
+scheduler.add_job("expire_quotations", SWEEP_INTERVAL_SECONDS, expire_quotations)
+scheduler.add_job("mark_overdue_invoices", SWEEP_INTERVAL_SECONDS, mark_overdue_invoices)
+# After the overdue sweep, so newly overdue invoices are charged in the same pass
+scheduler.add_job("accrue_late_fees", SWEEP_INTERVAL_SECONDS, accrue_late_fees)
+
+def start_scheduler():
+    if SCHEDULER_ENABLED:
+        scheduler.start()
+
+async def stop_scheduler():
+    await scheduler.stop()
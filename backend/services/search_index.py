@@ -0,0 +1,270 @@
+"""
+Search Index
+SQLite FTS5 index over clients, vehicles, invoices and quotations. Triggers
+on the base tables keep it in sync, so every write through the ORM, a
+script or the sqlite shell is reflected immediately. Each row has a title
+(name, registration or document number) and a body of secondary text
+(phones, email, owner, brand/model, ...); matches are prefix matches on
+every word of the query, ranked with bm25 weighting titles above bodies.
+Word prefixes miss text inside a word, such as the tail of a phone number
+or registration, so a query the index finds nothing for is retried as a
+substring match on the indexed titles and bodies.
+
+Other databases have no FTS5; there search_filter() falls back to the
+substring filters the routers used before and search() to a LIKE scan.
+"""
+
+import re
+from typing import Dict, Iterable, List, Optional
+
+from sqlalchemy import Integer, or_, text
+from sqlalchemy.orm import Session
+
+from models.models import Client, Invoice, Quotation, Vehicle
+
+SEARCH_TABLE = "search_index"
+
+# Index rows use rowid = entity_id * ROWID_STRIDE + entity code, so a base
+# row's index entry can be replaced by rowid without scanning the index
+ROWID_STRIDE = 8
+
+# Column weights for bm25(): entity, entity_id, title, body
+BM25_WEIGHTS = "0.0, 0.0, 10.0, 1.0"
+
+def _spaced(*columns: str) -> str:
+    return " || ' ' || ".join(f"coalesce({column}, '')" for column in columns)
+
+def _compact(column: str) -> str:
+    """Registration numbers are also indexed without spaces and dashes"""
+    return f"replace(replace(coalesce({column}, ''), ' ', ''), '-', '')"
+
+# entity -> (code, base table, alias, SELECT producing rowid, entity, entity_id, title, body)
+SEARCH_ENTITIES: Dict[str, tuple] = {
+    "client": (1, "clients", "c", f"""
+        SELECT c.id * {ROWID_STRIDE} + 1, 'client', c.id, c.name,
+               {_spaced('c.phone', 'c.mobile', 'c.email', 'c.city')}
+        FROM clients c"""),
+    "vehicle": (2, "vehicles", "v", f"""
+        SELECT v.id * {ROWID_STRIDE} + 2, 'vehicle', v.id, v.registration_number,
+               {_compact('v.registration_number')} || ' ' || {_spaced('b.name', 'm.name', 'c.name', 'v.vin_number')}
+        FROM vehicles v
+        LEFT JOIN clients c ON c.id = v.client_id
+        LEFT JOIN vehicle_models m ON m.id = v.model_id
+        LEFT JOIN vehicle_brands b ON b.id = m.brand_id"""),
+    "invoice": (3, "invoices", "i", f"""
+        SELECT i.id * {ROWID_STRIDE} + 3, 'invoice', i.id, i.invoice_number,
+               {_spaced('c.name', 'v.registration_number')} || ' ' || {_compact('v.registration_number')}
+        FROM invoices i
+        LEFT JOIN clients c ON c.id = i.client_id
+        LEFT JOIN vehicles v ON v.id = i.vehicle_id"""),
+    "quotation": (4, "quotations", "q", f"""
+        SELECT q.id * {ROWID_STRIDE} + 4, 'quotation', q.id, q.quotation_number,
+               {_spaced('c.name', 'v.registration_number')} || ' ' || {_compact('v.registration_number')}
+        FROM quotations q
+        LEFT JOIN clients c ON c.id = q.client_id
+        LEFT JOIN vehicles v ON v.id = q.vehicle_id"""),
+}
+
+# Columns whose change alters an entity's index row
+_INDEXED_COLUMNS = {
+    "client": "name, phone, mobile, email, city",
+    "vehicle": "registration_number, vin_number, client_id, model_id",
+    "invoice": "invoice_number, client_id, vehicle_id",
+    "quotation": "quotation_number, client_id, vehicle_id",
+}
+
+# Dependent rows that embed a parent's text: (parent, changed columns, child, child foreign key)
+_CASCADES = [
+    ("client", "name", "vehicle", "client_id"),
+    ("client", "name", "invoice", "client_id"),
+    ("client", "name", "quotation", "client_id"),
+    ("vehicle", "registration_number", "invoice", "vehicle_id"),
+    ("vehicle", "registration_number", "quotation", "vehicle_id"),
+]
+
+def _reindex_sql(entity: str, where: str) -> str:
+    code, table, alias, select = SEARCH_ENTITIES[entity]
+    return (
+        f"DELETE FROM {SEARCH_TABLE} WHERE rowid IN "
+        f"(SELECT {alias}.id * {ROWID_STRIDE} + {code} FROM {table} {alias} WHERE {where});\n"
+        f"INSERT INTO {SEARCH_TABLE} (rowid, entity, entity_id, title, body) {select} WHERE {where};"
+    )
+
+def _trigger_statements() -> List[str]:
+    statements = []
+    for entity, (code, table, alias, select) in SEARCH_ENTITIES.items():
+        statements.append(f"""
+            CREATE TRIGGER {SEARCH_TABLE}_{table}_insert AFTER INSERT ON {table} BEGIN
+                INSERT INTO {SEARCH_TABLE} (rowid, entity, entity_id, title, body) {select} WHERE {alias}.id = NEW.id;
+            END""")
+        statements.append(f"""
+            CREATE TRIGGER {SEARCH_TABLE}_{table}_update AFTER UPDATE OF {_INDEXED_COLUMNS[entity]} ON {table} BEGIN
+                DELETE FROM {SEARCH_TABLE} WHERE rowid = OLD.id * {ROWID_STRIDE} + {code};
+                INSERT INTO {SEARCH_TABLE} (rowid, entity, entity_id, title, body) {select} WHERE {alias}.id = NEW.id;
+            END""")
+        statements.append(f"""
+            CREATE TRIGGER {SEARCH_TABLE}_{table}_delete AFTER DELETE ON {table} BEGIN
+                DELETE FROM {SEARCH_TABLE} WHERE rowid = OLD.id * {ROWID_STRIDE} + {code};
+            END""")
+
+    for parent, columns, child, foreign_key in _CASCADES:
+        parent_table = SEARCH_ENTITIES[parent][1]
+        child_table, child_alias = SEARCH_ENTITIES[child][1:3]
+        statements.append(f"""
+            CREATE TRIGGER {SEARCH_TABLE}_{parent_table}_{child_table}_cascade
+            AFTER UPDATE OF {columns} ON {parent_table} BEGIN
+                {_reindex_sql(child, f'{child_alias}.{foreign_key} = NEW.id')}
+            END""")
+    return statements
+
+def _trigger_names() -> List[str]:
+    names = []
+    for entity, (_, table, _, _) in SEARCH_ENTITIES.items():
+        names += [f"{SEARCH_TABLE}_{table}_{event}" for event in ("insert", "update", "delete")]
+    for parent, _, child, _ in _CASCADES:
+        names.append(f"{SEARCH_TABLE}_{SEARCH_ENTITIES[parent][1]}_{SEARCH_ENTITIES[child][1]}_cascade")
+    return names
+
+def is_supported(bind) -> bool:
+    return bind.dialect.name == "sqlite"
+
+def rebuild_search_index(connection) -> int:
+    """Repopulate the index from the base tables. Returns the number of rows indexed."""
+    connection.exec_driver_sql(f"DELETE FROM {SEARCH_TABLE}")
+    for _, _, _, select in SEARCH_ENTITIES.values():
+        connection.exec_driver_sql(f"INSERT INTO {SEARCH_TABLE} (rowid, entity, entity_id, title, body) {select}")
+    connection.exec_driver_sql(f"INSERT INTO {SEARCH_TABLE} ({SEARCH_TABLE}) VALUES ('optimize')")
+    return connection.exec_driver_sql(f"SELECT count(*) FROM {SEARCH_TABLE}").scalar()
+
+def ensure_search_index(engine, rebuild: bool = False) -> Optional[int]:
+    """
+    Create the index and (re)create its triggers. The index is populated
+    when it is first created or when rebuild is set; returns the number of
+    rows indexed then, else None. Does nothing on databases without FTS5.
+    """
+    if not is_supported(engine):
+        return None
+
+    with engine.begin() as connection:
+        exists = connection.exec_driver_sql(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (SEARCH_TABLE,)
+        ).first() is not None
+        if not exists:
+            connection.exec_driver_sql(
+                f"CREATE VIRTUAL TABLE {SEARCH_TABLE} USING fts5("
+                "entity UNINDEXED, entity_id UNINDEXED, title, body, "
+                "tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3 4')"
+            )
+
+        # Recreate the triggers so their definitions follow this module
+        for name in _trigger_names():
+            connection.exec_driver_sql(f"DROP TRIGGER IF EXISTS {name}")
+        for statement in _trigger_statements():
+            connection.exec_driver_sql(statement)
+
+        if rebuild or not exists:
+            return rebuild_search_index(connection)
+    return None
+
+def match_expression(query: str) -> Optional[str]:
+    """FTS5 query requiring a prefix match on every word of the user's text"""
+    words = re.findall(r"\w+", query)
+    if not words:
+        return None
+    return " ".join(f'"{word}"*' for word in words)
+
+def _substring_pattern(query: str) -> Optional[str]:
+    """LIKE pattern matching the user's text anywhere in a column"""
+    query = query.strip()
+    if not query:
+        return None
+    return "%" + re.sub(r"([\\%_])", r"\\\1", query) + "%"
+
+# Index rows matching _substring_pattern() in their title or body; a scan, so only used when MATCH finds nothing
+_SUBSTRING_CONDITION = "(title LIKE :pattern ESCAPE '\\' OR body LIKE :pattern ESCAPE '\\')"
+
+def _index_rows(db: Session, condition: str, params: dict, score: str, entities: List[str],
+                limit: Optional[int]) -> List[tuple]:
+    sql = f"SELECT entity, entity_id, title, body, {score} AS score FROM {SEARCH_TABLE} WHERE {condition}"
+    params = dict(params)
+    if len(entities) < len(SEARCH_ENTITIES):
+        sql += " AND entity IN (" + ", ".join(f":entity{i}" for i in range(len(entities))) + ")"
+        params.update({f"entity{i}": entity for i, entity in enumerate(entities)})
+    sql += " ORDER BY score, title"
+    if limit:
+        sql += " LIMIT :limit"
+        params["limit"] = limit
+    return [tuple(row) for row in db.execute(text(sql), params)]
+
+def ranked_ids(db: Session, entity: str, query: str, limit: Optional[int] = None) -> List[int]:
+    """Ids of one entity matching query, best match first"""
+    return [entity_id for _, entity_id, _, _, _ in search(db, query, [entity], limit)]
+
+def search(db: Session, query: str, entities: Optional[Iterable[str]] = None,
+           limit: Optional[int] = 20) -> List[tuple]:
+    """(entity, entity_id, title, body, score) rows, best match first"""
+    entities = list(entities or SEARCH_ENTITIES)
+    if not is_supported(db.get_bind()):
+        return _fallback_search(db, query, entities, limit)
+
+    expression = match_expression(query)
+    if expression is None:
+        return []
+
+    rows = _index_rows(
+        db, f"{SEARCH_TABLE} MATCH :expression", {"expression": expression},
+        f"bm25({SEARCH_TABLE}, {BM25_WEIGHTS})", entities, limit
+    )
+    if not rows:
+        rows = _index_rows(db, _SUBSTRING_CONDITION, {"pattern": _substring_pattern(query)}, "0.0", entities, limit)
+    return rows
+
+def search_filter(db: Session, entity: str, query: str, fallback=None):
+    """
+    WHERE clause restricting an entity's query to rows matching the search
+    text, for list endpoints that keep their own ordering and pagination.
+    Without FTS5 the fallback clause (default: a substring match on the
+    entity's own columns) is returned instead.
+    """
+    model = _FALLBACK_COLUMNS[entity][0]
+    if not is_supported(db.get_bind()):
+        return fallback if fallback is not None else _fallback_filter(entity, query)
+
+    expression = match_expression(query)
+    if expression is None:
+        return model.id.isnot(None)
+
+    condition, params = f"{SEARCH_TABLE} MATCH :expression", {"expression": expression}
+    found = db.execute(
+        text(f"SELECT 1 FROM {SEARCH_TABLE} WHERE {condition} AND entity = :entity LIMIT 1"),
+        dict(params, entity=entity)
+    ).first()
+    if found is None:
+        condition, params = _SUBSTRING_CONDITION, {"pattern": _substring_pattern(query)}
+
+    matching = text(
+        f"SELECT entity_id FROM {SEARCH_TABLE} WHERE {condition} AND entity = :entity"
+    ).bindparams(entity=entity, **params).columns(entity_id=Integer)
+    return model.id.in_(matching)
+
+# Substring search used where FTS5 is unavailable: entity -> (model, title column, other columns)
+_FALLBACK_COLUMNS = {
+    "client": (Client, Client.name, [Client.phone, Client.mobile, Client.email]),
+    "vehicle": (Vehicle, Vehicle.registration_number, [Vehicle.vin_number]),
+    "invoice": (Invoice, Invoice.invoice_number, []),
+    "quotation": (Quotation, Quotation.quotation_number, []),
+}
+
+def _fallback_filter(entity: str, query: str):
+    _, title, others = _FALLBACK_COLUMNS[entity]
+    return or_(*[column.contains(query) for column in [title] + others])
+
+def _fallback_search(db: Session, query: str, entities: List[str], limit: Optional[int]) -> List[tuple]:
+    results = []
+    for entity in entities:
+        model, title, _ = _FALLBACK_COLUMNS[entity]
+        rows = db.query(model.id, title).filter(_fallback_filter(entity, query)).order_by(title)
+        if limit:
+            rows = rows.limit(limit)
+        results += [(entity, entity_id, row_title, "", 0.0) for entity_id, row_title in rows]
+    return results[:limit] if limit else results
@@ -0,0 +1,191 @@
+"""
+Service Catalog
+Versioned snapshot of the services and parts catalog for the invoice editor.
+
+catalog_versions holds a counter that every transaction changing a Service,
+Part, ServiceCategory or PartCategory bumps before it commits, whether the
+change goes through the unit of work or a bulk update/delete, so the
+version is shared by all worker processes. Each process keeps the snapshot
+for the latest version it has seen; a request costs one primary-key read of
+the version plus in-memory filtering, and the version doubles as the ETag.
+
+Writes that only move a part's stock_quantity/reserved_quantity (the stock
+ledger, on every sale and reservation) do not bump the version, so snapshots
+carry no stock; with_live_stock() reads it for the parts a response lists.
+"""
+
+import json
+import threading
+import zlib
+from datetime import datetime
+from typing import List, Optional
+
+from sqlalchemy import event, func, insert, inspect, select, update
+from sqlalchemy.orm import Session
+
+from models.models import CatalogVersion, Part, PartCategory, Service, ServiceCategory
+
+CATALOG_NAME = "services_parts"
+
+_CATALOG_CLASSES = (Service, Part, ServiceCategory, PartCategory)
+
+# Part columns the stock ledger keeps moving; changing only these is not a catalog change.
+# The ledger's own bulk UPDATEs carry its STOCK_ONLY execution option.
+STOCK_COLUMNS = frozenset({"stock_quantity", "reserved_quantity"})
+
+# Fields served to clients, in snapshot column order
+SERVICE_FIELDS = ("id", "name", "description", "base_price", "labor_hours", "category_name", "hsn_sac_code")
+PART_FIELDS = ("id", "name", "part_number", "description", "unit_price", "category_name", "hsn_code")
+
+def public_fields(items: List[dict], fields: tuple) -> List[dict]:
+    return [{field: item[field] for field in fields} for item in items]
+
+def with_live_stock(db: Session, parts: List[dict]) -> List[dict]:
+    """Parts with their stock_quantity (unreserved stock) read now, one query for the lot"""
+    available = dict(db.query(
+        Part.id, func.coalesce(Part.stock_quantity, 0) - func.coalesce(Part.reserved_quantity, 0)
+    ).filter(Part.id.in_([part["id"] for part in parts])).all()) if parts else {}
+    return [dict(part, stock_quantity=available.get(part["id"], 0)) for part in parts]
+
+def stock_etag(catalog: "ServiceCatalog", parts: List[dict]) -> str:
+    """The catalog ETag qualified by the live stock of the parts served"""
+    stock = zlib.crc32(json.dumps([[part["id"], part["stock_quantity"]] for part in parts]).encode("utf-8"))
+    return f'"catalog-{catalog.version}-{stock:08x}"'
+
+class ServiceCatalog:
+    """Snapshot of the catalog at one version"""
+
+    def __init__(self, version: int, services: List[dict], parts: List[dict],
+                 service_categories: List[dict], part_categories: List[dict]):
+        self.version = version
+        self.etag = f'"catalog-{version}"'
+        self.services = services
+        self.parts = parts
+        self.service_categories = service_categories
+        self.part_categories = part_categories
+        self._snapshot_json: Optional[bytes] = None
+
+    def snapshot_json(self) -> bytes:
+        """The whole catalog, with rows as arrays under a shared column list"""
+        if self._snapshot_json is None:
+            self._snapshot_json = json.dumps({
+                "version": self.version,
+                "services": {
+                    "columns": SERVICE_FIELDS,
+                    "rows": [[service[field] for field in SERVICE_FIELDS] for service in self.services]
+                },
+                "parts": {
+                    "columns": PART_FIELDS,
+                    "rows": [[part[field] for field in PART_FIELDS] for part in self.parts]
+                },
+                "service_categories": self.service_categories,
+                "part_categories": self.part_categories,
+            }, separators=(",", ":")).encode("utf-8")
+        return self._snapshot_json
+
+def catalog_version(db: Session) -> int:
+    version = db.execute(
+        select(CatalogVersion.version).where(CatalogVersion.name == CATALOG_NAME)
+    ).scalar()
+    return version or 0
+
+def _load_catalog(db: Session, version: int) -> ServiceCatalog:
+    services = [
+        {
+            "id": service.id,
+            "name": service.name,
+            "description": service.description,
+            "base_price": service.base_price,
+            "labor_hours": service.labor_hours,
+            "category_id": service.category_id,
+            "category_name": category_name,
+            "hsn_sac_code": service.hsn_sac_code
+        }
+        for service, category_name in db.query(Service, ServiceCategory.name)
+        .join(ServiceCategory, Service.category_id == ServiceCategory.id).order_by(Service.id)
+    ]
+    parts = [
+        {
+            "id": part.id,
+            "name": part.name,
+            "part_number": part.part_number,
+            "description": part.description,
+            "unit_price": part.unit_price,
+            "category_id": part.category_id,
+            "category_name": category_name,
+            "hsn_code": part.hsn_code
+        }
+        for part, category_name in db.query(Part, PartCategory.name)
+        .join(PartCategory, Part.category_id == PartCategory.id).order_by(Part.id)
+    ]
+    return ServiceCatalog(
+        version,
+        services,
+        parts,
+        [{"id": category.id, "name": category.name} for category in db.query(ServiceCategory).order_by(ServiceCategory.id)],
+        [{"id": category.id, "name": category.name} for category in db.query(PartCategory).order_by(PartCategory.id)],
+    )
+
+_catalog: Optional[ServiceCatalog] = None
+_lock = threading.Lock()
+
+def get_service_catalog(db: Session) -> ServiceCatalog:
+    """The snapshot for the current catalog version, loading it if this process has not yet"""
+    global _catalog
+    version = catalog_version(db)
+    catalog = _catalog
+    if catalog is not None and catalog.version == version:
+        return catalog
+    with _lock:
+        if _catalog is None or _catalog.version != version:
+            _catalog = _load_catalog(db, version)
+        return _catalog
+
+def filter_items(items: List[dict], search: Optional[str], fields: tuple,
+                 category_id: Optional[int] = None) -> List[dict]:
+    """Case-insensitive substring filter over the given fields, as the SQL contains() filters did"""
+    if category_id:
+        items = [item for item in items if item["category_id"] == category_id]
+    if search:
+        needle = search.lower()
+        items = [item for item in items if any(needle in (item[field] or "").lower() for field in fields)]
+    return items
+
+def bump_catalog_version(connection) -> None:
+    """Increment the catalog version inside the caller's transaction"""
+    bumped = connection.execute(
+        update(CatalogVersion)
+        .where(CatalogVersion.name == CATALOG_NAME)
+        .values(version=CatalogVersion.version + 1, updated_at=datetime.utcnow())
+    )
+    if not bumped.rowcount:
+        connection.execute(insert(CatalogVersion).values(name=CATALOG_NAME, version=1, updated_at=datetime.utcnow()))
+
+def ensure_catalog_version(db: Session):
+    """Create the version row so concurrent first bumps only ever update it"""
+    if db.get(CatalogVersion, CATALOG_NAME) is None:
+        db.add(CatalogVersion(name=CATALOG_NAME, version=0))
+        db.commit()
+
+def _changes_catalog(obj) -> bool:
+    """Whether a dirty object has changes beyond its stock columns"""
+    if not isinstance(obj, _CATALOG_CLASSES):
+        return False
+    if not isinstance(obj, Part):
+        return True
+    return any(attr.history.has_changes() for attr in inspect(obj).attrs if attr.key not in STOCK_COLUMNS)
+
+@event.listens_for(Session, "after_flush")
+def _bump_on_flush(session, flush_context):
+    if any(isinstance(obj, _CATALOG_CLASSES) for obj in (*session.new, *session.deleted)) \
+            or any(_changes_catalog(obj) for obj in session.dirty):
+        bump_catalog_version(session.connection())
+
+@event.listens_for(Session, "do_orm_execute")
+def _bump_on_bulk_write(orm_execute_state):
+    if not (orm_execute_state.is_update or orm_execute_state.is_delete) or orm_execute_state.bind_mapper is None \
+            or orm_execute_state.bind_mapper.class_ not in _CATALOG_CLASSES:
+        return
+    if orm_execute_state.execution_options.get("stock_only"):
+        return
+    bump_catalog_version(orm_execute_state.session.connection())
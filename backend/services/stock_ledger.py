@@ -0,0 +1,252 @@
+"""
+Stock Ledger
+Moves part stock for invoices and quotations without read-modify-write races.
+
+Every change is a single conditional UPDATE on the part row, so concurrent
+billing can never take stock that is not there: an invoice takes stock only
+while stock_quantity - reserved_quantity covers it, and an accepted quotation
+holds stock by raising reserved_quantity under the same condition; its
+invoice takes that stock over when the quotation is converted. Each change
+is written to stock_movements in the caller's transaction, and an invoice's
+stock is restored from its own movements when it is edited or deleted.
+Parts with auto_reduce_stock off are never tracked.
+"""
+
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import case, func, select, update
+from sqlalchemy.orm import Session
+
+from models.models import Part, Quotation, StockMovement, StockReservation
+
+# Execution options of the UPDATEs here, which only move stock_quantity and
+# reserved_quantity; the service catalog does not count them as catalog changes
+STOCK_ONLY = {"stock_only": True}
+
+class InsufficientStockError(Exception):
+    def __init__(self, part_id: int, part_name: str, requested: int, available: int):
+        self.part_id = part_id
+        self.part_name = part_name
+        self.requested = requested
+        self.available = available
+        super().__init__(f"Insufficient stock for {part_name}: requested {requested}, available {available}")
+
+def is_part_item(item_type: Optional[str]) -> bool:
+    return (item_type or "").lower() == "part"
+
+def resolve_part_id(db: Session, part_id: Optional[int], name: Optional[str]) -> Optional[int]:
+    """The catalog part an item refers to: its part_id, else the only part with that name"""
+    if part_id:
+        return part_id
+    if not name or not name.strip():
+        return None
+    matches = db.query(Part.id).filter(func.lower(Part.name) == name.strip().lower()).limit(2).all()
+    return matches[0].id if len(matches) == 1 else None
+
+def resolve_part_ids(db: Session, names: Iterable[str]) -> Dict[str, int]:
+    """resolve_part_id for many names in one query; maps each lowercased name with exactly one part to its id"""
+    wanted = {name.strip().lower() for name in names if name and name.strip()}
+    if not wanted:
+        return {}
+    found: Dict[str, List[int]] = defaultdict(list)
+    for part_id, name in db.execute(
+        select(Part.id, func.lower(Part.name)).where(func.lower(Part.name).in_(wanted))
+    ):
+        found[name].append(part_id)
+    return {name: ids[0] for name, ids in found.items() if len(ids) == 1}
+
+def _stock_quantities(lines: Iterable[Tuple[Optional[int], float]]) -> List[Tuple[int, int]]:
+    """Whole quantities per part, in part id order so concurrent writers lock rows alike"""
+    totals: Dict[int, int] = defaultdict(int)
+    for part_id, quantity in lines:
+        if part_id and quantity and int(quantity) > 0:
+            totals[part_id] += int(quantity)
+    return sorted(totals.items())
+
+def _check_untracked(db: Session, part_id: int, requested: int) -> None:
+    """After a conditional update missed: return if the part is not stock tracked, else raise"""
+    part = db.execute(
+        select(Part.name, Part.stock_quantity, Part.reserved_quantity, Part.auto_reduce_stock)
+        .where(Part.id == part_id)
+    ).first()
+    if part is None or part.auto_reduce_stock is False:
+        return
+    raise InsufficientStockError(part_id, part.name, requested, (part.stock_quantity or 0) - (part.reserved_quantity or 0))
+
+def _record(db: Session, part_id: int, movement_type: str, quantity: int, reference_type: str,
+            reference_id: Optional[int], user_id: Optional[int], notes: Optional[str] = None):
+    db.add(StockMovement(
+        part_id=part_id,
+        movement_type=movement_type,
+        quantity=quantity,
+        reference_type=reference_type,
+        reference_id=reference_id,
+        notes=notes,
+        created_by=user_id
+    ))
+
+def take_stock(db: Session, part_id: int, quantity: int, reference_type: str,
+               reference_id: Optional[int], user_id: Optional[int] = None, notes: Optional[str] = None) -> bool:
+    """
+    Take unreserved stock of one part; False if the part is not tracked.
+    Raises InsufficientStockError, leaving stock untouched, if there is not enough.
+    """
+    taken = db.execute(
+        update(Part)
+        .where(
+            Part.id == part_id,
+            Part.auto_reduce_stock.isnot(False),
+            Part.stock_quantity - Part.reserved_quantity >= quantity
+        )
+        .values(stock_quantity=Part.stock_quantity - quantity)
+        .returning(Part.id)
+        .execution_options(synchronize_session=False, **STOCK_ONLY)
+    ).scalar()
+    if taken is None:
+        _check_untracked(db, part_id, quantity)
+        return False
+    _record(db, part_id, "OUT", quantity, reference_type, reference_id, user_id, notes)
+    return True
+
+def return_stock(db: Session, part_id: int, quantity: int, reference_type: str,
+                 reference_id: Optional[int], user_id: Optional[int] = None, notes: Optional[str] = None):
+    db.execute(
+        update(Part)
+        .where(Part.id == part_id)
+        .values(stock_quantity=Part.stock_quantity + quantity)
+        .execution_options(synchronize_session=False, **STOCK_ONLY)
+    )
+    _record(db, part_id, "IN", quantity, reference_type, reference_id, user_id, notes)
+
+def consume_invoice_stock(db: Session, invoice_id: int, lines: Iterable[Tuple[Optional[int], float]],
+                          user_id: Optional[int] = None):
+    """Take stock for an invoice's (part_id, quantity) lines"""
+    for part_id, quantity in _stock_quantities(lines):
+        take_stock(db, part_id, quantity, "invoice", invoice_id, user_id)
+
+def restore_invoice_stock(db: Session, invoice_id: int, user_id: Optional[int] = None) -> int:
+    """Put back whatever stock an invoice still holds, as recorded in the ledger; returns the units restored"""
+    held = db.execute(
+        select(
+            StockMovement.part_id,
+            func.sum(case(
+                (StockMovement.movement_type == "OUT", StockMovement.quantity),
+                (StockMovement.movement_type == "IN", -StockMovement.quantity),
+                else_=0
+            ))
+        )
+        .where(StockMovement.reference_type == "invoice", StockMovement.reference_id == invoice_id)
+        .group_by(StockMovement.part_id)
+        .order_by(StockMovement.part_id)
+    ).all()
+    restored = 0
+    for part_id, quantity in held:
+        if quantity and quantity > 0:
+            return_stock(db, part_id, quantity, "invoice", invoice_id, user_id)
+            restored += quantity
+    return restored
+
+def reserve_quotation_stock(db: Session, quotation: Quotation, user_id: Optional[int] = None) -> int:
+    """
+    Hold stock for the part items of a quotation; returns the number of
+    parts reserved. Raises InsufficientStockError if any part is short.
+    """
+    lines = [
+        (resolve_part_id(db, None, item.name), item.quantity or 1)
+        for item in quotation.items if is_part_item(item.item_type)
+    ]
+    reserved = 0
+    for part_id, quantity in _stock_quantities(lines):
+        held = db.execute(
+            update(Part)
+            .where(
+                Part.id == part_id,
+                Part.auto_reduce_stock.isnot(False),
+                Part.stock_quantity - Part.reserved_quantity >= quantity
+            )
+            .values(reserved_quantity=Part.reserved_quantity + quantity)
+            .returning(Part.id)
+            .execution_options(synchronize_session=False, **STOCK_ONLY)
+        ).scalar()
+        if held is None:
+            _check_untracked(db, part_id, quantity)
+            continue
+        db.add(StockReservation(part_id=part_id, quotation_id=quotation.id, quantity=quantity, status="active"))
+        reserved += 1
+    return reserved
+
+def release_quotation_stock(db: Session, quotation_id: int) -> int:
+    """Give back the stock held for a quotation; returns the number of reservations released"""
+    return release_quotations_stock(db, [quotation_id])
+
+def release_quotations_stock(db: Session, quotation_ids: List[int]) -> int:
+    """Give back the stock held for many quotations, one update per part"""
+    if not quotation_ids:
+        return 0
+    # Claiming the rows first means two concurrent releases cannot both give stock back
+    released = db.execute(
+        update(StockReservation)
+        .where(StockReservation.quotation_id.in_(quotation_ids), StockReservation.status == "active")
+        .values(status="released")
+        .returning(StockReservation.part_id, StockReservation.quantity)
+        .execution_options(synchronize_session=False)
+    ).all()
+    for part_id, quantity in _stock_quantities(released):
+        db.execute(
+            update(Part)
+            .where(Part.id == part_id)
+            .values(reserved_quantity=Part.reserved_quantity - quantity)
+            .execution_options(synchronize_session=False, **STOCK_ONLY)
+        )
+    return len(released)
+
+def consume_quotation_stock(db: Session, quotation_id: int, invoice_id: int,
+                            lines: Iterable[Tuple[Optional[int], float]], user_id: Optional[int] = None):
+    """
+    Bill a converted quotation's (part_id, quantity) lines to its invoice.
+    Stock the quotation holds is taken out of the reservation; anything the
+    reservations do not cover is taken from unreserved stock.
+    """
+    # Claimed the same way as a release, so a reservation is consumed or released once
+    consumed = db.execute(
+        update(StockReservation)
+        .where(StockReservation.quotation_id == quotation_id, StockReservation.status == "active")
+        .values(status="consumed")
+        .returning(StockReservation.part_id, StockReservation.quantity)
+        .execution_options(synchronize_session=False)
+    ).all()
+    held: Dict[int, int] = defaultdict(int)
+    for part_id, quantity in sorted(consumed):
+        taken = db.execute(
+            update(Part)
+            .where(Part.id == part_id, Part.stock_quantity >= quantity)
+            .values(
+                stock_quantity=Part.stock_quantity - quantity,
+                reserved_quantity=Part.reserved_quantity - quantity
+            )
+            .returning(Part.id)
+            .execution_options(synchronize_session=False, **STOCK_ONLY)
+        ).scalar()
+        if taken is None:
+            part = db.execute(select(Part.name, Part.stock_quantity).where(Part.id == part_id)).first()
+            if part is None:
+                continue
+            raise InsufficientStockError(part_id, part.name, quantity, part.stock_quantity or 0)
+        _record(db, part_id, "OUT", quantity, "invoice", invoice_id, user_id, "Reserved by quotation")
+        held[part_id] += quantity
+
+    for part_id, quantity in _stock_quantities(lines):
+        if quantity > held[part_id]:
+            take_stock(db, part_id, quantity - held[part_id], "invoice", invoice_id, user_id)
+
+def low_stock_parts(db: Session, limit: int = 100):
+    """Parts whose unreserved stock is at or below minimum_stock, largest shortfall first"""
+    shortfall = Part.stock_quantity - Part.reserved_quantity - Part.minimum_stock
+    return (
+        db.query(Part)
+        .filter(shortfall <= 0)
+        .order_by(shortfall, Part.id)
+        .limit(limit)
+        .all()
+    )
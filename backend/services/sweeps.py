@@ -0,0 +1,85 @@
+"""
+Status Sweeps
+Set-based status changes that depend only on the calendar, run by the job
+scheduler rather than by the requests that read the data:
+
+- expire_quotations: pending quotations past valid_until become expired
+- mark_overdue_invoices: pending and partially paid invoices past due_date
+  become overdue
+- accrue_late_fees: overdue invoices with a late fee have it added to their
+  total, once
+
+Each sweep is one UPDATE ... RETURNING per source status on an indexed
+column pair, moves the changed invoices' revenue rollup contribution in the
+same transaction, commits, and returns the number of rows it changed.
+"""
+
+from datetime import date, datetime
+from typing import Optional
+
+from sqlalchemy import func, update
+from sqlalchemy.orm import Session
+
+from models.models import Invoice, Quotation
+from services.revenue_rollup import SNAPSHOT_COLUMNS, apply_rollup_changes, row_snapshot
+from services.stock_ledger import release_quotations_stock
+
+OVERDUE_FROM = ("pending", "partially_paid")
+
+def _start_of(day: Optional[date]) -> datetime:
+    return datetime.combine(day or date.today(), datetime.min.time())
+
+def expire_quotations(db: Session, today: Optional[date] = None) -> int:
+    expired = db.execute(
+        update(Quotation)
+        .where(Quotation.status == "pending", Quotation.valid_until < _start_of(today))
+        .values(status="expired")
+        .returning(Quotation.id)
+        .execution_options(synchronize_session=False)
+    ).scalars().all()
+    release_quotations_stock(db, expired)
+    db.commit()
+    return len(expired)
+
+def mark_overdue_invoices(db: Session, today: Optional[date] = None) -> int:
+    changes = []
+    for status in OVERDUE_FROM:
+        rows = db.execute(
+            update(Invoice)
+            .where(Invoice.payment_status == status, Invoice.due_date < _start_of(today))
+            .values(payment_status="overdue")
+            .returning(*SNAPSHOT_COLUMNS)
+            .execution_options(synchronize_session=False)
+        ).mappings().all()
+        changes += [(row_snapshot(row, payment_status=status), row_snapshot(row)) for row in rows]
+    apply_rollup_changes(db, changes)
+    db.commit()
+    return len(changes)
+
+def accrue_late_fees(db: Session) -> int:
+    total = func.coalesce(Invoice.total_amount, 0)
+    rows = db.execute(
+        update(Invoice)
+        .where(
+            Invoice.payment_status == "overdue",
+            Invoice.late_fee_applicable.is_(True),
+            Invoice.late_fee_amount > 0,
+            Invoice.late_fee_charged_at.is_(None)
+        )
+        .values(
+            total_amount=total + Invoice.late_fee_amount,
+            balance_due=total + Invoice.late_fee_amount - func.coalesce(Invoice.paid_amount, 0),
+            late_fee_charged_at=datetime.utcnow()
+        )
+        .returning(*SNAPSHOT_COLUMNS, Invoice.late_fee_amount)
+        .execution_options(synchronize_session=False)
+    ).mappings().all()
+
+    changes = []
+    for row in rows:
+        row = dict(row)
+        fee = row.pop("late_fee_amount")
+        changes.append((row_snapshot(row, total_amount=row["total_amount"] - fee), row_snapshot(row)))
+    apply_rollup_changes(db, changes)
+    db.commit()
+    return len(changes)
@@ -0,0 +1,196 @@
+"""
+Vehicle Catalog
+Process-wide snapshot of the vehicle brand/model catalog. It is loaded once
+(at startup or on first use) and serves the brand list, per-brand model
+lists and model autocomplete from memory, with the JSON responses
+pre-serialized and an ETag derived from their content.
+
+Commits that touch VehicleBrand or VehicleModel mark the snapshot stale and
+the next read reloads it. Other worker processes pick up the change once
+their snapshot is older than VEHICLE_CATALOG_TTL_SECONDS.
+"""
+
+import bisect
+import difflib
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from typing import Dict, List, Optional
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from database.database import SessionLocal
+from models.models import VehicleBrand, VehicleModel
+
+VEHICLE_CATALOG_TTL_SECONDS = int(os.getenv("VEHICLE_CATALOG_TTL_SECONDS", "300"))
+FUZZY_CUTOFF = 0.6
+
+_CATALOG_CLASSES = (VehicleBrand, VehicleModel)
+
+class VehicleCatalog:
+    """Immutable snapshot; build a new one to reflect catalog changes"""
+
+    def __init__(self, brands: List[VehicleBrand], models: List[VehicleModel]):
+        brand_names = {brand.id: brand.name for brand in brands}
+        self.models: Dict[int, dict] = {}
+        self.models_by_brand: Dict[int, List[dict]] = {brand.id: [] for brand in brands}
+        for model in models:
+            entry = {
+                "id": model.id,
+                "name": model.name,
+                "brand_id": model.brand_id,
+                "brand_name": brand_names.get(model.brand_id),
+                "year_start": model.year_start,
+                "year_end": model.year_end,
+                "fuel_type": model.fuel_type,
+            }
+            self.models[model.id] = entry
+            self.models_by_brand.setdefault(model.brand_id, []).append(entry)
+
+        self.brands = [
+            {
+                "id": brand.id,
+                "name": brand.name,
+                "country": brand.country,
+                "models": [{"id": m["id"], "name": m["name"]} for m in self.models_by_brand[brand.id]]
+            }
+            for brand in brands
+        ]
+
+        # Sorted (word, model id) pairs, one per word of each model name, so a
+        # prefix of any word is found by bisection
+        self._words = sorted(
+            (word, model_id)
+            for model_id, entry in self.models.items()
+            for word in set(_words(entry["name"]))
+        )
+        self._names = {model_id: entry["name"].lower() for model_id, entry in self.models.items()}
+
+        self.brands_json = json.dumps(self.brands).encode("utf-8")
+        self._models_json: Dict[int, bytes] = {}
+        self.etag = '"' + hashlib.sha1(self.brands_json + json.dumps(
+            [self.models[model_id] for model_id in sorted(self.models)]
+        ).encode("utf-8")).hexdigest() + '"'
+        self.loaded_at = time.monotonic()
+
+    def models_json(self, brand_id: int) -> bytes:
+        """Models of a brand as a pre-serialized JSON list"""
+        cached = self._models_json.get(brand_id)
+        if cached is None:
+            fields = ("id", "name", "year_start", "year_end", "fuel_type")
+            cached = json.dumps([
+                {field: model[field] for field in fields} for model in self.models_by_brand.get(brand_id, [])
+            ]).encode("utf-8")
+            self._models_json[brand_id] = cached
+        return cached
+
+    def search_models(self, query: str, brand_id: Optional[int] = None, limit: int = 20) -> List[dict]:
+        """
+        Models matching query, best first: names starting with it, then names
+        with a word starting with it, then names containing it. Only when
+        nothing contains it are close misspellings returned. Matches within
+        a tier are ordered by name.
+        """
+        query = query.strip().lower()
+        if not query:
+            return []
+
+        def allowed(model_id: int) -> bool:
+            return brand_id is None or self.models[model_id]["brand_id"] == brand_id
+
+        word_matches = set()
+        prefix = _words(query)[0] if _words(query) else query
+        start = bisect.bisect_left(self._words, (prefix, -1))
+        for word, model_id in self._words[start:]:
+            if not word.startswith(prefix):
+                break
+            if allowed(model_id) and query in self._names[model_id]:
+                word_matches.add(model_id)
+
+        tiers = [
+            sorted((model_id for model_id in word_matches if self._names[model_id].startswith(query)), key=self._names.get),
+            sorted((model_id for model_id in word_matches if not self._names[model_id].startswith(query)), key=self._names.get),
+        ]
+        found = word_matches
+        if len(found) < limit:
+            contains = sorted(
+                (model_id for model_id, name in self._names.items()
+                 if model_id not in found and query in name and allowed(model_id)),
+                key=self._names.get
+            )
+            tiers.append(contains)
+            found = found | set(contains)
+        if not found:
+            # Nothing contains the text: try it as a misspelling
+            candidates = {name: model_id for model_id, name in self._names.items()
+                          if model_id not in found and allowed(model_id)}
+            close = difflib.get_close_matches(query, candidates, n=limit - len(found), cutoff=FUZZY_CUTOFF)
+            tiers.append([candidates[name] for name in close])
+
+        return [self.models[model_id] for tier in tiers for model_id in tier][:limit]
+
+def _words(text: str) -> List[str]:
+    return re.findall(r"\w+", text.lower())
+
+_catalog: Optional[VehicleCatalog] = None
+_loaded_generation = -1
+_generation = 0  # Bumped by every invalidation
+_lock = threading.Lock()
+
+def load_vehicle_catalog(db: Optional[Session] = None) -> VehicleCatalog:
+    """Build a fresh snapshot from the database and make it current"""
+    global _catalog, _loaded_generation
+    generation = _generation
+    own_session = db is None
+    db = db or SessionLocal()
+    try:
+        catalog = VehicleCatalog(
+            db.query(VehicleBrand).order_by(VehicleBrand.id).all(),
+            db.query(VehicleModel).order_by(VehicleModel.id).all()
+        )
+    finally:
+        if own_session:
+            db.close()
+    with _lock:
+        # A change committed while loading leaves the snapshot stale
+        _catalog, _loaded_generation = catalog, generation
+    return catalog
+
+def get_vehicle_catalog() -> VehicleCatalog:
+    """The current snapshot, reloaded first if it is stale or past its TTL"""
+    catalog = _catalog
+    if (catalog is None or _loaded_generation != _generation
+            or time.monotonic() - catalog.loaded_at > VEHICLE_CATALOG_TTL_SECONDS):
+        catalog = load_vehicle_catalog()
+    return catalog
+
+def invalidate_vehicle_catalog():
+    global _generation
+    with _lock:
+        _generation += 1
+
+# Mark the snapshot stale when a committed transaction changed the catalog,
+# through the unit of work or a bulk query().update()/delete()
+@event.listens_for(Session, "after_flush")
+def _note_catalog_flush(session, flush_context):
+    if any(isinstance(obj, _CATALOG_CLASSES) for obj in (*session.new, *session.dirty, *session.deleted)):
+        session.info["vehicle_catalog_changed"] = True
+
+@event.listens_for(Session, "do_orm_execute")
+def _note_catalog_bulk_write(orm_execute_state):
+    if (orm_execute_state.is_update or orm_execute_state.is_delete) and orm_execute_state.bind_mapper is not None \
+            and orm_execute_state.bind_mapper.class_ in _CATALOG_CLASSES:
+        orm_execute_state.session.info["vehicle_catalog_changed"] = True
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_on_commit(session):
+    if session.info.pop("vehicle_catalog_changed", False):
+        invalidate_vehicle_catalog()
+
+@event.listens_for(Session, "after_rollback")
+def _forget_on_rollback(session):
+    session.info.pop("vehicle_catalog_changed", None)
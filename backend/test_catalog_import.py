@@ -0,0 +1,45 @@
+"""
+Catalog import: a line that is not UTF-8 fails on its own, and records that
+repeat a key within a batch are counted as merged, not updated
+"""
+
+from models.models import Part
+
+def _import(client, headers, filename: str, content: bytes) -> dict:
+    response = client.post(
+        "/api/services/import", params={"entity": "parts"},
+        files={"file": (filename, content)}, headers=headers
+    )
+    assert response.status_code == 200, response.text
+    return response.json()
+
+def test_undecodable_lines_fail_alone(client, headers, db):
+    content = (
+        "part_number,name,unit_price,category\n"
+        "TEST-IM-1,Import Filter,100,Test Import\n"
+        "TEST-IM-2,Import Pad \xe9,200,Test Import\n".encode("latin-1") +
+        b"TEST-IM-3,Import Belt,300,Test Import\n"
+    )
+    report = _import(client, headers, "parts.csv", content)
+    assert (report["inserted"], report["failed"]) == (2, 1)
+    assert report["errors"] == [{"line": 3, "error": "not valid UTF-8"}]
+
+    content = b'{"part_number": "TEST-IM-4", "name": "Import Hose", "category": "Test Import"}\n' \
+              b'{"part_number": "TEST-IM-5", "name": "Import \xff"}\n' \
+              b'{"part_number": "TEST-IM-6", "name": "Import Clamp", "category": "Test Import"}\n'
+    report = _import(client, headers, "parts.jsonl", content)
+    assert (report["inserted"], report["failed"]) == (2, 1)
+    assert report["errors"] == [{"line": 2, "error": "not valid UTF-8"}]
+
+def test_repeated_keys_are_merged(client, headers, db):
+    content = (
+        b"part_number,name,unit_price,category\n"
+        b"TEST-IM-7,Import Wiper,100,Test Import\n"
+        b"TEST-IM-7,Import Wiper,150,Test Import\n"
+        b"TEST-IM-1,Import Filter,120,Test Import\n"
+        b"TEST-IM-1,Import Filter,130,Test Import\n"
+    )
+    report = _import(client, headers, "parts.csv", content)
+    assert (report["inserted"], report["updated"], report["merged"], report["failed"]) == (1, 1, 2, 0)
+    prices = dict(db.query(Part.part_number, Part.unit_price).filter(Part.part_number.in_(["TEST-IM-1", "TEST-IM-7"])))
+    assert prices == {"TEST-IM-1": 130, "TEST-IM-7": 150}
@@ -0,0 +1,41 @@
+"""
+Invoice list keyset pagination: following X-Next-Cursor visits every invoice
+once, in order, including invoices without an invoice_date
+"""
+
+from models.models import Invoice
+from services.revenue_rollup import apply_rollup_change, rollup_snapshot
+
+def _page_through(client, headers, order: str, limit: int = 2) -> list:
+    ids, cursor = [], None
+    while True:
+        params = {"limit": limit, "order": order}
+        if cursor:
+            params["cursor"] = cursor
+        response = client.get("/api/invoices/", params=params, headers=headers)
+        assert response.status_code == 200, response.text
+        ids += [invoice["id"] for invoice in response.json()]
+        cursor = response.headers.get("X-Next-Cursor")
+        if not cursor:
+            return ids
+
+def test_cursor_pages_cover_undated_invoices(client, headers, db, invoice_body):
+    created = []
+    for day in ("2026-03-01T10:00:00", "2026-03-01T10:00:00", "2026-03-02T09:00:00", None, None):
+        body = dict(invoice_body, invoice_date=day)
+        response = client.post("/api/invoices/", json=body, headers=headers)
+        assert response.status_code == 200, response.text
+        created.append(response.json()["id"])
+    for invoice in db.query(Invoice).filter(Invoice.id.in_(created[3:])):
+        before = rollup_snapshot(invoice)
+        invoice.invoice_date = None
+        apply_rollup_change(db, before, rollup_snapshot(invoice))
+    db.commit()
+
+    rows = [(invoice_id, invoice_date) for invoice_id, invoice_date in db.query(Invoice.id, Invoice.invoice_date)]
+    dated = [row for row in rows if row[1] is not None]
+    undated = sorted(row[0] for row in rows if row[1] is None)
+    ascending = undated + [invoice_id for invoice_id, _ in sorted(dated, key=lambda row: (row[1], row[0]))]
+
+    assert _page_through(client, headers, "asc") == ascending
+    assert _page_through(client, headers, "desc") == ascending[::-1]
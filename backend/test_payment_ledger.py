@@ -0,0 +1,77 @@
+"""
+Payment ledger: payments, corrections, status changes and invoice edits keep
+paid_amount equal to the ledger sum, balance_due and payment_status in step
+with it, and the revenue rollup equal to a rebuild
+"""
+
+from sqlalchemy import func
+
+from models.models import Invoice, Payment
+from services.payment_ledger import reconcile_balances
+
+def _ledger_sum(db, invoice_id: int) -> float:
+    return db.query(func.coalesce(func.sum(Payment.amount), 0)).filter(Payment.invoice_id == invoice_id).scalar()
+
+def _invoice(db, invoice_id: int) -> Invoice:
+    db.expire_all()
+    return db.get(Invoice, invoice_id)
+
+def test_payments_and_status_changes_follow_the_ledger(client, headers, db, invoice_body, rollup_matches_rebuild):
+    response = client.post("/api/invoices/", json=invoice_body, headers=headers)
+    assert response.status_code == 200, response.text
+    invoice_id = response.json()["id"]
+    payments = f"/api/invoices/{invoice_id}/payment"
+
+    assert client.post(payments, json={"amount": 500, "payment_method": "UPI"}, headers=headers).status_code == 200
+    assert client.post(payments, json={"amount": 200}, headers=headers).status_code == 200
+    invoice = _invoice(db, invoice_id)
+    assert (invoice.paid_amount, invoice.balance_due, invoice.payment_status) == (700, 480, "partially_paid")
+
+    # Corrections are negative entries, with a reason, never below zero paid
+    assert client.post(payments, json={"amount": 0}, headers=headers).status_code == 400
+    assert client.post(payments, json={"amount": -200}, headers=headers).status_code == 400
+    assert client.post(payments, json={"amount": -800, "notes": "Refund"}, headers=headers).status_code == 400
+    assert client.post(payments, json={"amount": -200, "notes": "Cheque bounced"}, headers=headers).status_code == 200
+    invoice = _invoice(db, invoice_id)
+    assert (invoice.paid_amount, invoice.balance_due) == (500, 680)
+
+    response = client.patch(f"/api/invoices/{invoice_id}/status", json={"payment_status": "paid"}, headers=headers)
+    assert response.status_code == 200, response.text
+    invoice = _invoice(db, invoice_id)
+    assert (invoice.paid_amount, invoice.balance_due, invoice.payment_status) == (1180, 0, "paid")
+    assert _ledger_sum(db, invoice_id) == invoice.paid_amount
+    assert rollup_matches_rebuild()
+
+    # A higher total reopens a paid invoice, so outstanding reads see it
+    invoice_body.update({"taxable_amount": 2000, "cgst_amount": 180, "sgst_amount": 180, "total_amount": 2360})
+    invoice_body["items"][0].update({"rate": 2000, "total": 2000})
+    response = client.put(f"/api/invoices/{invoice_id}", json=invoice_body, headers=headers)
+    assert response.status_code == 200, response.text
+    invoice = _invoice(db, invoice_id)
+    assert (invoice.paid_amount, invoice.balance_due, invoice.payment_status) == (1180, 1180, "partially_paid")
+    assert rollup_matches_rebuild()
+
+    response = client.patch(f"/api/invoices/{invoice_id}/status", json={"payment_status": "pending"}, headers=headers)
+    assert response.status_code == 200, response.text
+    invoice = _invoice(db, invoice_id)
+    assert (invoice.paid_amount, invoice.balance_due, invoice.payment_status) == (0, 2360, "pending")
+    assert _ledger_sum(db, invoice_id) == 0
+    assert len(client.get(f"/api/invoices/{invoice_id}/payments", headers=headers).json()) == 5
+
+    assert all(row["invoice_id"] != invoice_id for row in reconcile_balances(db))
+    assert rollup_matches_rebuild()
+
+def test_reconcile_rewrites_drifted_balances_from_the_ledger(client, headers, db, invoice_body):
+    response = client.post("/api/invoices/", json=invoice_body, headers=headers)
+    invoice_id = response.json()["id"]
+    assert client.post(f"/api/invoices/{invoice_id}/payment", json={"amount": 300}, headers=headers).status_code == 200
+
+    db.query(Invoice).filter(Invoice.id == invoice_id).update({"paid_amount": 900, "balance_due": 5})
+    db.commit()
+    drift = [row for row in reconcile_balances(db) if row["invoice_id"] == invoice_id]
+    assert drift and drift[0]["ledger_paid"] == 300 and drift[0]["expected_balance"] == 880
+
+    reconcile_balances(db, apply=True)
+    invoice = _invoice(db, invoice_id)
+    assert (invoice.paid_amount, invoice.balance_due, invoice.payment_status) == (300, 880, "partially_paid")
+    assert reconcile_balances(db) == []
@@ -0,0 +1,51 @@
+"""
+Streamed PDF ZIP export: progress lives in pdf_export_jobs, so any worker can
+report it, and an interrupted download resumes after the last PDF sent
+"""
+
+import asyncio
+import io
+import zipfile
+
+from models.models import PdfExportJob
+from services.pdf_export import create_export_job, get_export_job, stream_invoice_zip
+
+def _create_invoices(client, headers, invoice_body, count: int) -> list:
+    ids = []
+    for _ in range(count):
+        response = client.post("/api/invoices/", json=invoice_body, headers=headers)
+        assert response.status_code == 200, response.text
+        ids.append(response.json()["id"])
+    return ids
+
+def test_export_progress_is_stored(client, headers, db, invoice_body):
+    ids = _create_invoices(client, headers, invoice_body, 2)
+    response = client.get("/api/invoices/export/pdf-zip", params={"after_id": ids[0] - 1}, headers=headers)
+    assert response.status_code == 200, response.text
+    names = zipfile.ZipFile(io.BytesIO(response.content)).namelist()
+    assert "manifest.json" in names
+
+    export_id = response.headers["X-Export-Id"]
+    row = db.get(PdfExportJob, export_id)
+    assert (row.status, row.total, row.completed, row.last_invoice_id) == ("completed", 2, 2, ids[-1])
+
+    progress = client.get(f"/api/invoices/export/pdf-zip/{export_id}", headers=headers).json()
+    assert progress["status"] == "completed"
+    assert progress["remaining"] == 0
+    assert client.get("/api/invoices/export/pdf-zip/unknown", headers=headers).status_code == 404
+
+def test_interrupted_export_resumes_after_last_sent_pdf(client, headers, db, invoice_body):
+    ids = _create_invoices(client, headers, invoice_body, 3)
+    job = create_export_job(db, ids, {"after_id": None})
+
+    async def download_then_disconnect():
+        chunks = stream_invoice_zip(job)
+        await chunks.__anext__()  # First PDF produced
+        await chunks.__anext__()  # Server came back for more: first PDF was sent
+        await chunks.aclose()     # Client gone while the second was in flight
+
+    asyncio.run(download_then_disconnect())
+    db.expire_all()
+    stored = get_export_job(db, job["export_id"])
+    assert stored["status"] == "interrupted"
+    assert (stored["completed"], stored["last_invoice_id"]) == (1, ids[0])
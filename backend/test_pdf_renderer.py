@@ -0,0 +1,58 @@
+"""
+PDF tests: rendering with markup in user-supplied fields, and ETag
+revalidation of GET /api/pdf/invoices/{id}/pdf
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from PIL import Image as PILImage
+
+import routers.pdf
+from services.pdf_renderer import render_invoice_pdf, render_quotation_pdf
+
+def _document(text: str) -> dict:
+    return {
+        "number": "INV/TEST/1",
+        "date": "01/01/2026",
+        "client": {"name": text, "address": text, "phone": text},
+        "vehicle": {"registration_number": text, "brand_name": text, "model_name": text},
+        "items": [{"name": text, "quantity": 1, "rate": 100, "total": 100}],
+        "subtotal": 100,
+        "total_amount": 118,
+        "notes": text,
+    }
+
+def _image_count(pdf: bytes) -> int:
+    return pdf.count(b"/Subtype /Image")
+
+def test_user_fields_are_not_markup(tmp_path):
+    image_path = tmp_path / "secret.png"
+    PILImage.new("RGB", (4, 4), "red").save(image_path)
+    baseline = _image_count(render_invoice_pdf(_document("Plain text")))
+
+    for text in ["Check pads <b", "Tom & Jerry <i>Motors", f'<img src="{image_path}" width="10" height="10"/>']:
+        for render in (render_invoice_pdf, render_quotation_pdf):
+            pdf = render(_document(text))
+            assert pdf.startswith(b"%PDF")
+            # The <img> is printed as text, not read from disk and embedded
+            assert _image_count(pdf) == baseline
+
+def test_revalidation_skips_render_and_cache(client, headers, invoice_body, monkeypatch):
+    response = client.post("/api/invoices/", json=invoice_body, headers=headers)
+    assert response.status_code == 200, response.text
+    url = f"/api/pdf/invoices/{response.json()['id']}/pdf"
+
+    response = client.get(url, headers=headers)
+    assert response.status_code == 200
+    assert response.content.startswith(b"%PDF")
+    etag = response.headers["etag"]
+
+    async def no_render(*args, **kwargs):
+        raise AssertionError("revalidation rendered or read the cache")
+
+    monkeypatch.setattr(routers.pdf, "render_document", no_render)
+    response = client.get(url, headers={**headers, "If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.headers["etag"] == etag
@@ -0,0 +1,57 @@
+"""
+Quotation to invoice conversion: one invoice per quotation, part stock taken
+out of the quotation's reservation, revenue rollup kept in step
+"""
+
+from models.models import Invoice, Part, StockMovement, StockReservation
+
+def test_conversion_consumes_reservation_once(client, headers, db, customer, rollup_matches_rebuild):
+    part = Part(name="Test Brake Pad", part_number="TEST-BP-1", unit_price=500, stock_quantity=10)
+    db.add(part)
+    db.commit()
+
+    client_id, vehicle_id = customer
+    response = client.post("/api/quotations/", json={
+        "client_id": client_id,
+        "vehicle_id": vehicle_id,
+        "quotation_date": "2026-01-10",
+        "subtotal": 2500,
+        "total_amount": 2950,
+        "items": [
+            {"item_type": "part", "name": "Test Brake Pad", "rate": 500, "quantity": 3, "total": 1500},
+            {"item_type": "service", "name": "Brake Service", "rate": 1000, "quantity": 1, "total": 1000},
+        ],
+    }, headers=headers)
+    assert response.status_code == 200, response.text
+    quotation_id = response.json()["id"]
+
+    response = client.post(f"/api/quotations/{quotation_id}/accept", headers=headers)
+    assert response.status_code == 200, response.text
+    db.refresh(part)
+    assert (part.stock_quantity, part.reserved_quantity) == (10, 3)
+
+    response = client.post(f"/api/quotations/{quotation_id}/convert-to-invoice", headers=headers)
+    assert response.status_code == 200, response.text
+    invoice_id = response.json()["invoice_id"]
+
+    invoice = db.get(Invoice, invoice_id)
+    assert invoice.quotation_id == quotation_id
+    assert invoice.total_amount == 2950
+    assert invoice.balance_due == 2950
+
+    # Taken from the reservation, not on top of it
+    db.refresh(part)
+    assert (part.stock_quantity, part.reserved_quantity) == (7, 0)
+    statuses = [r.status for r in db.query(StockReservation).filter(StockReservation.quotation_id == quotation_id)]
+    assert statuses == ["consumed"]
+    movements = db.query(StockMovement).filter(
+        StockMovement.part_id == part.id, StockMovement.reference_type == "invoice"
+    ).all()
+    assert [(m.movement_type, m.quantity, m.reference_id) for m in movements] == [("OUT", 3, invoice_id)]
+
+    response = client.post(f"/api/quotations/{quotation_id}/convert-to-invoice", headers=headers)
+    assert response.status_code == 400
+    assert db.query(Invoice).filter(Invoice.quotation_id == quotation_id).count() == 1
+    db.refresh(part)
+    assert (part.stock_quantity, part.reserved_quantity) == (7, 0)
+    assert rollup_matches_rebuild()
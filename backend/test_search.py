@@ -0,0 +1,27 @@
+"""
+Search: word-prefix matches come from the FTS index, and fragments inside a
+word (the tail of a phone number or registration) are still found
+"""
+
+def test_phone_and_registration_tails_are_found(client, headers):
+    response = client.post("/api/clients/", json={"name": "Tail Search Client", "phone": "6382551412"}, headers=headers)
+    assert response.status_code == 200, response.text
+    client_id = response.json()["id"]
+    response = client.post("/api/vehicles/", json={
+        "client_id": client_id, "model_id": 1, "registration_number": "tn 50 au5590"
+    }, headers=headers)
+    assert response.status_code == 200, response.text
+    vehicle_id = response.json()["id"]
+
+    response = client.get("/api/clients/search/", params={"q": "1412"}, headers=headers)
+    assert [row["id"] for row in response.json()] == [client_id]
+    response = client.get("/api/clients/", params={"search": "551412"}, headers=headers)
+    assert [row["id"] for row in response.json()] == [client_id]
+    response = client.get("/api/vehicles/", params={"search": "5590"}, headers=headers)
+    assert [row["id"] for row in response.json()] == [vehicle_id]
+
+    # Prefix matches still come from the index
+    response = client.get("/api/clients/search/", params={"q": "tail sea"}, headers=headers)
+    assert [row["id"] for row in response.json()] == [client_id]
+    response = client.get("/api/search/", params={"q": "au55", "types": "vehicle"}, headers=headers)
+    assert [row["id"] for row in response.json()] == [vehicle_id]
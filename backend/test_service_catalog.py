@@ -0,0 +1,35 @@
+"""
+Service catalog: stock moves do not change the catalog version, and parts
+lists serve the live unreserved stock with an ETag that follows it
+"""
+
+from models.models import Part, PartCategory
+
+def test_parts_serve_live_stock_without_a_catalog_change(client, headers, db):
+    category = PartCategory(name="Test Catalog Category")
+    db.add(category)
+    db.flush()
+    part = Part(name="Test Catalog Filter", part_number="TEST-CF-1", unit_price=250, stock_quantity=10,
+                reserved_quantity=2, category_id=category.id)
+    db.add(part)
+    db.commit()
+
+    params = {"search": "TEST-CF-1"}
+    response = client.get("/api/services/parts", params=params, headers=headers)
+    assert response.status_code == 200, response.text
+    assert [row["stock_quantity"] for row in response.json()] == [8]
+    version, etag = response.headers["X-Catalog-Version"], response.headers["ETag"]
+
+    response = client.post(f"/api/services/parts/{part.id}/stock", json={"quantity": -3}, headers=headers)
+    assert response.status_code == 200, response.text
+
+    response = client.get("/api/services/parts", params=params, headers={**headers, "If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["X-Catalog-Version"] == version
+    assert [row["stock_quantity"] for row in response.json()] == [5]
+    response = client.get("/api/services/parts/search", params=params)
+    assert [row["stock_quantity"] for row in response.json()] == [5]
+
+    etag = response.headers["ETag"]
+    response = client.get("/api/services/parts/search", params=params, headers={"If-None-Match": etag})
+    assert response.status_code == 304
@@ -0,0 +1,41 @@
+"""
+Status sweeps: overdue marking and late fees run once per invoice, and an
+invoice edit keeps a late fee already charged
+"""
+
+from datetime import date
+
+from models.models import Invoice
+from services.sweeps import accrue_late_fees, mark_overdue_invoices
+
+def test_overdue_and_late_fee_sweeps_are_idempotent(client, headers, db, invoice_body, rollup_matches_rebuild):
+    invoice_body.update({
+        "due_date": "2025-01-15T00:00:00",
+        "late_fee_applicable": True,
+        "late_fee_amount": 100,
+    })
+    response = client.post("/api/invoices/", json=invoice_body, headers=headers)
+    assert response.status_code == 200, response.text
+    invoice_id = response.json()["id"]
+
+    assert mark_overdue_invoices(db, date.today()) >= 1
+    assert mark_overdue_invoices(db, date.today()) == 0
+    assert accrue_late_fees(db) >= 1
+    assert accrue_late_fees(db) == 0
+
+    invoice = db.get(Invoice, invoice_id)
+    assert invoice.payment_status == "overdue"
+    assert invoice.total_amount == 1280
+    assert invoice.balance_due == 1280
+    assert rollup_matches_rebuild()
+
+    # Editing rebuilds the total from the items; the fee charged stays on it
+    response = client.put(f"/api/invoices/{invoice_id}", json=invoice_body, headers=headers)
+    assert response.status_code == 200, response.text
+    assert accrue_late_fees(db) == 0
+
+    db.expire_all()
+    invoice = db.get(Invoice, invoice_id)
+    assert invoice.total_amount == 1280
+    assert invoice.balance_due == 1280
+    assert rollup_matches_rebuild()
@@ -1,160 +1,125 @@
+"""
+Reference data seeding.
+
+The vehicle brands and models, service categories and services, and part
+categories and parts a new installation starts with live in
+reference_data.json. They are loaded with one bulk INSERT per table in a
+single transaction, and the file's version is recorded in catalog_versions,
+so a started database is recognized with one primary-key read and no table
+counts. Raising the file's version makes the next startup load any section
+whose table is still empty; tables that already have rows are never touched.
+"""
+
+import json
+import os
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from sqlalchemy import insert, select, update
 from sqlalchemy.orm import Session
+
 from models.models import (
-    VehicleBrand, VehicleModel, ServiceCategory, Service,
+    CatalogVersion, VehicleBrand, VehicleModel, ServiceCategory, Service,
     PartCategory, Part
 )
-from .vehicle_data_initializer import initialize_global_vehicle_data
+from services.service_catalog import bump_catalog_version
+from services.vehicle_catalog import invalidate_vehicle_catalog
 
-def initialize_sample_data(db: Session):
-    """Initialize database with comprehensive data including global vehicle brands"""
-
-    # Check if data already exists
-    if db.query(VehicleBrand).count() > 0:
-        return
-
-    print("Initializing comprehensive sample data...")
-
-    # Initialize global vehicle brands and models
-    initialize_global_vehicle_data(db)
-
-    # Service Categories and Services
-    service_categories_data = [
-        {
-            "name": "Engine Services",
-            "services": [
-                {"name": "Oil Change", "base_price": 2000, "labor_hours": 1.0},
-                {"name": "Engine Tuning", "base_price": 5000, "labor_hours": 3.0},
-                {"name": "Engine Overhaul", "base_price": 25000, "labor_hours": 8.0},
-                {"name": "Timing Belt Replacement", "base_price": 3500, "labor_hours": 2.5},
-                {"name": "Spark Plug Replacement", "base_price": 1500, "labor_hours": 1.0},
-                {"name": "Air Filter Replacement", "base_price": 800, "labor_hours": 0.5},
-                {"name": "Fuel Filter Replacement", "base_price": 1200, "labor_hours": 1.0},
-                {"name": "Coolant System Flush", "base_price": 1800, "labor_hours": 1.5},
-                {"name": "Engine Cleaning", "base_price": 2500, "labor_hours": 2.0},
-                {"name": "Valve Adjustment", "base_price": 3000, "labor_hours": 3.0},
-            ]
-        },
-        {
-            "name": "Brake Services",
-            "services": [
-                {"name": "Brake Pad Replacement", "base_price": 2500, "labor_hours": 2.0},
-                {"name": "Brake Disc Replacement", "base_price": 4000, "labor_hours": 2.5},
-                {"name": "Brake Fluid Change", "base_price": 800, "labor_hours": 1.0},
-                {"name": "Brake System Inspection", "base_price": 500, "labor_hours": 0.5},
-                {"name": "Brake Shoe Replacement", "base_price": 1800, "labor_hours": 1.5},
-                {"name": "Handbrake Adjustment", "base_price": 600, "labor_hours": 0.5},
-                {"name": "Brake Caliper Service", "base_price": 2200, "labor_hours": 2.0},
-                {"name": "ABS System Check", "base_price": 1500, "labor_hours": 1.0},
-            ]
-        },
-        {
-            "name": "Electrical Services",
-            "services": [
-                {"name": "Battery Replacement", "base_price": 5000, "labor_hours": 1.0},
-                {"name": "Alternator Repair", "base_price": 3500, "labor_hours": 2.0},
-                {"name": "Starter Motor Repair", "base_price": 3000, "labor_hours": 2.5},
-                {"name": "Wiring Harness Repair", "base_price": 2500, "labor_hours": 3.0},
-                {"name": "Headlight Replacement", "base_price": 1200, "labor_hours": 1.0},
-                {"name": "Tail Light Repair", "base_price": 800, "labor_hours": 0.5},
-                {"name": "ECU Diagnosis", "base_price": 2000, "labor_hours": 1.5},
-                {"name": "Fuse Box Inspection", "base_price": 500, "labor_hours": 0.5},
-            ]
-        },
-        {
-            "name": "AC Services",
-            "services": [
-                {"name": "AC Gas Refill", "base_price": 2000, "labor_hours": 1.0},
-                {"name": "AC Compressor Repair", "base_price": 8000, "labor_hours": 4.0},
-                {"name": "AC Filter Replacement", "base_price": 600, "labor_hours": 0.5},
-                {"name": "AC System Diagnosis", "base_price": 1000, "labor_hours": 1.0},
-                {"name": "Condenser Cleaning", "base_price": 800, "labor_hours": 1.0},
-                {"name": "Evaporator Cleaning", "base_price": 1500, "labor_hours": 2.0},
-            ]
-        },
-        {
-            "name": "Transmission Services",
-            "services": [
-                {"name": "Gear Oil Change", "base_price": 1500, "labor_hours": 1.0},
-                {"name": "Clutch Replacement", "base_price": 8000, "labor_hours": 6.0},
-                {"name": "Transmission Repair", "base_price": 15000, "labor_hours": 8.0},
-                {"name": "CV Joint Replacement", "base_price": 3500, "labor_hours": 3.0},
-                {"name": "Drive Shaft Repair", "base_price": 4000, "labor_hours": 3.0},
-            ]
-        }
+REFERENCE_DATA_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "reference_data.json")
+SEED_MARKER = "seed_reference_data"
+
+_reference_data: Optional[dict] = None
+
+def load_reference_data() -> dict:
+    global _reference_data
+    if _reference_data is None:
+        with open(REFERENCE_DATA_PATH, encoding="utf-8") as f:
+            _reference_data = json.load(f)
+    return _reference_data
+
+def seed_version(db: Session) -> int:
+    """Version of the reference data this database was seeded with, 0 if never"""
+    return db.execute(select(CatalogVersion.version).where(CatalogVersion.name == SEED_MARKER)).scalar() or 0
+
+def _is_empty(db: Session, model) -> bool:
+    return db.execute(select(model.id).limit(1)).first() is None
+
+def _insert_vehicle_data(db: Session, brands: List[dict]) -> int:
+    brand_ids = {
+        name: brand_id
+        for brand_id, name in db.execute(
+            insert(VehicleBrand).returning(VehicleBrand.id, VehicleBrand.name),
+            [{"name": brand["name"], "country": brand["country"]} for brand in brands]
+        )
+    }
+    models = [
+        {"brand_id": brand_ids[brand["name"]], **model}
+        for brand in brands for model in brand["models"]
     ]
+    if models:
+        db.execute(insert(VehicleModel), models)
+    return len(brands)
 
-    for category_data in service_categories_data:
-        category = ServiceCategory(name=category_data["name"])
-        db.add(category)
-        db.flush()
-
-        for service_data in category_data["services"]:
-            service = Service(
-                category_id=category.id,
-                name=service_data["name"],
-                base_price=service_data["base_price"],
-                labor_hours=service_data["labor_hours"]
-            )
-            db.add(service)
-
-    # Parts Categories and Parts
-    part_categories_data = [
-        {
-            "name": "Engine Parts",
-            "parts": [
-                {"name": "Engine Oil", "unit_price": 800, "part_number": "EO001"},
-                {"name": "Oil Filter", "unit_price": 300, "part_number": "OF001"},
-                {"name": "Air Filter", "unit_price": 400, "part_number": "AF001"},
-                {"name": "Spark Plug", "unit_price": 150, "part_number": "SP001"},
-                {"name": "Timing Belt", "unit_price": 2500, "part_number": "TB001"},
-                {"name": "Water Pump", "unit_price": 3500, "part_number": "WP001"},
-                {"name": "Thermostat", "unit_price": 800, "part_number": "TH001"},
-                {"name": "Fuel Pump", "unit_price": 4500, "part_number": "FP001"},
-                {"name": "Injector", "unit_price": 3000, "part_number": "INJ001"},
-                {"name": "Piston Ring", "unit_price": 1500, "part_number": "PR001"},
-            ]
-        },
-        {
-            "name": "Brake Parts",
-            "parts": [
-                {"name": "Brake Pad Set", "unit_price": 1800, "part_number": "BP001"},
-                {"name": "Brake Disc", "unit_price": 2500, "part_number": "BD001"},
-                {"name": "Brake Fluid", "unit_price": 300, "part_number": "BF001"},
-                {"name": "Brake Shoe", "unit_price": 1200, "part_number": "BS001"},
-                {"name": "Brake Caliper", "unit_price": 3500, "part_number": "BC001"},
-                {"name": "Master Cylinder", "unit_price": 2800, "part_number": "MC001"},
-                {"name": "Brake Hose", "unit_price": 800, "part_number": "BH001"},
-            ]
-        },
-        {
-            "name": "Electrical Parts",
-            "parts": [
-                {"name": "Car Battery", "unit_price": 4500, "part_number": "CB001"},
-                {"name": "Alternator", "unit_price": 8000, "part_number": "ALT001"},
-                {"name": "Starter Motor", "unit_price": 6500, "part_number": "SM001"},
-                {"name": "Headlight Bulb", "unit_price": 500, "part_number": "HB001"},
-                {"name": "Tail Light Bulb", "unit_price": 200, "part_number": "TLB001"},
-                {"name": "Fuse Set", "unit_price": 300, "part_number": "FS001"},
-                {"name": "Relay", "unit_price": 150, "part_number": "REL001"},
-                {"name": "Wiring Harness", "unit_price": 2000, "part_number": "WH001"},
-            ]
-        }
+def _insert_categorized(db: Session, category_model, item_model, categories: List[dict], items_key: str) -> int:
+    category_ids = {
+        name: category_id
+        for category_id, name in db.execute(
+            insert(category_model).returning(category_model.id, category_model.name),
+            [{"name": category["name"]} for category in categories]
+        )
+    }
+    items = [
+        {"category_id": category_ids[category["name"]], **item}
+        for category in categories for item in category[items_key]
     ]
+    if items:
+        db.execute(insert(item_model), items)
+    return len(items)
+
+def _set_seed_version(db: Session, version: int):
+    updated = db.execute(
+        update(CatalogVersion).where(CatalogVersion.name == SEED_MARKER).values(version=version, updated_at=datetime.utcnow())
+    )
+    if not updated.rowcount:
+        db.execute(insert(CatalogVersion).values(name=SEED_MARKER, version=version))
+
+def seed_reference_data(db: Session, force: bool = False) -> Dict[str, int]:
+    """
+    Load the sections of the reference data whose tables are empty, unless
+    the database is already seeded with this version. Returns the rows
+    inserted per section.
+    """
+    data = load_reference_data()
+    if not force and seed_version(db) >= data["version"]:
+        return {}
 
-    for category_data in part_categories_data:
-        category = PartCategory(name=category_data["name"])
-        db.add(category)
-        db.flush()
-
-        for part_data in category_data["parts"]:
-            part = Part(
-                category_id=category.id,
-                name=part_data["name"],
-                part_number=part_data["part_number"],
-                unit_price=part_data["unit_price"],
-                stock_quantity=50  # Default stock
-            )
-            db.add(part)
+    inserted = {}
+    if _is_empty(db, VehicleBrand):
+        inserted["vehicle_brands"] = _insert_vehicle_data(db, data["vehicle_brands"])
+    if _is_empty(db, ServiceCategory):
+        inserted["services"] = _insert_categorized(db, ServiceCategory, Service, data["service_categories"], "services")
+    if _is_empty(db, PartCategory):
+        inserted["parts"] = _insert_categorized(db, PartCategory, Part, data["part_categories"], "parts")
+    if "services" in inserted or "parts" in inserted:
+        bump_catalog_version(db.connection())
+    _set_seed_version(db, data["version"])
+    db.commit()
+
+    if "vehicle_brands" in inserted:
+        invalidate_vehicle_catalog()
+    return inserted
 
+def reseed_vehicle_data(db: Session) -> int:
+    """Replace all vehicle brands and models with the reference data; returns the brand count"""
+    db.query(VehicleModel).delete()
+    db.query(VehicleBrand).delete()
+    brands = _insert_vehicle_data(db, load_reference_data()["vehicle_brands"])
     db.commit()
-    print("Sample data initialized successfully!")
\ No newline at end of file
+    invalidate_vehicle_catalog()
+    return brands
+
+def initialize_sample_data(db: Session):
+    """Seed a new database with the reference data; a no-op once seeded"""
+    inserted = seed_reference_data(db)
+    if inserted:
+        print(f"Reference data seeded: {inserted}")
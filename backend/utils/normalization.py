@@ -0,0 +1,30 @@
+"""
+Canonical forms of phone and registration numbers, used for duplicate
+checks and exact lookups whatever spacing, punctuation or prefix the
+number was typed with.
+"""
+
+import re
+from typing import Optional
+
+COUNTRY_CODE = "91"
+NATIONAL_NUMBER_DIGITS = 10
+
+def normalize_phone(phone: Optional[str]) -> Optional[str]:
+    """
+    Digits of an Indian phone number without country code or trunk prefix:
+    "+91 98765 43210", "098765-43210" and "9876543210" all give "9876543210".
+    Other lengths keep all their digits.
+    """
+    if not phone:
+        return None
+    digits = re.sub(r"\D", "", phone).lstrip("0")
+    if len(digits) == len(COUNTRY_CODE) + NATIONAL_NUMBER_DIGITS and digits.startswith(COUNTRY_CODE):
+        digits = digits[len(COUNTRY_CODE):]
+    return digits or None
+
+def normalize_registration(registration_number: Optional[str]) -> Optional[str]:
+    """Upper-case letters and digits only: "tn 01-ab 1234" gives "TN01AB1234" """
+    if not registration_number:
+        return None
+    return re.sub(r"[^0-9A-Za-z]", "", registration_number).upper() or None
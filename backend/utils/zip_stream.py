@@ -0,0 +1,30 @@
+"""
+Write-only file object for building ZIP archives (PDF bundles, .xlsx files)
+while streaming them: zipfile writes into it and the caller drains the
+finished bytes after each entry or chunk.
+"""
+
+from typing import List
+
+class ZipChunkStream:
+    """Buffers zip output until drained; zipfile sees a non-seekable stream"""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+        self._position = 0
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def flush(self):
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data